@@ -1,4 +1,5 @@
 import streamlit as st
+from src.auth import reset_user_profile
 from views.login_register import show_login_register_page
 from views.selection import show_selection_page
 from views.filters import show_filters_page
@@ -41,6 +42,9 @@ def logout():
 
 if not st.session_state["authenticated"]:
     st.session_state["page"] = "login"
+
+# Il profilo dell'utente viene riletto da MongoDB una volta per ogni rerun
+reset_user_profile(st.session_state)
 st.title("MyCinema")
 
 if "movies_to_display" not in st.session_state:
@@ -0,0 +1,50 @@
+import json
+import sys
+
+# Aumento relativo della latenza mediana o del picco di memoria oltre il quale una fase è segnalata
+DEFAULT_THRESHOLD = 0.2
+
+
+def _stages(report):
+    stages = {}
+    for size, results in report["sizes"].items():
+        for result in results:
+            stages[(size, result["stage"])] = result
+    for result in report.get("auth") or []:
+        stages[("auth", result["stage"])] = result
+    return stages
+
+def compare(baseline, current, threshold=DEFAULT_THRESHOLD):
+    """
+    Confronta due report di benchmarks.run fase per fase (latenza mediana, o media per le fasi eseguite una volta,
+    e picco di memoria). Restituisce le righe del confronto e le fasi peggiorate oltre threshold.
+    """
+    rows, regressions = [], []
+    old_stages, new_stages = _stages(baseline), _stages(current)
+    for key in sorted(old_stages.keys() & new_stages.keys()):
+        old, new = old_stages[key], new_stages[key]
+        for metric in ("p50" if "p50" in old else "mean", "peak_memory_mb"):
+            if old.get(metric) is None or new.get(metric) is None:
+                continue
+            ratio = new[metric] / old[metric] if old[metric] > 0 else float("inf")
+            row = (*key, metric, old[metric], new[metric], ratio)
+            rows.append(row)
+            if ratio > 1 + threshold:
+                regressions.append(row)
+    return rows, regressions
+
+
+if __name__ == "__main__":
+    # python -m benchmarks.compare baseline.json current.json [threshold]
+    with open(sys.argv[1]) as f:
+        baseline = json.load(f)
+    with open(sys.argv[2]) as f:
+        current = json.load(f)
+    threshold = float(sys.argv[3]) if len(sys.argv) > 3 else DEFAULT_THRESHOLD
+
+    rows, regressions = compare(baseline, current, threshold)
+    print(f"Comparing {baseline.get('commit')} -> {current.get('commit')}")
+    for size, stage, metric, old, new, ratio in rows:
+        flag = "  REGRESSION" if ratio > 1 + threshold else ""
+        print(f"{size:>8} {stage:<32} {metric:<15} {old:>12.3f} {new:>12.3f} {ratio:>7.2f}x{flag}")
+    sys.exit(1 if regressions else 0)
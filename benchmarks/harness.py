@@ -0,0 +1,63 @@
+import gc
+import time
+import tracemalloc
+from src.metrics import LatencyReservoir
+
+PERCENTILES = (50, 90, 99)
+
+
+def measure(stage, fn, repeats=20, warmup=1, setup=None, memory=True):
+    """
+    Esegue fn repeats volte (dopo warmup esecuzioni non misurate) e restituisce percentili di latenza in ms,
+    throughput (chiamate al secondo) e picco di memoria in MB. setup, se indicato, è chiamato prima di ogni
+    esecuzione fuori dalla misura e il suo risultato è passato a fn. Il picco di memoria è misurato con
+    tracemalloc in un'esecuzione separata, perché il tracciamento rallenta le altre.
+    """
+    call = fn if setup is not None else (lambda _: fn())
+    prepare = setup if setup is not None else (lambda: None)
+
+    def run():
+        return call(prepare())
+
+    for _ in range(warmup):
+        run()
+
+    reservoir = LatencyReservoir(max_samples=repeats)
+    elapsed_total = 0.0
+    for _ in range(repeats):
+        argument = prepare()
+        start = time.perf_counter()
+        call(argument)
+        elapsed = time.perf_counter() - start
+        reservoir.record(elapsed)
+        elapsed_total += elapsed
+
+    result = {"stage": stage, "repeats": repeats}
+    result.update({name: value * 1000 for name, value in reservoir.percentiles(PERCENTILES).items()})
+    result["mean"] = elapsed_total / repeats * 1000
+    result["throughput"] = repeats / elapsed_total if elapsed_total > 0 else None
+    result["peak_memory_mb"] = peak_memory(run) if memory else None
+    return result
+
+def measure_once(stage, fn, memory=True):
+    """
+    Per le fasi lente (generazione del catalogo, costruzione dell'artefatto): una sola esecuzione misurata, più
+    una con tracemalloc per il picco di memoria se memory è True. Restituisce il risultato di fn e le misure.
+    """
+    start = time.perf_counter()
+    value = fn()
+    elapsed = time.perf_counter() - start
+    result = {"stage": stage, "repeats": 1, "mean": elapsed * 1000, "throughput": 1 / elapsed if elapsed > 0 else None}
+    result["peak_memory_mb"] = peak_memory(fn) if memory else None
+    return value, result
+
+def peak_memory(fn):
+    """Picco di memoria allocata (in MB, allocazioni di Python e NumPy) durante un'esecuzione di fn."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / (1024 * 1024)
@@ -0,0 +1,169 @@
+import argparse
+import itertools
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+from datetime import datetime, timezone
+import numpy as np
+import pandas as pd
+from benchmarks.harness import measure, measure_once
+from benchmarks.synthetic_catalog import CATALOG_SIZES, write_catalog
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+results_dir = os.path.join(current_dir, "results")
+
+# Ricerche eseguite a rotazione nei benchmark dei filtri
+SEARCH_QUERIES = [
+    {"genre": ["Drama"]},
+    {"genre": ["Comedy", "Romantic"], "max_duration": 110},
+    {"actors": "Rossi", "start_year": 1990, "end_year": 2010},
+    {"directors": "Tanaka"},
+    {"title": "amore", "description": "famiglia"},
+]
+RECOMMENDATION_FILTERS = [
+    {},
+    {"genre": ["Drama", "Thriller"]},
+    {"duration_range": (60, 120), "year_range": (1980, 2020)},
+]
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=current_dir, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def catalog_benchmarks(n_rows, directory, repeats):
+    """Benchmark del caricamento del catalogo, delle due implementazioni dei filtri e delle raccomandazioni."""
+    from src import knn_model, recommendation_cache
+    from src.catalog import clear_catalogs
+    from src.filtering_functions import filter_movies
+    from src.movies_utils import load_preprocessed_data
+
+    path = os.path.join(directory, f"synthetic_{n_rows}.csv")
+    _, generation = measure_once("generate_catalog", lambda: write_catalog(n_rows, path), memory=False)
+    results = [generation]
+
+    # Caricamento a freddo (primo accesso del processo) e a caldo (catalogo condiviso già letto)
+    cold_repeats = max(1, repeats // 5)
+    results.append(measure("load_preprocessed_data_cold", lambda _: load_preprocessed_data(path), cold_repeats, setup=clear_catalogs))
+    results.append(measure("load_preprocessed_data_warm", lambda: load_preprocessed_data(path), repeats))
+    movies = load_preprocessed_data(path)
+
+    queries = itertools.cycle(SEARCH_QUERIES)
+    results.append(measure("filter_movies", lambda query: filter_movies(movies, **query), repeats, setup=lambda: next(queries)))
+    model_queries = itertools.cycle([
+        {key: value for key, value in query.items() if key in ("genre", "max_duration", "actors", "directors", "start_year", "end_year")}
+        for query in SEARCH_QUERIES
+    ])
+    results.append(measure(
+        "knn_model.filter_movies", lambda query: knn_model.filter_movies(movies, **query), repeats, setup=lambda: next(model_queries)
+    ))
+
+    # Artefatto delle feature del catalogo sintetico, tenuto solo in memoria (i file in data/ non vengono toccati)
+    artifact, build = measure_once("build_feature_artifact", lambda: knn_model.build_feature_artifact(path))
+    results.append(build)
+    artifact["id_positions"] = pd.Index(artifact["filmtv_ids"])
+    old_csv_path = knn_model.csv_path
+    knn_model.csv_path = path
+    knn_model._feature_artifact = artifact
+    try:
+        rng = np.random.default_rng(0)
+        filmtv_ids = artifact["filmtv_ids"]
+        filters = itertools.cycle(RECOMMENDATION_FILTERS)
+
+        def random_profile():
+            ids = rng.choice(filmtv_ids, 15, replace=False)
+            return list(ids[:12]), list(ids[12:]), next(filters)
+
+        results.append(measure(
+            "compute_recommendations", lambda args: knn_model.compute_recommendations(*args, "exact"), repeats, setup=random_profile
+        ))
+        profile = random_profile()
+        recommendation_cache.clear()
+        results.append(measure("get_recommendations_cached", lambda: knn_model.get_recommendations(*profile, mode="exact"), repeats))
+    finally:
+        recommendation_cache.clear()
+        knn_model.csv_path = old_csv_path
+        knn_model._feature_artifact = None
+        clear_catalogs()
+    return results
+
+
+def auth_benchmarks(repeats):
+    """
+    Benchmark delle chiamate di autenticazione e dei profili. Usa il database di BENCHMARK_MONGO_URI (in un
+    database separato, eliminato alla fine) oppure mongomock se installato; altrimenti restituisce None.
+    """
+    from src import auth, db
+
+    mongo_uri = os.getenv("BENCHMARK_MONGO_URI")
+    if mongo_uri:
+        from pymongo import MongoClient
+        client = MongoClient(mongo_uri, **db.client_options())
+    else:
+        try:
+            import mongomock
+        except ImportError:
+            return None
+        client = mongomock.MongoClient()
+
+    database_name = db.DB_NAME
+    db.DB_NAME = f"{database_name}Benchmark"
+    db.set_client(client)
+    try:
+        counter = itertools.count()
+        results = [measure("register_user", lambda: auth.register_user(f"user{next(counter)}", "password"), repeats)]
+        results.append(measure("authenticate_user", lambda: auth.authenticate_user("user0", "password"), repeats))
+        results.append(measure("get_user_profile", lambda: auth.get_user_profile("user0"), repeats))
+        movie_ids = itertools.count(1)
+        results.append(measure("like_movie", lambda: auth.like_movie("user0", next(movie_ids)), repeats))
+    finally:
+        client.drop_database(db.DB_NAME)
+        db.DB_NAME = database_name
+        db.set_client(None)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark on synthetic FilmTV catalogs.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(CATALOG_SIZES), help="catalog sizes in rows")
+    parser.add_argument("--repeats", type=int, default=20, help="measured calls per stage")
+    parser.add_argument("--skip-auth", action="store_true", help="do not benchmark the auth calls")
+    parser.add_argument("--output", help="JSON file for the results (default: benchmarks/results/<time>-<commit>.json)")
+    args = parser.parse_args(argv)
+
+    commit = git_commit()
+    report = {
+        "commit": commit,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "sizes": {},
+        "auth": None,
+    }
+    with tempfile.TemporaryDirectory() as directory:
+        for n_rows in args.sizes:
+            print(f"Benchmarking a catalog of {n_rows} movies...")
+            report["sizes"][str(n_rows)] = catalog_benchmarks(n_rows, directory, args.repeats)
+    if not args.skip_auth:
+        print("Benchmarking auth calls...")
+        report["auth"] = auth_benchmarks(max(1, args.repeats // 4))
+
+    output = args.output or os.path.join(results_dir, f"{datetime.now():%Y%m%d-%H%M%S}-{commit or 'unknown'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results saved to {output}")
+    return report
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,103 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+# Dimensioni del catalogo usate dai benchmark
+CATALOG_SIZES = (10_000, 100_000, 1_000_000)
+
+GENRES = [
+    "Drama", "Comedy", "Thriller", "Action", "Horror", "Romantic", "Documentary", "Western",
+    "Fantasy", "Adventure", "Animation", "Crime", "Science Fiction", "War", "Musical",
+]
+COUNTRIES = ["USA", "Italy", "France", "UK", "Germany", "Spain", "Japan", "Canada", "India", "Sweden", "Mexico", "Australia"]
+FIRST_NAMES = ["John", "Marco", "Anna", "Sophie", "Luca", "James", "Maria", "Paul", "Giulia", "Akira", "Pierre", "Elena", "Carlos", "Ingrid"]
+LAST_NAMES = ["Smith", "Rossi", "Martin", "Müller", "García", "Tanaka", "Bianchi", "Dubois", "Johnson", "Ferrari", "Nilsson", "López"]
+TITLE_WORDS = ["notte", "amore", "città", "ultimo", "viaggio", "segreto", "fuoco", "ombra", "mare", "sogno", "guerra", "cuore", "strada", "tempo"]
+DESCRIPTION_WORDS = TITLE_WORDS + ["una", "storia", "di", "famiglia", "che", "nel", "dopo", "giovane", "uomo", "donna", "anni", "vita"]
+
+# Voti minimi della media pesata, come nel notebook di preprocessing
+MIN_NUM_OF_VOTES = 43
+
+
+def _people(rng, prefix, n_people):
+    """Nomi distinti di attori o registi (nome, cognome e un numero per renderli unici)."""
+    first = rng.choice(FIRST_NAMES, n_people)
+    last = rng.choice(LAST_NAMES, n_people)
+    return np.array([f"{f} {l} {prefix}{i}" for i, (f, l) in enumerate(zip(first, last))])
+
+def _multi_valued(rng, names, n_rows, min_values, max_values, zipf_a):
+    """
+    Colonna con più valori separati da ", " per riga: pochi nomi compaiono in molti film (distribuzione Zipf),
+    come gli attori e i registi più prolifici del catalogo reale.
+    """
+    counts = rng.integers(min_values, max_values + 1, n_rows)
+    picks = (rng.zipf(zipf_a, counts.sum()) - 1) % len(names)
+    values = names[picks]
+    bounds = np.concatenate([[0], np.cumsum(counts)])
+    return [", ".join(dict.fromkeys(values[bounds[i]:bounds[i + 1]])) for i in range(n_rows)]
+
+def generate_catalog(n_rows, seed=0):
+    """
+    Catalogo sintetico con le colonne di preprocessed_filmtv_movies.csv: attori, registi e paesi con più valori,
+    voti con distribuzione a coda lunga (molti film con pochi voti) e le colonne derivate del preprocessing.
+    """
+    rng = np.random.default_rng(seed)
+
+    # Molti film hanno pochissimi voti, pochi ne hanno migliaia
+    total_votes = np.maximum(1, np.rint(rng.lognormal(mean=1.5, sigma=1.6, size=n_rows))).astype(np.int64)
+    avg_vote = np.round(np.clip(rng.normal(6.2, 1.2, n_rows), 1.0, 10.0), 1)
+    global_avg = avg_vote.mean()
+    weighted_rating = (
+        total_votes / (total_votes + MIN_NUM_OF_VOTES) * avg_vote
+        + MIN_NUM_OF_VOTES / (total_votes + MIN_NUM_OF_VOTES) * global_avg
+    )
+
+    duration = np.clip(np.rint(rng.normal(102, 22, n_rows)), 40, 300).astype(np.int64)
+    # Più film negli anni recenti
+    year = (2023 - np.minimum(rng.exponential(25, n_rows), 110)).astype(np.int64)
+    genre = rng.choice(GENRES, n_rows, p=np.linspace(2, 0.5, len(GENRES)) / np.linspace(2, 0.5, len(GENRES)).sum())
+
+    actors = _people(rng, "A", max(50, n_rows // 4))
+    directors = _people(rng, "D", max(20, n_rows // 12))
+    title_words = rng.choice(TITLE_WORDS, (n_rows, 2))
+    description_words = rng.choice(DESCRIPTION_WORDS, (n_rows, 8))
+
+    movies = pd.DataFrame({
+        "filmtv_id": rng.permutation(np.arange(1, 2 * n_rows + 1))[:n_rows],
+        "title": [f"{a.capitalize()} {b} {i}" for i, (a, b) in enumerate(title_words)],
+        "year": year,
+        "genre": genre,
+        "duration": duration,
+        "country": _multi_valued(rng, np.array(COUNTRIES), n_rows, 1, 3, 1.6),
+        "directors": _multi_valued(rng, directors, n_rows, 1, 2, 1.3),
+        "actors": _multi_valued(rng, actors, n_rows, 2, 8, 1.2),
+        "avg_vote": avg_vote,
+        "total_votes": total_votes,
+        "description": [" ".join(words).capitalize() for words in description_words],
+        "humor": rng.integers(0, 5, n_rows),
+        "rhythm": rng.integers(0, 5, n_rows),
+        "effort": rng.integers(0, 5, n_rows),
+        "tension": rng.integers(0, 5, n_rows),
+        "erotism": rng.integers(0, 5, n_rows),
+        "weighted_rating": weighted_rating,
+        "duration_log": np.log(duration + 1),
+    })
+    # Codifica del genere in ordine alfabetico, come LabelEncoder nel notebook
+    movies["genre_encoded"] = pd.Categorical(movies["genre"], categories=sorted(GENRES)).codes.astype(np.int64)
+    movies["duration_category"] = pd.cut(movies["duration"], bins=[0, 60, 120, 180, float("inf")], labels=["Short", "Medium", "Long", "Epic"])
+    return movies
+
+def write_catalog(n_rows, path, seed=0):
+    """Scrive il catalogo sintetico in formato CSV e restituisce il percorso."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    generate_catalog(n_rows, seed).to_csv(path, index=False)
+    return path
+
+
+if __name__ == "__main__":
+    # python -m benchmarks.synthetic_catalog 100000 data/synthetic_100k.csv
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else CATALOG_SIZES[0]
+    path = sys.argv[2] if len(sys.argv) > 2 else f"synthetic_{n_rows}.csv"
+    write_catalog(n_rows, path)
+    print(f"{n_rows} synthetic movies written to {path}")
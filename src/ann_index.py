@@ -0,0 +1,161 @@
+import os
+import numpy as np
+from scipy.sparse import csr_matrix
+from src.catalog import file_signature
+from src.embeddings import saved_source, source_fields
+from src.scoring import top_k_neighbors, row_sq_norms
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+ann_index_path = os.path.normpath(os.path.join(current_dir, '..', 'data', 'ann_index.npz'))
+
+ANN_INDEX_VERSION = 1
+
+# Numero di liste IVF visitate per query: più sonde = recall più alta, latenza maggiore
+DEFAULT_N_PROBES = int(os.getenv("ANN_N_PROBES", "8"))
+
+# Righe elaborate per blocco durante l'assegnazione ai centroidi (limita la memoria temporanea)
+ASSIGN_BLOCK_SIZE = 65536
+
+
+def _assign(vectors, centroids):
+    """Indice del centroide più vicino per ogni vettore, calcolato a blocchi."""
+    centroid_sq_norms = row_sq_norms(centroids)
+    labels = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), ASSIGN_BLOCK_SIZE):
+        block = vectors[start:start + ASSIGN_BLOCK_SIZE]
+        # ||x||^2 è costante per riga e non cambia l'argmin
+        distances = centroid_sq_norms - 2 * (block @ centroids.T)
+        labels[start:start + len(block)] = np.argmin(distances, axis=1)
+    return labels
+
+def kmeans(vectors, n_clusters, n_iter=20, sample_size=100_000, random_state=0):
+    """K-means (Lloyd) in NumPy puro, addestrato su un campione del catalogo."""
+    rng = np.random.default_rng(random_state)
+    if len(vectors) > sample_size:
+        vectors = vectors[rng.choice(len(vectors), size=sample_size, replace=False)]
+
+    centroids = vectors[rng.choice(len(vectors), size=n_clusters, replace=False)].astype(np.float32)
+    for _ in range(n_iter):
+        labels = _assign(vectors, centroids)
+        counts = np.bincount(labels, minlength=n_clusters)
+        # Somme per cluster con una matrice di appartenenza sparsa (molto più veloce di np.add.at)
+        membership = csr_matrix((np.ones(len(labels), dtype=np.float32), (labels, np.arange(len(labels)))), shape=(n_clusters, len(labels)))
+        sums = np.asarray(membership @ vectors, dtype=np.float32)
+        non_empty = counts > 0
+        centroids[non_empty] = sums[non_empty] / counts[non_empty, None]
+        # Un cluster vuoto viene riassegnato a un punto casuale
+        empty = np.flatnonzero(~non_empty)
+        if len(empty):
+            centroids[empty] = vectors[rng.choice(len(vectors), size=len(empty), replace=False)]
+    return centroids
+
+def build_ivf_index(vectors, n_lists=None, n_iter=20, random_state=0, source=None):
+    """
+    Costruisce un indice IVF: i vettori del catalogo sono raggruppati nelle liste dei centroidi k-means,
+    memorizzate in formato CSR (list_offsets, list_positions) con le posizioni di riga del catalogo.
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if n_lists is None:
+        n_lists = int(4 * np.sqrt(len(vectors)))
+    n_lists = max(1, min(n_lists, len(vectors)))
+
+    centroids = kmeans(vectors, n_lists, n_iter=n_iter, random_state=random_state)
+    labels = _assign(vectors, centroids)
+
+    list_positions = np.argsort(labels, kind='stable').astype(np.int32)
+    list_offsets = np.zeros(n_lists + 1, dtype=np.int64)
+    np.cumsum(np.bincount(labels, minlength=n_lists), out=list_offsets[1:])
+
+    return {
+        "version": ANN_INDEX_VERSION,
+        "source": source,
+        "centroids": centroids,
+        "list_offsets": list_offsets,
+        "list_positions": list_positions,
+    }
+
+def search_ivf(index, vectors, profile, k=20, mask=None, n_probes=DEFAULT_N_PROBES, sq_norms=None):
+    """
+    Top-k approssimato: visita le n_probes liste più vicine al profilo, scarta le righe escluse da mask
+    e riordina i candidati con la distanza esatta. Se i candidati ammessi sono meno di k, raddoppia
+    le sonde fino a coprire tutte le liste, così i filtri molto selettivi non perdono risultati.
+    """
+    centroids = index["centroids"]
+    offsets = index["list_offsets"]
+    n_lists = len(centroids)
+
+    centroid_distances = row_sq_norms(centroids) - 2 * (centroids @ profile)
+    order = np.argsort(centroid_distances)
+
+    n_probes = max(1, min(n_probes, n_lists))
+    while True:
+        lists = order[:n_probes]
+        positions = np.concatenate([index["list_positions"][offsets[l]:offsets[l + 1]] for l in lists])
+        if mask is not None:
+            positions = positions[mask[positions]]
+        if len(positions) >= k or n_probes >= n_lists:
+            break
+        n_probes = min(2 * n_probes, n_lists)
+
+    local, distances = top_k_neighbors(
+        vectors[positions], np.ones(len(positions), dtype=bool), profile, k,
+        sq_norms=None if sq_norms is None else sq_norms[positions],
+    )
+    return positions[local], distances
+
+def save_ivf_index(index, path=ann_index_path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp.npz"
+    np.savez(
+        tmp_path,
+        version=index["version"],
+        **source_fields(index["source"]),
+        centroids=index["centroids"],
+        list_offsets=index["list_offsets"],
+        list_positions=index["list_positions"],
+    )
+    os.replace(tmp_path, path)
+
+def load_ivf_index(path=ann_index_path, source=None):
+    """Carica l'indice salvato. Restituisce None se manca o non corrisponde all'artefatto delle feature."""
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as data:
+        if int(data["version"]) != ANN_INDEX_VERSION:
+            return None
+        file_source = saved_source(data)
+        if source is not None and file_source != source:
+            return None
+        return {
+            "version": ANN_INDEX_VERSION,
+            "source": file_source,
+            "centroids": data["centroids"],
+            "list_offsets": data["list_offsets"],
+            "list_positions": data["list_positions"],
+        }
+
+_ivf_index = None
+_ivf_index_checked = None
+
+def get_ivf_index(embeddings):
+    """
+    Restituisce l'indice IVF condiviso dal processo, costruito sugli embedding float32 del catalogo, o None se manca
+    o non è aggiornato (si costruisce offline con python -m src.knn_model).
+    """
+    global _ivf_index, _ivf_index_checked
+
+    if _ivf_index is not None and _ivf_index["source"] == embeddings["source"]:
+        return _ivf_index
+
+    # Un file mancante o non aggiornato viene controllato di nuovo solo quando cambia
+    checked = (tuple(embeddings["source"].items()), file_signature(ann_index_path))
+    if checked == _ivf_index_checked:
+        return None
+    _ivf_index_checked = checked
+
+    index = load_ivf_index(ann_index_path, source=embeddings["source"])
+    if index is None:
+        print("ANN index missing or stale: run python -m src.knn_model to rebuild it.")
+        return None
+    _ivf_index = index
+    return index
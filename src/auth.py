@@ -1,23 +1,63 @@
-from pymongo import MongoClient
-import bcrypt
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
 from datetime import datetime, timezone
-import os
+from src.db import get_users_collection
+from src.recommendation_cache import invalidate_user
+from src.profile_store import apply_reaction, invalidate_profiles
+from src.passwords import HasherBusyError, password_hasher
 
-MONGO_URI = os.getenv("MONGO_URI")
-if not MONGO_URI:
-    raise ValueError("La variabile d'ambiente MONGO_URI non è definita.")
+# Campi letti per l'autenticazione (l'immagine del profilo non serve)
+AUTH_PROJECTION = {"username": 1, "password_hash": 1, "preferences": 1, "disliked": 1}
+# Campi letti per mostrare e aggiornare le preferenze (la password e gli altri campi non servono)
+PROFILE_PROJECTION = {"_id": 0, "preferences": 1, "disliked": 1, "precomputed_recommendations": 1}
+# Chiave della sessione Streamlit in cui è memorizzato il profilo dell'utente per il rerun corrente
+PROFILE_SESSION_KEY = "user_profile"
+# Reazioni a un film: lista a cui aggiungerlo e lista da cui toglierlo
+REACTIONS = {
+    "like": ("preferences", "disliked"),
+    "dislike": ("disliked", "preferences"),
+    "unlike": (None, "preferences"),
+    "undislike": (None, "disliked"),
+}
 
-client = MongoClient(MONGO_URI)
-db = client["FilmRecommender"]
-users_collection = db["users"]
+
+class UserProfile:
+    """Film piaciuti e non piaciuti di un utente: liste come salvate su MongoDB e insiemi per verifiche O(1)."""
+
+    __slots__ = ('username', 'preferences', 'disliked', 'liked_set', 'disliked_set', 'precomputed')
+
+    def __init__(self, username, preferences, disliked, precomputed=None):
+        self.username = username
+        # Raccomandazioni senza filtri del calcolo batch (con la loro impronta), se presenti
+        self.precomputed = precomputed
+        self.set_preferences(preferences)
+        self.set_disliked(disliked)
+
+    def set_preferences(self, preferences):
+        self.preferences = list(preferences)
+        self.liked_set = set(self.preferences)
+
+    def set_disliked(self, disliked):
+        self.disliked = list(disliked)
+        self.disliked_set = set(self.disliked)
+
+    def apply(self, reaction, movie_id):
+        """Riporta sul profilo l'effetto di reaction_update (stesso ordine delle liste su MongoDB)."""
+        add_field, remove_field = REACTIONS[reaction]
+        lists = {"preferences": self.preferences, "disliked": self.disliked}
+        if movie_id in lists[remove_field]:
+            lists[remove_field] = [m for m in lists[remove_field] if m != movie_id]
+        if add_field is not None and movie_id not in lists[add_field]:
+            lists[add_field] = lists[add_field] + [movie_id]
+        self.set_preferences(lists["preferences"])
+        self.set_disliked(lists["disliked"])
 
 def register_user(username, password, profile_pic=None):
-    # Controlla se l'utente esiste già
-    if users_collection.find_one({"username": username}):
-        return "Username already exists."
-    
-    # Hash della password
-    hashed_password = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
+    # Hash della password (nel pool di hashing, non sul thread dello script)
+    try:
+        hashed_password = password_hasher.hash(password)
+    except HasherBusyError:
+        return "Server busy, please try again in a moment."
 
     user = {
         "username": username,
@@ -27,49 +67,172 @@ def register_user(username, password, profile_pic=None):
         "disliked": [],
         "created_at": datetime.now(timezone.utc)
     }
-    users_collection.insert_one(user)
+    # L'indice unico su username rifiuta i duplicati, anche con due registrazioni concorrenti
+    try:
+        get_users_collection().insert_one(user)
+    except DuplicateKeyError:
+        return "Username already exists."
     return "User registered successfully."
 
 def authenticate_user(username, password):
-    user = users_collection.find_one({"username": username})
-    if user and bcrypt.checkpw(password.encode('utf-8'), user["password_hash"]):
+    """Verifica la password nel pool di hashing (HasherBusyError se il pool è saturo)."""
+    user = get_users_collection().find_one({"username": username}, AUTH_PROJECTION)
+    if user and password_hasher.verify(password, user["password_hash"]):
+        if password_hasher.needs_rehash(user["password_hash"]):
+            _rehash_password(username, password, user["password_hash"])
         return True, user
     return False, None
 
-def get_user(username):
-    return users_collection.find_one({"username": username})
+def _rehash_password(username, password, old_hash):
+    """Aggiorna un hash con un fattore di lavoro diverso da quello configurato (solo se non è cambiato nel frattempo)."""
+    try:
+        new_hash = password_hasher.hash(password)
+    except HasherBusyError:
+        return
+    get_users_collection().update_one(
+        {"username": username, "password_hash": old_hash},
+        {"$set": {"password_hash": new_hash}}
+    )
 
-def update_preferences(username, preferences):
-    user = users_collection.find_one({"username": username})
-    if not user:
-        return "User not found."
-    
-    users_collection.update_one(
+def get_user(username, projection=None):
+    """Documento dell'utente, limitato ai campi di projection se indicata."""
+    return get_users_collection().find_one({"username": username}, projection)
+
+def _cached_profile(username, session):
+    profile = session.get(PROFILE_SESSION_KEY) if session is not None else None
+    return profile if profile is not None and profile.username == username else None
+
+def get_user_profile(username, session=None):
+    """
+    Profilo dell'utente letto con una sola find_one (solo preferences e disliked).
+    Con session (st.session_state) il profilo viene riusato fino a reset_user_profile, che l'app chiama
+    a ogni rerun: così una pagina con molti film legge il documento una volta sola.
+    """
+    profile = _cached_profile(username, session)
+    if profile is not None:
+        return profile
+
+    user = get_users_collection().find_one({"username": username}, PROFILE_PROJECTION) or {}
+    profile = UserProfile(username, user.get("preferences", []), user.get("disliked", []), user.get("precomputed_recommendations"))
+    if session is not None:
+        session[PROFILE_SESSION_KEY] = profile
+    return profile
+
+def reset_user_profile(session):
+    session.pop(PROFILE_SESSION_KEY, None)
+
+def update_preferences(username, preferences, session=None):
+    result = get_users_collection().update_one(
         {"username": username},
         {"$set": {"preferences": preferences}}
     )
+    if result.matched_count == 0:
+        return "User not found."
+    invalidate_user(username)
+    invalidate_profiles([username])
+
+    # Scrittura anche sul profilo in cache, così il resto del rerun vede il nuovo stato
+    profile = _cached_profile(username, session)
+    if profile is not None:
+        profile.set_preferences(preferences)
     return "Preferences updated successfully."
 
 def get_preferences(username):
-    user = users_collection.find_one({"username": username})
+    user = get_users_collection().find_one({"username": username}, PROFILE_PROJECTION)
     if user:
         return user["preferences"]
     return []
 
-def update_disliked(username, disliked):
-    user = users_collection.find_one({"username": username})
-    if not user:
-        return "User not found."
-    
-    users_collection.update_one(
+def update_disliked(username, disliked, session=None):
+    result = get_users_collection().update_one(
         {"username": username},
         {"$set": {"disliked": disliked}}
     )
+    if result.matched_count == 0:
+        return "User not found."
+    invalidate_user(username)
+    invalidate_profiles([username])
+
+    profile = _cached_profile(username, session)
+    if profile is not None:
+        profile.set_disliked(disliked)
     return "Preferences updated successfully."
 
 def get_disliked(username):
-    user = users_collection.find_one({"username": username})
+    user = get_users_collection().find_one({"username": username}, PROFILE_PROJECTION)
     if user:
         return user["disliked"]
     return []
 
+def reaction_update(reaction, movie_id):
+    """Update MongoDB di una reazione: $addToSet sulla lista di destinazione e $pull dalla lista opposta."""
+    add_field, remove_field = REACTIONS[reaction]
+    update = {"$pull": {remove_field: movie_id}}
+    if add_field is not None:
+        update["$addToSet"] = {add_field: movie_id}
+    return update
+
+def reaction_changes(reaction, movie_id, before):
+    """Liste effettivamente modificate da una reazione, dato il documento prima dell'update: (campo, +1 o -1)."""
+    add_field, remove_field = REACTIONS[reaction]
+    changes = []
+    if movie_id in before.get(remove_field, []):
+        changes.append((remove_field, -1))
+    if add_field is not None and movie_id not in before.get(add_field, []):
+        changes.append((add_field, 1))
+    return changes
+
+def react_to_movie(username, movie_id, reaction, session=None):
+    """
+    Applica una reazione ("like", "dislike", "unlike", "undislike") con un solo update atomico:
+    non serve leggere le liste prima e aggiornamenti concorrenti dello stesso utente non si perdono.
+    Le liste precedenti restituite dall'update dicono cosa è cambiato, per aggiornare il profilo salvato.
+    """
+    before = get_users_collection().find_one_and_update(
+        {"username": username},
+        reaction_update(reaction, movie_id),
+        projection={"_id": 0, "preferences": 1, "disliked": 1},
+        return_document=ReturnDocument.BEFORE,
+    )
+    if before is None:
+        return "User not found."
+    invalidate_user(username)
+    after = UserProfile(username, before.get("preferences", []), before.get("disliked", []))
+    after.apply(reaction, movie_id)
+    apply_reaction(username, movie_id, reaction_changes(reaction, movie_id, before), {"preferences": after.preferences, "disliked": after.disliked})
+
+    profile = _cached_profile(username, session)
+    if profile is not None:
+        profile.apply(reaction, movie_id)
+    return "Preferences updated successfully."
+
+def like_movie(username, movie_id, session=None):
+    return react_to_movie(username, movie_id, "like", session)
+
+def dislike_movie(username, movie_id, session=None):
+    return react_to_movie(username, movie_id, "dislike", session)
+
+def unlike_movie(username, movie_id, session=None):
+    return react_to_movie(username, movie_id, "unlike", session)
+
+def undislike_movie(username, movie_id, session=None):
+    return react_to_movie(username, movie_id, "undislike", session)
+
+def react_to_movies(reactions):
+    """
+    Applica molte reazioni (tuple username, movie_id, reazione) con un solo bulk_write.
+    Le operazioni sono ordinate, così più reazioni dello stesso utente allo stesso film si applicano in sequenza.
+    """
+    reactions = list(reactions)
+    operations = [
+        UpdateOne({"username": username}, reaction_update(reaction, movie_id))
+        for username, movie_id, reaction in reactions
+    ]
+    if not operations:
+        return None
+    result = get_users_collection().bulk_write(operations, ordered=True)
+    usernames = {username for username, _, _ in reactions}
+    for username in usernames:
+        invalidate_user(username)
+    invalidate_profiles(usernames)
+    return result
@@ -0,0 +1,88 @@
+import bisect
+import numpy as np
+from src.text_index import fold
+
+DEFAULT_LIMIT = 10
+# Per i prefissi fino a questa lunghezza i suggerimenti sono precalcolati (intervalli più ampi)
+PRECOMPUTED_PREFIX_LENGTH = 3
+
+
+class NameAutocomplete:
+    """
+    Suggerimenti per prefisso sui nomi distinti di una colonna indicizzata (attori o registi).
+
+    È un trie implicito: le chiavi normalizzate (nome completo e ogni suffisso che inizia con una parola,
+    così "hanks" trova "Tom Hanks") sono ordinate, e ogni nodo del trie corrisponde all'intervallo di chiavi
+    che condividono il prefisso, trovato con due ricerche binarie. I migliori suggerimenti dei prefissi
+    corti sono precalcolati; per quelli più lunghi l'intervallo è piccolo e si ordina al momento.
+    I nomi sono pesati con la somma di total_votes dei loro film (o con il numero di film).
+    """
+
+    def __init__(self, inverted_index, row_weights=None, limit=DEFAULT_LIMIT):
+        self.inverted_index = inverted_index
+        self.names = inverted_index.vocabulary
+        self.limit = limit
+
+        counts = np.diff(inverted_index.offsets)
+        if row_weights is None or len(inverted_index.positions) == 0:
+            self.weights = counts.astype(np.float64)
+        else:
+            row_weights = np.nan_to_num(np.asarray(row_weights, dtype=np.float64))
+            sums = np.add.reduceat(row_weights[inverted_index.positions], inverted_index.offsets[:-1][counts > 0])
+            self.weights = np.zeros(len(self.names))
+            self.weights[counts > 0] = sums
+
+        keys, name_ids = [], []
+        for name_id, name in enumerate(self.names):
+            words = fold(name).split()
+            for start in range(len(words)):
+                keys.append(' '.join(words[start:]))
+                name_ids.append(name_id)
+        order = sorted(range(len(keys)), key=keys.__getitem__)
+        self._keys = [keys[i] for i in order]
+        self._name_ids = np.asarray([name_ids[i] for i in order], dtype=np.int64)
+        self._key_weights = self.weights[self._name_ids]
+
+        # Scorrendo le chiavi per peso decrescente ogni prefisso corto raccoglie i suoi migliori nomi in un solo passaggio
+        self._precomputed = {}
+        for i in np.lexsort((self._name_ids, -self._key_weights)).tolist():
+            key, name_id = self._keys[i], int(self._name_ids[i])
+            for length in range(1, min(len(key), PRECOMPUTED_PREFIX_LENGTH) + 1):
+                top = self._precomputed.setdefault(key[:length], [])
+                if len(top) < limit and name_id not in top:
+                    top.append(name_id)
+
+    def _range(self, prefix):
+        lo = bisect.bisect_left(self._keys, prefix)
+        hi = bisect.bisect_left(self._keys, prefix + '\U0010ffff', lo)
+        return lo, hi
+
+    def _top_names(self, lo, hi, limit):
+        name_ids, weights = self._name_ids[lo:hi], self._key_weights[lo:hi]
+        if len(name_ids) > limit:
+            top = np.argpartition(-weights, limit - 1)[:limit]
+            name_ids, weights = name_ids[top], weights[top]
+        order = np.lexsort((name_ids, -weights))
+        name_ids = list(dict.fromkeys(name_ids[order].tolist()))
+        if len(name_ids) < min(limit, hi - lo):
+            # Lo stesso nome compare con più chiavi nell'intervallo: si ripete la selezione sui nomi distinti
+            name_ids = np.unique(self._name_ids[lo:hi])
+            order = np.lexsort((name_ids, -self.weights[name_ids]))
+            name_ids = name_ids[order][:limit].tolist()
+        return name_ids
+
+    def suggest(self, prefix, limit=None):
+        """Nomi (nella forma originale) che iniziano con prefix o con una parola che inizia con prefix, ordinati per peso."""
+        limit = limit or self.limit
+        prefix = ' '.join(fold(prefix).split())
+        if not prefix:
+            return []
+        if limit <= self.limit and prefix in self._precomputed:
+            name_ids = self._precomputed[prefix][:limit]
+        else:
+            name_ids = self._top_names(*self._range(prefix), limit)
+        return [self.names[i] for i in name_ids]
+
+    def postings(self, names):
+        """Posizioni di riga dei film di uno o più nomi scelti tra i suggerimenti, senza scorrere il catalogo."""
+        return self.inverted_index.postings_any(names)
@@ -0,0 +1,119 @@
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+import numpy as np
+from scipy.sparse import csr_matrix, issparse
+from pymongo import UpdateOne
+from src import knn_model
+from src.db import get_users_collection
+from src.embeddings import get_embeddings
+from src.recommendation_cache import recommendation_key
+from src.scoring import top_k_neighbors_batch
+
+# Utenti letti (e scritti) per pagina e thread usati per il prodotto a blocchi
+BATCH_PAGE_SIZE = int(os.getenv("BATCH_PAGE_SIZE", "256"))
+BATCH_JOBS = int(os.getenv("BATCH_JOBS", str(os.cpu_count() or 1)))
+# Campo del documento utente con le raccomandazioni precalcolate
+PRECOMPUTED_FIELD = "precomputed_recommendations"
+USER_PROJECTION = {"username": 1, "preferences": 1, "disliked": 1}
+
+
+def iter_user_pages(collection, page_size=BATCH_PAGE_SIZE):
+    """Utenti della collection a pagine di page_size, letti con un cursore (mai tutti in memoria)."""
+    page = []
+    for user in collection.find({}, USER_PROJECTION).sort("_id", 1).batch_size(page_size):
+        page.append(user)
+        if len(page) == page_size:
+            yield page
+            page = []
+    if page:
+        yield page
+
+
+def profile_matrix(artifact, vectors, users):
+    """
+    Profili degli utenti (media dei film piaciuti meno media dei non piaciuti, come in get_recommendations)
+    come righe di una matrice densa, calcolati con un solo prodotto matrice sparsa di medie x vettori.
+    Restituisce gli utenti con almeno un film piaciuto nel catalogo, i profili e le posizioni da escludere.
+    """
+    rows, columns, weights = [], [], []
+    valid, exclude = [], []
+    for user in users:
+        liked = knn_model._artifact_positions(artifact, user.get("preferences") or [])
+        disliked = knn_model._artifact_positions(artifact, user.get("disliked") or [])
+        if len(liked) == 0:
+            continue
+        row = len(valid)
+        for positions, weight in ((liked, 1.0), (disliked, -1.0)):
+            if len(positions) > 0:
+                rows.extend([row] * len(positions))
+                columns.extend(positions)
+                weights.extend([weight / len(positions)] * len(positions))
+        valid.append(user)
+        exclude.append(np.concatenate([liked, disliked]))
+
+    averages = csr_matrix((weights, (rows, columns)), shape=(len(valid), vectors.shape[0]))
+    profiles = averages @ vectors
+    profiles = profiles.toarray() if issparse(profiles) else np.asarray(profiles)
+    return valid, profiles, exclude
+
+
+def run_batch(collection=None, mode=None, page_size=BATCH_PAGE_SIZE, n_jobs=BATCH_JOBS, k=20):
+    """
+    Calcola e salva sul documento di ogni utente i k film raccomandati senza filtri, con l'impronta
+    (recommendation_key) che get_recommendations confronta prima di usarli. Nelle modalità int8 e ann
+    il calcolo è esatto sugli embedding float32, nella modalità neighbors sulla matrice completa delle feature.
+    """
+    collection = collection if collection is not None else get_users_collection()
+    mode = mode or knn_model.RECOMMENDATION_MODE
+    artifact = knn_model.get_feature_artifact()
+    if mode in ("exact", "neighbors"):
+        vectors, sq_norms = artifact["matrix"], artifact["row_sq_norms"]
+    else:
+        embeddings = get_embeddings(artifact)
+        if embeddings is None:
+            raise RuntimeError("Embeddings missing or stale: run python -m src.knn_model before the batch.")
+        vectors, sq_norms = embeddings["vectors"], embeddings["sq_norms"]
+
+    version = knn_model.model_version(mode)
+    unfiltered = knn_model.canonical_recommendation_filters({})
+    filmtv_ids = artifact["filmtv_ids"]
+    stats = {"pages": 0, "users": 0, "written": 0, "skipped": 0}
+
+    with ThreadPoolExecutor(max_workers=n_jobs) as executor:
+        for page in iter_user_pages(collection, page_size):
+            valid, profiles, exclude = profile_matrix(artifact, vectors, page)
+            results = top_k_neighbors_batch(vectors, profiles, exclude, k, sq_norms=sq_norms, executor=executor) if valid else []
+
+            computed_at = datetime.now(timezone.utc)
+            operations = []
+            for user, positions in zip(valid, results):
+                fingerprint = recommendation_key(user.get("preferences") or [], user.get("disliked") or [], unfiltered, version)
+                operations.append(UpdateOne({"_id": user["_id"]}, {"$set": {PRECOMPUTED_FIELD: {
+                    "ids": filmtv_ids[positions].tolist(),
+                    "fingerprint": fingerprint,
+                    "computed_at": computed_at,
+                }}}))
+            # Utenti senza film piaciuti nel catalogo: eventuali liste vecchie vengono rimosse
+            valid_ids = {user["_id"] for user in valid}
+            operations.extend(
+                UpdateOne({"_id": user["_id"]}, {"$unset": {PRECOMPUTED_FIELD: ""}})
+                for user in page if user["_id"] not in valid_ids
+            )
+            if operations:
+                collection.bulk_write(operations, ordered=False)
+
+            stats["pages"] += 1
+            stats["users"] += len(page)
+            stats["written"] += len(valid)
+            stats["skipped"] += len(page) - len(valid)
+    return stats
+
+
+if __name__ == "__main__":
+    # Precalcolo delle raccomandazioni di tutti gli utenti: python -m src.batch_recommender [modalità]
+    start = time.perf_counter()
+    stats = run_batch(mode=sys.argv[1] if len(sys.argv) > 1 else None)
+    print(f"{stats} in {time.perf_counter() - start:.1f}s")
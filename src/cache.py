@@ -0,0 +1,108 @@
+import threading
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+def nbytes(value):
+    """Dimensione approssimativa di un valore in cache (array NumPy/pandas, bytes o sequenze di questi)."""
+    if hasattr(value, 'nbytes'):
+        return int(value.nbytes)
+    if isinstance(value, (bytes, bytearray, str)):
+        return len(value)
+    if isinstance(value, (tuple, list)):
+        return sum(nbytes(v) for v in value)
+    return 64
+
+
+class LRUCache:
+    """
+    Cache LRU condivisa tra i thread, limitata sia nel numero di voci sia nella memoria occupata
+    (misurata con sizeof). Le voci meno usate di recente vengono scartate per prime; on_evict, se indicata,
+    è chiamata con la chiave di ogni voce scartata o svuotata da clear (fuori dal lock della cache).
+    """
+
+    def __init__(self, max_entries=1024, max_bytes=None, sizeof=nbytes, on_evict=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.on_evict = on_evict
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value):
+        size = self.sizeof(value)
+        evicted = []
+        with self._lock:
+            if key in self._entries:
+                self.current_bytes -= self._entries.pop(key)[1]
+            # Un valore più grande dell'intera cache non viene memorizzato
+            if self.max_bytes is not None and size > self.max_bytes:
+                return
+            self._entries[key] = (value, size)
+            self.current_bytes += size
+            while len(self._entries) > self.max_entries or (self.max_bytes is not None and self.current_bytes > self.max_bytes):
+                evicted_key, (_, evicted_size) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_size
+                self.evictions += 1
+                evicted.append(evicted_key)
+        if self.on_evict is not None:
+            for evicted_key in evicted:
+                self.on_evict(evicted_key)
+
+    def get_or_compute(self, key, compute):
+        """Valore in cache per key, calcolato con compute() e memorizzato se assente."""
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def pop(self, key):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self.current_bytes -= entry[1]
+
+    def clear(self):
+        with self._lock:
+            evicted = list(self._entries)
+            self._entries.clear()
+            self.current_bytes = 0
+        if self.on_evict is not None:
+            for evicted_key in evicted:
+                self.on_evict(evicted_key)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
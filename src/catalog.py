@@ -0,0 +1,279 @@
+import os
+import sys
+import json
+import hashlib
+import threading
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+from src.inverted_index import InvertedIndex
+from src.text_index import TextIndex
+from src.autocomplete import NameAutocomplete
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+catalog_path = os.path.normpath(os.path.join(current_dir, '..', 'data', 'preprocessed_filmtv_movies.csv'))
+
+# Tipi compatti per le colonne del catalogo: le colonne assenti vengono ignorate
+CATALOG_DTYPES = {
+    'filmtv_id': 'int32',
+    'year': 'int32',
+    'duration': 'int32',
+    'total_votes': 'int32',
+    'genre_encoded': 'int32',
+    'humor': 'int8',
+    'rhythm': 'int8',
+    'effort': 'int8',
+    'tension': 'int8',
+    'erotism': 'int8',
+    'avg_vote': 'float32',
+    'weighted_rating': 'float32',
+    'duration_log': 'float32',
+    'genre': 'category',
+    'country': 'category',
+    'duration_category': 'category',
+}
+
+# Schema esplicito del formato binario (Arrow IPC / Feather v2)
+_ARROW_TYPES = {
+    'int32': pa.int32(),
+    'int8': pa.int8(),
+    'float32': pa.float32(),
+    'category': pa.dictionary(pa.int32(), pa.string()),
+}
+CATALOG_SCHEMA = pa.schema(
+    [pa.field(col, _ARROW_TYPES[dtype]) for col, dtype in CATALOG_DTYPES.items()]
+    + [pa.field(col, pa.string()) for col in ('title', 'directors', 'actors', 'description')]
+)
+
+
+def source_signature(path):
+    """Versione di un file sorgente: dimensione e mtime."""
+    stat = os.stat(path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+def file_signature(path):
+    """Come source_signature, ma None se il file non esiste."""
+    return source_signature(path) if os.path.exists(path) else None
+
+def frame_digest(frame):
+    """
+    Impronta (sha256) del contenuto di un DataFrame: nomi delle colonne e hash dei valori di ogni riga. Non
+    dipende da percorso, mtime o formato del file (CSV o binario), quindi coincide tra macchine e deploy diversi.
+    """
+    digest = hashlib.sha256(json.dumps([str(column) for column in frame.columns]).encode())
+    digest.update(pd.util.hash_pandas_object(frame, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+def compact_dtypes(df):
+    """Converte le colonne nei tipi compatti di CATALOG_DTYPES, lasciando invariate quelle non convertibili (es. con NaN)."""
+    for col, dtype in CATALOG_DTYPES.items():
+        if col not in df.columns:
+            continue
+        if dtype.startswith('int') and df[col].isna().any():
+            continue
+        try:
+            df[col] = df[col].astype(dtype)
+        except (TypeError, ValueError):
+            pass
+    return df
+
+
+class Catalog:
+    """
+    Catalogo dei film caricato una sola volta per processo e condiviso da tutte le sessioni.
+    Il DataFrame è condiviso: va trattato in sola lettura (i filtri creano sempre nuovi oggetti).
+    """
+
+    __slots__ = ('path', 'signature', 'frame', '_indexes', '_lock')
+
+    # Colonne multi-valore per cui è disponibile un indice invertito
+    INDEXED_COLUMNS = ('genre', 'actors', 'directors')
+    # Colonne di testo libero con indice full-text (trigrammi + BM25)
+    TEXT_INDEXED_COLUMNS = ('title', 'description')
+
+    def __init__(self, path, signature, frame):
+        self.path = path
+        self.signature = signature
+        self.frame = frame
+        self._indexes = {}
+        self._lock = threading.Lock()
+
+    def _cached_index(self, kind, column, factory):
+        """Indice costruito una sola volta per questa versione del catalogo e condiviso tra le sessioni."""
+        key = (kind, column)
+        index = self._indexes.get(key)
+        if index is None:
+            with self._lock:
+                index = self._indexes.get(key)
+                if index is None:
+                    index = factory(self.frame[column])
+                    self._indexes[key] = index
+        return index
+
+    def inverted_index(self, column):
+        return self._cached_index('inverted', column, InvertedIndex)
+
+    def text_index(self, column):
+        return self._cached_index('text', column, TextIndex)
+
+    def autocomplete(self, column):
+        """Suggerimenti per prefisso sui nomi della colonna, pesati con total_votes."""
+        weights = self.frame['total_votes'].to_numpy() if 'total_votes' in self.frame.columns else None
+        return self._cached_index('autocomplete', column, lambda _: NameAutocomplete(self.inverted_index(column), weights))
+
+    def positions_of(self, movie_ids):
+        """Posizioni di riga dei filmtv_id indicati (-1 per quelli assenti), nell'ordine dato."""
+        id_index = self._cached_index('ids', 'filmtv_id', pd.Index)
+        return id_index.get_indexer(pd.Index(movie_ids))
+
+    @property
+    def version(self):
+        return (self.path, self.signature["size"], self.signature["mtime_ns"])
+
+    @property
+    def digest(self):
+        """Impronta del contenuto (vedi frame_digest), calcolata una sola volta per questa versione del catalogo."""
+        digest = self._indexes.get(('digest', None))
+        if digest is None:
+            digest = frame_digest(self.frame)
+            self._indexes[('digest', None)] = digest
+        return digest
+
+    def __len__(self):
+        return len(self.frame)
+
+
+def binary_path_for(path):
+    """Percorso del file binario (.arrow) associato a un CSV del catalogo."""
+    return os.path.splitext(path)[0] + '.arrow'
+
+def build_binary_catalog(csv_path=catalog_path, binary_path=None):
+    """
+    Converte il CSV del catalogo in Arrow IPC (Feather v2) non compresso, con lo schema di CATALOG_SCHEMA,
+    così che possa essere mappato in memoria. La firma del CSV di origine è salvata nei metadati.
+    """
+    binary_path = binary_path or binary_path_for(csv_path)
+    df = compact_dtypes(pd.read_csv(csv_path))
+    table = pa.Table.from_pandas(df, preserve_index=False)
+
+    fields = []
+    for field in table.schema:
+        if field.name in CATALOG_SCHEMA.names and field.type != pa.null():
+            field = CATALOG_SCHEMA.field(field.name).with_nullable(True)
+        fields.append(field)
+    metadata = {b'source_signature': json.dumps(source_signature(csv_path)).encode()}
+    table = table.cast(pa.schema(fields)).replace_schema_metadata(metadata)
+
+    tmp_path = f"{binary_path}.tmp"
+    feather.write_feather(table, tmp_path, compression='uncompressed')
+    os.replace(tmp_path, binary_path)
+    return binary_path
+
+def _read_binary(binary_path):
+    """Legge il file Arrow tramite memory map: le colonne numeriche e di testo restano sui buffer mappati."""
+    with pa.memory_map(binary_path) as source:
+        table = pa.ipc.open_file(source).read_all()
+    return table, table.to_pandas(
+        split_blocks=True,
+        types_mapper={pa.string(): pd.StringDtype('pyarrow')}.get,
+    )
+
+def _binary_is_fresh(binary_path, csv_path):
+    """Il file binario è valido se il CSV non esiste più o non è cambiato dalla conversione."""
+    if not os.path.exists(binary_path):
+        return False
+    if not os.path.exists(csv_path):
+        return True
+    metadata = feather.read_table(binary_path, columns=[], memory_map=True).schema.metadata or {}
+    saved = metadata.get(b'source_signature')
+    return saved is not None and json.loads(saved) == source_signature(csv_path)
+
+def resolve_catalog_source(path):
+    """File da cui caricare il catalogo: il binario se aggiornato, altrimenti il CSV."""
+    if path.endswith('.arrow'):
+        return path
+    binary_path = binary_path_for(path)
+    try:
+        if _binary_is_fresh(binary_path, path):
+            return binary_path
+    except (OSError, pa.ArrowInvalid) as e:
+        print(f"Errore durante la lettura del catalogo binario, uso il CSV: {e}")
+    return path
+
+def read_catalog(path):
+    """Legge il catalogo dal file binario mappato in memoria, con fallback al CSV."""
+    source = resolve_catalog_source(path)
+    if source.endswith('.arrow'):
+        _, df = _read_binary(source)
+        return df
+    return compact_dtypes(pd.read_csv(source))
+
+_catalogs = {}
+_catalogs_lock = threading.Lock()
+
+def get_catalog(path=catalog_path):
+    """
+    Restituisce il catalogo condiviso per path, ricaricandolo solo se il file è cambiato (dimensione o mtime).
+    Se accanto al CSV esiste una versione binaria aggiornata (vedi build_binary_catalog) viene usata quella.
+    Solleva FileNotFoundError se il file non esiste.
+    """
+    path = os.path.abspath(path)
+    signature = source_signature(resolve_catalog_source(path))
+
+    catalog = _catalogs.get(path)
+    if catalog is not None and catalog.signature == signature:
+        return catalog
+
+    with _catalogs_lock:
+        # Un'altra sessione potrebbe averlo caricato mentre attendevamo il lock
+        catalog = _catalogs.get(path)
+        if catalog is None or catalog.signature != signature:
+            catalog = Catalog(path, signature, read_catalog(path))
+            _catalogs[path] = catalog
+    return catalog
+
+def find_catalog(frame):
+    """Restituisce il catalogo a cui appartiene il DataFrame (lo stesso oggetto), oppure None."""
+    for catalog in list(_catalogs.values()):
+        if catalog.frame is frame:
+            return catalog
+    return None
+
+def get_inverted_index(dataset, column):
+    """Indice invertito per una colonna di dataset: quello precalcolato se dataset è un catalogo condiviso."""
+    catalog = find_catalog(dataset)
+    if catalog is not None and column in Catalog.INDEXED_COLUMNS:
+        return catalog.inverted_index(column)
+    return InvertedIndex(dataset[column])
+
+def get_autocomplete(dataset, column):
+    """Autocompletamento dei nomi di una colonna: quello precalcolato se dataset è un catalogo condiviso."""
+    catalog = find_catalog(dataset)
+    if catalog is not None and column in Catalog.INDEXED_COLUMNS:
+        return catalog.autocomplete(column)
+    weights = dataset['total_votes'].to_numpy() if 'total_votes' in dataset.columns else None
+    return NameAutocomplete(InvertedIndex(dataset[column]), weights)
+
+def get_text_index(dataset, column):
+    """Indice full-text per una colonna di dataset: quello precalcolato se dataset è un catalogo condiviso."""
+    catalog = find_catalog(dataset)
+    if catalog is not None and column in Catalog.TEXT_INDEXED_COLUMNS:
+        return catalog.text_index(column)
+    return TextIndex(dataset[column])
+
+def positions_of_ids(dataset, movie_ids):
+    """Posizioni di riga dei filmtv_id indicati (-1 per quelli assenti), nell'ordine dato."""
+    catalog = find_catalog(dataset)
+    if catalog is not None:
+        return catalog.positions_of(movie_ids)
+    return pd.Index(dataset['filmtv_id']).get_indexer(pd.Index(movie_ids))
+
+def clear_catalogs():
+    with _catalogs_lock:
+        _catalogs.clear()
+
+
+if __name__ == "__main__":
+    # Conversione del CSV nel formato binario: python -m src.catalog [percorso_csv]
+    csv_path = sys.argv[1] if len(sys.argv) > 1 else catalog_path
+    print(f"Binary catalog saved to {build_binary_catalog(csv_path)}")
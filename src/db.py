@@ -0,0 +1,172 @@
+import os
+import time
+import threading
+from pymongo import ASCENDING, MongoClient
+from src.metrics import LatencyStats
+
+DB_NAME = "FilmRecommender"
+USERS_COLLECTION = "users"
+# Profili vettoriali degli utenti (somme dei vettori dei film piaciuti e non piaciuti, vedi src/profile_store.py)
+PROFILES_COLLECTION = "user_profiles"
+
+# Indici della collection degli utenti: create_index è idempotente, quindi possono essere creati a ogni avvio
+USER_INDEXES = [
+    {"keys": [("username", ASCENDING)], "name": "username_unique", "unique": True},
+]
+PROFILE_INDEXES = [
+    {"keys": [("username", ASCENDING)], "name": "profile_username_unique", "unique": True},
+    {"keys": [("version", ASCENDING)], "name": "profile_version"},
+]
+
+_client = None
+_indexes_ready = set()
+_lock = threading.Lock()
+
+
+def client_options():
+    """Pool di connessioni e timeout del client MongoDB, configurabili con variabili d'ambiente."""
+    return {
+        "maxPoolSize": int(os.getenv("MONGO_MAX_POOL_SIZE", "50")),
+        "minPoolSize": int(os.getenv("MONGO_MIN_POOL_SIZE", "0")),
+        "maxIdleTimeMS": int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "300000")),
+        "serverSelectionTimeoutMS": int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000")),
+        "connectTimeoutMS": int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "5000")),
+        "socketTimeoutMS": int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", "10000")),
+    }
+
+
+def get_client():
+    """Client MongoDB condiviso dal processo, creato al primo utilizzo."""
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                mongo_uri = os.getenv("MONGO_URI")
+                if not mongo_uri:
+                    raise ValueError("La variabile d'ambiente MONGO_URI non è definita.")
+                _client = MongoClient(mongo_uri, **client_options())
+    return _client
+
+
+def set_client(client):
+    """Sostituisce il client condiviso (es. con mongomock.MongoClient() nei test); gli indici vengono ricreati."""
+    global _client, _indexes_ready
+    with _lock:
+        _client = client
+        _indexes_ready = set()
+
+
+def ensure_indexes(collection, indexes=USER_INDEXES):
+    for index in indexes:
+        options = {k: v for k, v in index.items() if k != "keys"}
+        collection.create_index(index["keys"], **options)
+
+
+def _get_collection(name, indexes, stats):
+    """Collection del database (con metriche delle query); al primo accesso crea gli indici se mancano."""
+    collection = get_client()[DB_NAME][name]
+    if name not in _indexes_ready:
+        with _lock:
+            if name not in _indexes_ready:
+                ensure_indexes(collection, indexes)
+                _indexes_ready.add(name)
+    return InstrumentedCollection(collection, stats)
+
+
+def get_users_collection():
+    """Collection degli utenti (con metriche delle query); al primo accesso crea gli indici se mancano."""
+    return _get_collection(USERS_COLLECTION, USER_INDEXES, query_stats)
+
+
+def get_profiles_collection():
+    """Collection dei profili vettoriali, con metriche separate da quelle della collection degli utenti."""
+    return _get_collection(PROFILES_COLLECTION, PROFILE_INDEXES, profile_query_stats)
+
+
+query_stats = LatencyStats()
+profile_query_stats = LatencyStats()
+
+
+class TimedCursor:
+    """
+    Cursore restituito da find: la query viene eseguita mentre si scorrono i risultati, quindi la durata
+    registrata è quella dello scorrimento (round trip compresi), non della creazione del cursore. La misura
+    viene registrata una volta, quando i risultati finiscono o il cursore viene chiuso.
+    """
+
+    def __init__(self, cursor, stats, operation):
+        self.cursor = cursor
+        self.stats = stats
+        self.operation = operation
+        self.elapsed = 0.0
+        self.recorded = False
+
+    def __getattr__(self, name):
+        attribute = getattr(self.cursor, name)
+        if not callable(attribute):
+            return attribute
+
+        def chained(*args, **kwargs):
+            # sort, limit, batch_size, ... restituiscono il cursore stesso: resta misurato
+            result = attribute(*args, **kwargs)
+            return self if result is self.cursor else result
+        return chained
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        start = time.perf_counter()
+        try:
+            document = next(self.cursor)
+        except StopIteration:
+            self.elapsed += time.perf_counter() - start
+            self._record()
+            raise
+        self.elapsed += time.perf_counter() - start
+        return document
+
+    def _record(self):
+        if not self.recorded:
+            self.recorded = True
+            self.stats.record(self.operation, self.elapsed)
+
+    def close(self):
+        self.cursor.close()
+        self._record()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class InstrumentedCollection:
+    """Collection che registra in stats il numero e la durata delle operazioni verso il database."""
+
+    # find è misurata dal cursore (vedi TimedCursor)
+    OPERATIONS = (
+        "find_one", "insert_one", "update_one", "update_many", "delete_one", "delete_many",
+        "replace_one", "find_one_and_update", "bulk_write", "count_documents",
+    )
+
+    def __init__(self, collection, stats):
+        self.collection = collection
+        self.stats = stats
+
+    def find(self, *args, **kwargs):
+        return TimedCursor(self.collection.find(*args, **kwargs), self.stats, "find")
+
+    def __getattr__(self, name):
+        attribute = getattr(self.collection, name)
+        if name not in self.OPERATIONS:
+            return attribute
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return attribute(*args, **kwargs)
+            finally:
+                self.stats.record(name, time.perf_counter() - start)
+        return timed
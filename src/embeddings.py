@@ -0,0 +1,191 @@
+import os
+import sys
+import numpy as np
+from sklearn.decomposition import TruncatedSVD
+from src.catalog import file_signature
+from src.scoring import top_k_neighbors, row_sq_norms
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+embeddings_path = os.path.normpath(os.path.join(current_dir, '..', 'data', 'embeddings.npz'))
+
+EMBEDDINGS_VERSION = 1
+DEFAULT_N_COMPONENTS = 256
+
+# Modalità di raccomandazione: "exact" (spazio TF-IDF completo), "float32" o "int8" (embedding compatti)
+EMBEDDING_MODES = ("exact", "float32", "int8")
+
+
+def artifact_source(artifact):
+    """
+    Firma dell'artefatto delle feature da cui derivano embedding, indice ANN e liste dei vicini: CSV di origine
+    e versione delle feature, così un cambio di pesi o colonne li rende non validi anche a CSV invariato.
+    """
+    return {**artifact["source"], "feature_version": int(artifact["version"])}
+
+def saved_source(data):
+    """Firma salvata in un file .npz da save_source_fields (-1 per i campi assenti nei file meno recenti)."""
+    field = lambda name: int(data[name]) if name in data.files else -1
+    return {"size": field("source_size"), "mtime_ns": field("source_mtime_ns"), "feature_version": field("feature_version")}
+
+def source_fields(source):
+    """Campi del file .npz con la firma dell'artefatto delle feature (vedi saved_source)."""
+    source = source or {}
+    return {
+        "source_size": source.get("size", -1),
+        "source_mtime_ns": source.get("mtime_ns", -1),
+        "feature_version": source.get("feature_version", -1),
+    }
+
+def quantize_int8(vectors):
+    """Quantizzazione simmetrica per dimensione: vectors ≈ q * scale, con q in [-127, 127]."""
+    scale = np.abs(vectors).max(axis=0) / 127.0
+    scale[scale == 0] = 1.0
+    q = np.clip(np.rint(vectors / scale), -127, 127).astype(np.int8)
+    return q, scale.astype(np.float32)
+
+def build_embeddings(matrix, n_components=DEFAULT_N_COMPONENTS, random_state=42, source=None):
+    """
+    Proietta la matrice pesata delle feature (sparsa) in uno spazio denso di n_components dimensioni
+    con TruncatedSVD. I vettori sono salvati in float32 e nella variante quantizzata int8.
+    """
+    n_components = max(1, min(n_components, matrix.shape[1] - 1, matrix.shape[0] - 1))
+    svd = TruncatedSVD(n_components=n_components, random_state=random_state)
+    vectors = svd.fit_transform(matrix).astype(np.float32)
+    return _make_embeddings(vectors, svd.components_.astype(np.float32), source)
+
+def _make_embeddings(vectors, components, source=None):
+    int8_vectors, int8_scale = quantize_int8(vectors)
+    return {
+        "version": EMBEDDINGS_VERSION,
+        "source": source,
+        "components": components,
+        "vectors": vectors,
+        "sq_norms": row_sq_norms(vectors),
+        "int8_vectors": int8_vectors,
+        "int8_scale": int8_scale,
+        "int8_sq_norms": row_sq_norms(int8_vectors * int8_scale),
+    }
+
+def truncate_embeddings(embeddings, n_components):
+    """Tiene solo le prime n_components dimensioni (le componenti SVD sono ordinate per varianza)."""
+    return _make_embeddings(
+        np.ascontiguousarray(embeddings["vectors"][:, :n_components]),
+        embeddings["components"][:n_components],
+        embeddings["source"],
+    )
+
+def project(embeddings, profile):
+    """Proietta un vettore dello spazio completo delle feature nello spazio degli embedding."""
+    return (embeddings["components"] @ profile).astype(np.float32)
+
+def save_embeddings(embeddings, path=embeddings_path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp.npz"
+    np.savez(
+        tmp_path,
+        version=embeddings["version"],
+        **source_fields(embeddings["source"]),
+        **{key: embeddings[key] for key in ("components", "vectors", "sq_norms", "int8_vectors", "int8_scale", "int8_sq_norms")},
+    )
+    os.replace(tmp_path, path)
+
+def load_embeddings(path=embeddings_path, source=None):
+    """Carica gli embedding salvati. Restituisce None se mancano o non corrispondono all'artefatto delle feature."""
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as data:
+        if int(data["version"]) != EMBEDDINGS_VERSION:
+            return None
+        file_source = saved_source(data)
+        if source is not None and file_source != source:
+            return None
+        embeddings = {key: data[key] for key in data.files if key not in ("version", *source_fields(None))}
+    embeddings["version"] = EMBEDDINGS_VERSION
+    embeddings["source"] = file_source
+    return embeddings
+
+_embeddings = None
+_embeddings_checked = None
+
+def get_embeddings(artifact):
+    """
+    Restituisce gli embedding condivisi dal processo per l'artefatto delle feature dato, o None se mancano o non
+    sono aggiornati: si costruiscono offline con python -m src.knn_model, i processi che servono le richieste li leggono soltanto.
+    """
+    global _embeddings, _embeddings_checked
+
+    source = artifact_source(artifact)
+    if _embeddings is not None and _embeddings["source"] == source:
+        return _embeddings
+
+    # Un file mancante o non aggiornato viene controllato di nuovo solo quando cambia
+    checked = (tuple(source.items()), file_signature(embeddings_path))
+    if checked == _embeddings_checked:
+        return None
+    _embeddings_checked = checked
+
+    embeddings = load_embeddings(embeddings_path, source=source)
+    if embeddings is None:
+        print("Embeddings missing or stale: run python -m src.knn_model to rebuild them.")
+        return None
+    _embeddings = embeddings
+    return embeddings
+
+def top_k_embeddings(embeddings, mask, profile, k=20, quantized=False):
+    """Top-k sugli embedding float32 o int8. profile è già nello spazio degli embedding."""
+    if not quantized:
+        return top_k_neighbors(embeddings["vectors"], mask, profile, k, sq_norms=embeddings["sq_norms"])
+
+    # Con q * scale ≈ x: x·p = q·(scale * p), quindi il prodotto resta sui vettori int8 compatti
+    return top_k_neighbors(
+        embeddings["int8_vectors"], mask, profile * embeddings["int8_scale"], k,
+        sq_norms=embeddings["int8_sq_norms"], profile_sq_norm=profile @ profile,
+    )
+
+
+def recall_report(matrix, dims=(32, 64, 128, 256), k=20, n_queries=200, likes_per_query=5, random_state=0):
+    """
+    Confronta il top-k degli embedding con quello esatto sulla matrice completa (recall@k medio)
+    per diverse dimensioni, su profili costruiti come media di film casuali del catalogo.
+    """
+    rng = np.random.default_rng(random_state)
+    n_rows = matrix.shape[0]
+    sq_norms = row_sq_norms(matrix)
+    full = build_embeddings(matrix, n_components=max(dims), random_state=random_state)
+
+    queries = []
+    for _ in range(n_queries):
+        liked = rng.choice(n_rows, size=min(likes_per_query, n_rows - 1), replace=False)
+        mask = np.ones(n_rows, dtype=bool)
+        mask[liked] = False
+        profile = np.asarray(matrix[liked].mean(axis=0)).ravel()
+        exact, _ = top_k_neighbors(matrix, mask, profile, k, sq_norms=sq_norms)
+        queries.append((liked, mask, set(exact)))
+
+    report = []
+    for n_components in sorted(dims):
+        embeddings = truncate_embeddings(full, n_components)
+        recalls = {"float32": [], "int8": []}
+        for liked, mask, exact in queries:
+            profile = embeddings["vectors"][liked].mean(axis=0)
+            for mode in recalls:
+                approx, _ = top_k_embeddings(embeddings, mask, profile, k, quantized=(mode == "int8"))
+                recalls[mode].append(len(exact.intersection(approx)) / len(exact))
+        report.append({
+            "n_components": embeddings["vectors"].shape[1],
+            f"recall@{k}_float32": float(np.mean(recalls["float32"])),
+            f"recall@{k}_int8": float(np.mean(recalls["int8"])),
+            "bytes_float32": embeddings["vectors"].nbytes,
+            "bytes_int8": embeddings["int8_vectors"].nbytes,
+        })
+    return report
+
+
+if __name__ == "__main__":
+    # Report di recall@20 rispetto al percorso esatto: python -m src.embeddings [dim ...]
+    from src.knn_model import get_feature_artifact
+
+    dims = tuple(int(d) for d in sys.argv[1:]) or (32, 64, 128, 256)
+    artifact = get_feature_artifact()
+    for row in recall_report(artifact["matrix"], dims=dims):
+        print(row)
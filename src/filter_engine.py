@@ -0,0 +1,122 @@
+import numpy as np
+from src.catalog import get_inverted_index, get_text_index
+from src.inverted_index import can_use_index
+
+# Costo relativo dei predicati: gli indici invertiti non scorrono le righe, i confronti numerici sono
+# vettoriali, le ricerche di sottostringhe/regex riga per riga sono le più costose
+INDEX_COST = 0
+RANGE_COST = 1
+SCAN_COST = 2
+
+
+class ContainsAny:
+    """Righe in cui column contiene almeno uno dei termini come sottostringa."""
+
+    def __init__(self, column, terms, case_sensitive=True, regex=False, indexed=True):
+        self.column = column
+        self.terms = list(terms)
+        self.case_sensitive = case_sensitive
+        self.regex = regex
+        self.use_index = indexed and can_use_index(self.terms, regex=regex)
+        self.cost = INDEX_COST if self.use_index else SCAN_COST
+
+    def match_all(self, dataset):
+        """Posizioni che soddisfano il predicato su tutto il dataset (solo per predicati indicizzati)."""
+        return get_inverted_index(dataset, self.column).match_any(self.terms, case_sensitive=self.case_sensitive)
+
+    def evaluate(self, dataset, candidates):
+        if self.use_index:
+            matched = self.match_all(dataset)
+            return matched if candidates is None else np.intersect1d(candidates, matched, assume_unique=True)
+
+        values = dataset[self.column] if candidates is None else dataset[self.column].iloc[candidates]
+        if self.regex:
+            mask = values.str.contains('|'.join(self.terms), case=self.case_sensitive, na=False).to_numpy(dtype=bool)
+        else:
+            mask = values.apply(lambda x: any(term in x for term in self.terms)).to_numpy(dtype=bool)
+        return _select(candidates, mask)
+
+
+class HasAnyToken:
+    """Righe in cui column contiene esattamente uno dei nomi (es. scelti tra i suggerimenti): solo posting list."""
+
+    cost = INDEX_COST
+
+    def __init__(self, column, tokens):
+        self.column = column
+        self.tokens = list(tokens)
+
+    def match_all(self, dataset):
+        return get_inverted_index(dataset, self.column).postings_any(self.tokens)
+
+    def evaluate(self, dataset, candidates):
+        matched = self.match_all(dataset)
+        return matched if candidates is None else np.intersect1d(candidates, matched, assume_unique=True)
+
+
+class TextContains:
+    """Righe in cui column contiene query come sottostringa, senza distinguere accenti e maiuscole (indice di trigrammi)."""
+
+    cost = INDEX_COST
+
+    def __init__(self, column, query):
+        self.column = column
+        self.query = query
+
+    def match_all(self, dataset):
+        return get_text_index(dataset, self.column).find(self.query)
+
+    def evaluate(self, dataset, candidates):
+        return get_text_index(dataset, self.column).find(self.query, candidates)
+
+
+class Between:
+    """Righe con low <= column <= high (gli estremi None non vengono controllati)."""
+
+    cost = RANGE_COST
+
+    def __init__(self, column, low=None, high=None):
+        self.column = column
+        self.low = low
+        self.high = high
+
+    def evaluate(self, dataset, candidates):
+        values = dataset[self.column] if candidates is None else dataset[self.column].iloc[candidates]
+        mask = np.ones(len(values), dtype=bool)
+        if self.low is not None:
+            mask &= (values >= self.low).to_numpy(dtype=bool)
+        if self.high is not None:
+            mask &= (values <= self.high).to_numpy(dtype=bool)
+        return _select(candidates, mask)
+
+
+def _select(candidates, mask):
+    positions = np.flatnonzero(mask)
+    return positions if candidates is None else candidates[positions]
+
+def evaluate(dataset, predicates):
+    """
+    Applica i predicati (in AND) e restituisce le posizioni di riga ordinate che li soddisfano, senza copiare
+    il dataset. I predicati indicizzati vengono intersecati dal più selettivo; i predicati più costosi sono
+    valutati solo sulle righe ancora candidate; se i candidati si esauriscono la valutazione si interrompe.
+    """
+    predicates = [p for p in predicates if p is not None]
+
+    candidates = None
+    indexed = [p.match_all(dataset) for p in predicates if p.cost == INDEX_COST]
+    for matched in sorted(indexed, key=len):
+        candidates = matched if candidates is None else np.intersect1d(candidates, matched, assume_unique=True)
+        if len(candidates) == 0:
+            return candidates
+
+    for predicate in sorted((p for p in predicates if p.cost != INDEX_COST), key=lambda p: p.cost):
+        candidates = predicate.evaluate(dataset, candidates)
+        if len(candidates) == 0:
+            return candidates
+
+    return np.arange(len(dataset)) if candidates is None else candidates
+
+def range_predicate(column, low, high):
+    if low is None and high is None:
+        return None
+    return Between(column, low, high)
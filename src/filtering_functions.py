@@ -1,35 +1,105 @@
-def filter_movies(dataset, title=None, genre=None, min_duration=None, max_duration=None, actors=None, directors=None, start_year=None, end_year=None):
+import os
+import threading
+import numpy as np
+from src.cache import LRUCache
+from src.catalog import find_catalog, get_text_index
+from src.text_index import fold
+from src.filter_engine import ContainsAny, HasAnyToken, TextContains, evaluate, range_predicate
 
-    filtered = dataset.copy()
+def _terms(value):
+    """Termini separati da virgole, senza spazi ai lati e senza termini vuoti (che corrisponderebbero a ogni film)."""
+    return tuple(sorted({term.strip() for term in value.split(",")} - {""})) if value else ()
 
-    if title:
-        filtered = filtered[filtered['title'].str.contains(title, case=False, na=False)]
+def filter_predicates(title=None, genre=None, min_duration=None, max_duration=None, actors=None, directors=None, start_year=None, end_year=None, description=None, actor_names=None, director_names=None):
+    """
+    Predicati della ricerca: titolo e descrizione sono cercati come sottostringhe senza distinguere accenti
+    e maiuscole, genere, attori e registi come sottostringhe esatte. actor_names e director_names sono nomi
+    completi (scelti tra i suggerimenti) risolti direttamente sulle posting list.
+    """
+    return [
+        TextContains('title', title) if title else None,
+        TextContains('description', description) if description else None,
+        ContainsAny('genre', genre) if genre else None,
+        range_predicate('duration', min_duration, max_duration),
+        ContainsAny('actors', list(_terms(actors))) if _terms(actors) else None,
+        ContainsAny('directors', list(_terms(directors))) if _terms(directors) else None,
+        HasAnyToken('actors', actor_names) if actor_names else None,
+        HasAnyToken('directors', director_names) if director_names else None,
+        range_predicate('year', start_year, end_year),
+    ]
 
-    if genre:
-        filtered = filtered[filtered['genre'].apply(lambda x: any(g in x for g in genre))]
+def filter_positions(dataset, **filters):
+    """Posizioni di riga (ordinate) dei film che soddisfano i filtri di filter_movies."""
+    return evaluate(dataset, filter_predicates(**filters))
 
-    if min_duration is not None:
-        filtered = filtered[filtered['duration'] >= min_duration]
-    if max_duration is not None:
-        filtered = filtered[filtered['duration'] <= max_duration]
+def rank_by_relevance(dataset, positions, title=None, description=None):
+    """Ordina le posizioni per rilevanza BM25 rispetto al titolo e alla descrizione cercati (a parità, ordine di catalogo)."""
+    positions = np.asarray(positions)
+    scores = np.zeros(len(positions))
+    for column, query in (('title', title), ('description', description)):
+        if query:
+            _, column_scores = get_text_index(dataset, column).scores(query, positions)
+            scores += column_scores
+    return positions[np.lexsort((positions, -scores))]
 
-    if actors:
-        actor_list = [a.strip() for a in actors.split(",")]
-        filtered = filtered[filtered['actors'].apply(lambda x: any(actor in x for actor in actor_list))]
+def filter_movies(dataset, title=None, genre=None, min_duration=None, max_duration=None, actors=None, directors=None, start_year=None, end_year=None, description=None, actor_names=None, director_names=None):
+    positions = filter_positions(
+        dataset, title=title, genre=genre, min_duration=min_duration, max_duration=max_duration,
+        actors=actors, directors=directors, start_year=start_year, end_year=end_year, description=description,
+        actor_names=actor_names, director_names=director_names,
+    )
+    return dataset.iloc[positions]
 
-    if directors:
-        director_list = [d.strip() for d in directors.split(",")]
-        filtered = filtered[filtered['directors'].apply(lambda x: any(director in x for director in director_list))]
+# Risultati delle ricerche per specifica dei filtri normalizzata, condivisi da tutte le sessioni del processo
+query_cache = LRUCache(
+    max_entries=int(os.getenv("FILTER_CACHE_MAX_ENTRIES", "1024")),
+    max_bytes=int(os.getenv("FILTER_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+)
+_query_cache_version = None
+_query_cache_lock = threading.Lock()
 
-    if start_year is not None:
-        filtered = filtered[filtered['year'] >= start_year]
-    if end_year is not None:
-        filtered = filtered[filtered['year'] <= end_year]
+def canonical_filters(title=None, genre=None, min_duration=None, max_duration=None, actors=None, directors=None, start_year=None, end_year=None, description=None, actor_names=None, director_names=None):
+    """
+    Chiave della ricerca indipendente dalla forma dei filtri: testo normalizzato come nell'indice, generi,
+    attori e registi come insiemi ordinati (basta che ne corrisponda uno), intervalli come interi.
+    """
+    as_int = lambda value: None if value is None else int(value)
+    return (
+        fold(title) if title else "",
+        fold(description) if description else "",
+        tuple(sorted(set(genre))) if genre else (),
+        (as_int(min_duration), as_int(max_duration)),
+        _terms(actors),
+        _terms(directors),
+        tuple(sorted(set(actor_names))) if actor_names else (),
+        tuple(sorted(set(director_names))) if director_names else (),
+        (as_int(start_year), as_int(end_year)),
+    )
 
-    return filtered
+def search_ids(dataset, **filters):
+    """
+    filmtv_id dei film che soddisfano i filtri, ordinati per rilevanza rispetto a titolo e descrizione.
+    Sul catalogo condiviso il risultato è memorizzato in query_cache, svuotata quando cambia la versione del catalogo.
+    """
+    def compute():
+        positions = rank_by_relevance(dataset, filter_positions(dataset, **filters), filters.get("title"), filters.get("description"))
+        ids = dataset['filmtv_id'].to_numpy()[positions]
+        ids.flags.writeable = False
+        return ids
+
+    catalog = find_catalog(dataset)
+    if catalog is None:
+        return compute()
+
+    global _query_cache_version
+    with _query_cache_lock:
+        if _query_cache_version != catalog.version:
+            query_cache.clear()
+            _query_cache_version = catalog.version
+    return query_cache.get_or_compute((catalog.version, canonical_filters(**filters)), compute)
 
 def search_movie(dataset, title=None):
-    filtered = dataset.copy()
-    if title:
-        filtered = filtered[filtered['title'].str.contains(title, case=False, na=False)]
-    return filtered
\ No newline at end of file
+    """Film il cui titolo contiene title, ordinati per rilevanza."""
+    if not title:
+        return dataset.iloc[np.arange(len(dataset))]
+    return dataset.iloc[get_text_index(dataset, 'title').search(title)]
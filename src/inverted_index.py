@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+
+# Caratteri con significato speciale nelle regex usate da str.contains
+REGEX_SPECIAL_CHARS = set('.^$*+?{}[]\\|()')
+
+
+class InvertedIndex:
+    """
+    Indice invertito di una colonna multi-valore (es. "Tom Hanks, Meg Ryan"): ogni token normalizzato
+    (separato da virgole, senza spazi ai bordi) è associato all'array ordinato delle posizioni di riga
+    in cui compare. Le posting list sono memorizzate in formato CSR (offsets, positions).
+    """
+
+    def __init__(self, values, separator=','):
+        series = pd.Series(values, copy=False).reset_index(drop=True)
+        self.n_rows = len(series)
+
+        tokens = series.astype('string').str.split(separator).explode().str.strip()
+        tokens = tokens[tokens.notna() & (tokens != '')]
+        pairs = pd.DataFrame({'position': tokens.index.to_numpy(), 'token': tokens.to_numpy(dtype=object)}).drop_duplicates()
+
+        codes, vocabulary = pd.factorize(pairs['token'], sort=True)
+        order = np.argsort(codes, kind='stable')  # per ogni token le posizioni restano crescenti
+
+        self.vocabulary = np.asarray(vocabulary, dtype=object)
+        self._vocabulary = pd.Series(self.vocabulary, dtype=object)
+        self._vocabulary_lower = self._vocabulary.str.lower()
+        self._token_ids = {token: i for i, token in enumerate(self.vocabulary)}
+        self.positions = pairs['position'].to_numpy()[order].astype(np.int32)
+        self.offsets = np.zeros(len(self.vocabulary) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(codes, minlength=len(self.vocabulary)), out=self.offsets[1:])
+
+    def _postings_of(self, token_ids):
+        if len(token_ids) == 0:
+            return np.empty(0, dtype=np.int32)
+        if len(token_ids) == 1:
+            i = token_ids[0]
+            return self.positions[self.offsets[i]:self.offsets[i + 1]]
+        return np.unique(np.concatenate([self.positions[self.offsets[i]:self.offsets[i + 1]] for i in token_ids]))
+
+    def postings(self, token):
+        """Posizioni delle righe che contengono esattamente il token."""
+        token_id = self._token_ids.get(token)
+        return self._postings_of([] if token_id is None else [token_id])
+
+    def postings_any(self, tokens):
+        """Unione delle posting list di più token esatti."""
+        return self._postings_of([self._token_ids[t] for t in tokens if t in self._token_ids])
+
+    def match(self, term, case_sensitive=True):
+        """
+        Posizioni ordinate delle righe con almeno un token che contiene term come sottostringa.
+        La ricerca scorre il vocabolario (valori distinti), non le righe del catalogo.
+        """
+        if term == '':
+            return np.arange(self.n_rows, dtype=np.int32)
+        if case_sensitive:
+            token_ids = np.flatnonzero(self._vocabulary.str.contains(term, regex=False).to_numpy())
+        else:
+            token_ids = np.flatnonzero(self._vocabulary_lower.str.contains(term.lower(), regex=False).to_numpy())
+        return self._postings_of(token_ids)
+
+    def match_any(self, terms, case_sensitive=True):
+        """Unione di match() per più termini."""
+        results = [self.match(term, case_sensitive) for term in terms]
+        if not results:
+            return np.empty(0, dtype=np.int32)
+        if len(results) == 1:
+            return results[0]
+        return np.unique(np.concatenate(results))
+
+
+def can_use_index(terms, separator=',', regex=False):
+    """
+    Un termine di ricerca per sottostringa equivale a una ricerca sui singoli token solo se non attraversa
+    il separatore e non ha spazi ai bordi; con str.contains(regex=True) non deve contenere metacaratteri.
+    """
+    for term in terms:
+        if separator in term or term != term.strip():
+            return False
+        if regex and REGEX_SPECIAL_CHARS.intersection(term):
+            return False
+    return True
+
+def positions_to_mask(positions, n_rows):
+    mask = np.zeros(n_rows, dtype=bool)
+    mask[positions] = True
+    return mask
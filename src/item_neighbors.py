@@ -0,0 +1,150 @@
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from scipy.sparse import issparse
+from src.catalog import file_signature
+from src.embeddings import artifact_source, saved_source, source_fields
+from src.scoring import row_sq_norms, top_k_neighbors, top_k_neighbors_batch
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+item_neighbors_path = os.path.normpath(os.path.join(current_dir, '..', 'data', 'item_neighbors.npz'))
+
+ITEM_NEIGHBORS_VERSION = 1
+# Vicini salvati per ogni film e film confrontati insieme con il catalogo in ogni blocco del calcolo
+DEFAULT_N_NEIGHBORS = int(os.getenv("ITEM_NEIGHBORS_K", "50"))
+DEFAULT_CHUNK_ROWS = 256
+
+
+def build_item_neighbors(matrix, k=DEFAULT_N_NEIGHBORS, sq_norms=None, chunk_rows=DEFAULT_CHUNK_ROWS, n_jobs=None, source=None):
+    """
+    Per ogni riga di matrix (spazio pesato delle feature) i k film più vicini, escluso il film stesso.
+    Le righe sono elaborate a blocchi di chunk_rows con top_k_neighbors_batch, in parallelo su n_jobs thread.
+    Il risultato è in formato CSR: i vicini della riga i sono indices[indptr[i]:indptr[i+1]], ordinati per distanza.
+    """
+    n_rows = matrix.shape[0]
+    if sq_norms is None:
+        sq_norms = row_sq_norms(matrix)
+
+    indptr = np.zeros(n_rows + 1, dtype=np.int64)
+    indices, distances = [], []
+    with ThreadPoolExecutor(max_workers=n_jobs or os.cpu_count() or 1) as executor:
+        for start in range(0, n_rows, chunk_rows):
+            stop = min(start + chunk_rows, n_rows)
+            profiles = matrix[start:stop]
+            profiles = profiles.toarray() if issparse(profiles) else np.asarray(profiles)
+            results = top_k_neighbors_batch(
+                matrix, profiles, [np.array([row]) for row in range(start, stop)], k,
+                sq_norms=sq_norms, executor=executor, return_distances=True,
+            )
+            for row, (positions, row_distances) in zip(range(start, stop), results):
+                indices.append(positions)
+                distances.append(row_distances)
+                indptr[row + 1] = indptr[row] + len(positions)
+
+    return {
+        "version": ITEM_NEIGHBORS_VERSION,
+        "source": source,
+        "indptr": indptr,
+        "indices": np.concatenate(indices).astype(np.int32) if indices else np.empty(0, dtype=np.int32),
+        "distances": np.concatenate(distances).astype(np.float32) if distances else np.empty(0, dtype=np.float32),
+    }
+
+def neighbors_of(neighbors, position):
+    """Vicini (posizioni nell'artefatto) e distanze di un film, in ordine di distanza."""
+    start, stop = neighbors["indptr"][position], neighbors["indptr"][position + 1]
+    return neighbors["indices"][start:stop], neighbors["distances"][start:stop]
+
+def recommend_from_neighbors(neighbors, vectors, liked_positions, mask, profile, k=20, sq_norms=None):
+    """
+    Raccomandazioni dalle liste dei vicini: i candidati sono l'unione dei vicini dei film piaciuti ammessi da mask,
+    rivalutati rispetto al profilo dell'utente (che tiene conto anche dei film non piaciuti) con la distanza
+    esatta. Il costo dipende dal numero di candidati, non dalla dimensione del catalogo.
+    Restituisce None se i candidati sono meno di k (es. filtri molto selettivi): serve la ricerca completa.
+    """
+    candidates = np.unique(np.concatenate([neighbors_of(neighbors, position)[0] for position in liked_positions]))
+    candidates = candidates[mask[candidates]]
+    if len(candidates) < k:
+        return None
+
+    candidate_mask = np.ones(len(candidates), dtype=bool)
+    candidate_sq_norms = sq_norms[candidates] if sq_norms is not None else None
+    top, _ = top_k_neighbors(vectors[candidates], candidate_mask, profile, k, sq_norms=candidate_sq_norms)
+    return candidates[top]
+
+def save_item_neighbors(neighbors, path=item_neighbors_path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp.npz"
+    np.savez(
+        tmp_path,
+        version=neighbors["version"],
+        **source_fields(neighbors["source"]),
+        indptr=neighbors["indptr"],
+        indices=neighbors["indices"],
+        distances=neighbors["distances"],
+    )
+    os.replace(tmp_path, path)
+
+def load_item_neighbors(path=item_neighbors_path, source=None):
+    """Carica le liste dei vicini salvate. Restituisce None se mancano o non corrispondono all'artefatto delle feature."""
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as data:
+        if int(data["version"]) != ITEM_NEIGHBORS_VERSION:
+            return None
+        file_source = saved_source(data)
+        if source is not None and file_source != source:
+            return None
+        neighbors = {key: data[key] for key in ("indptr", "indices", "distances")}
+    neighbors["version"] = ITEM_NEIGHBORS_VERSION
+    neighbors["source"] = file_source
+    return neighbors
+
+_item_neighbors = None
+_item_neighbors_checked = None
+
+def get_item_neighbors(artifact):
+    """
+    Restituisce le liste dei vicini condivise dal processo per l'artefatto delle feature dato, o None se mancano
+    o non sono aggiornate: il calcolo è offline (python -m src.item_neighbors), qui vengono soltanto lette.
+    """
+    global _item_neighbors, _item_neighbors_checked
+
+    source = artifact_source(artifact)
+    if _item_neighbors is not None and _item_neighbors["source"] == source:
+        return _item_neighbors
+
+    # Un file mancante o non aggiornato viene controllato di nuovo solo quando cambia
+    checked = (tuple(source.items()), file_signature(item_neighbors_path))
+    if checked == _item_neighbors_checked:
+        return None
+    _item_neighbors_checked = checked
+
+    neighbors = load_item_neighbors(item_neighbors_path, source=source)
+    if neighbors is None:
+        print("Item neighbours missing or stale: run python -m src.item_neighbors to rebuild them.")
+        return None
+    _item_neighbors = neighbors
+    return neighbors
+
+def similar_movies(artifact, movie_id, n=10):
+    """filmtv_id degli n film più simili a movie_id (vuoto se il film non è nell'artefatto o mancano le liste)."""
+    neighbors = get_item_neighbors(artifact)
+    position = artifact["id_positions"].get_indexer([movie_id])[0]
+    if neighbors is None or position < 0:
+        return artifact["filmtv_ids"][:0]
+    positions, _ = neighbors_of(neighbors, position)
+    return artifact["filmtv_ids"][positions[:n]]
+
+
+if __name__ == "__main__":
+    # Calcolo offline delle liste dei vicini: python -m src.item_neighbors [k]
+    from src.knn_model import get_feature_artifact
+
+    artifact = get_feature_artifact()
+    start = time.perf_counter()
+    k = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_N_NEIGHBORS
+    neighbors = build_item_neighbors(artifact["matrix"], k=k, sq_norms=artifact["row_sq_norms"], source=artifact_source(artifact))
+    save_item_neighbors(neighbors)
+    print(f"{len(neighbors['indices'])} neighbours for {artifact['matrix'].shape[0]} movies in {time.perf_counter() - start:.1f}s")
@@ -1,20 +1,45 @@
 import pandas as pd
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.preprocessing import StandardScaler
-from sklearn.neighbors import NearestNeighbors
 from sklearn.compose import ColumnTransformer
 import numpy as np
 import os
-from scipy.sparse import issparse
+import tempfile
+import threading
+import joblib
+from scipy.sparse import csr_matrix
+from src.catalog import file_signature, get_catalog, read_catalog, resolve_catalog_source, source_signature
+from src.filter_engine import ContainsAny, HasAnyToken, evaluate, range_predicate
+from src.scoring import top_k_neighbors, row_sq_norms
+from src.embeddings import EMBEDDING_MODES, artifact_source, get_embeddings, project, top_k_embeddings
+from src.ann_index import get_ivf_index, search_ivf
+from src.item_neighbors import get_item_neighbors, recommend_from_neighbors, similar_movies
+from src import profile_store, recommendation_cache
 
 current_dir = os.path.dirname(os.path.abspath(__file__))  # Directory corrente del file script
 csv_path = os.path.join(current_dir, '..', 'data', 'preprocessed_filmtv_movies.csv') # Percorso relativo al file CSV
+artifact_path = os.path.join(current_dir, '..', 'data', 'feature_artifact.joblib') # Artefatto delle feature precalcolate
 
 csv_path = os.path.normpath(csv_path)
+artifact_path = os.path.normpath(artifact_path)
+
+# Da incrementare ogni volta che cambiano colonne, pesi o parametri del ColumnTransformer
+FEATURE_ARTIFACT_VERSION = 3
+
+# "exact" usa la matrice TF-IDF completa, "float32"/"int8" gli embedding compatti (vedi src/embeddings.py),
+# "ann" l'indice IVF approssimato costruito sugli embedding float32 (vedi src/ann_index.py),
+# "neighbors" le liste precalcolate dei film simili (vedi src/item_neighbors.py)
+RECOMMENDATION_MODES = EMBEDDING_MODES + ("ann", "neighbors")
+RECOMMENDATION_MODE = os.getenv("RECOMMENDATION_MODE", "exact")
+
+
+class NoLikedMoviesError(ValueError):
+    """Nessuno dei film piaciuti all'utente è nel catalogo: impossibile costruire il profilo."""
+
+
+class FeatureArtifactMissingError(RuntimeError):
+    """L'artefatto delle feature manca o non è aggiornato: va costruito offline con python -m src.knn_model."""
 
-df0 = pd.read_csv(csv_path) 
-df1 = df0.copy()
-df1 = df1.dropna()
 
 SELECTED_COLUMNS = [
     'title', 'year', 'country', 'directors', 'actors', 'total_votes', 
@@ -22,8 +47,6 @@ SELECTED_COLUMNS = [
     'weighted_rating', 'duration_log', 'genre_encoded'
 ]
 
-df = df1[SELECTED_COLUMNS]
-
 NUMERIC_COLUMN_WEIGHTS = {
     'year': 1.0,
     'total_votes': 1.2,
@@ -43,114 +66,345 @@ TEXT_COLUMN_WEIGHTS = {
     'actors': 1.0
 }
 
+def _column_weights(column_transformer):
+    """Vettore dei pesi per ogni colonna dell'output del ColumnTransformer (blocchi TF-IDF + numeriche)."""
+    weights = []
+    for name, transformer, _ in column_transformer.transformers_:
+        if name == 'scaler_numeric':
+            weights.append(np.array(list(NUMERIC_COLUMN_WEIGHTS.values())))
+        elif name.startswith('tfidf_'):
+            col = name[len('tfidf_'):]
+            weights.append(np.full(len(transformer.vocabulary_), TEXT_COLUMN_WEIGHTS[col]))
+    return np.concatenate(weights)
+
 def preprocess_dataset(df):
     column_transformer = ColumnTransformer([
         ('tfidf_country', TfidfVectorizer(max_features=5000, min_df=2, max_df=0.8), 'country'),
         ('tfidf_directors', TfidfVectorizer(max_features=5000, min_df=2, max_df=0.8), 'directors'),
         ('tfidf_actors', TfidfVectorizer(max_features=5000, min_df=2, max_df=0.8), 'actors'),
         ('scaler_numeric', StandardScaler(), list(NUMERIC_COLUMN_WEIGHTS.keys())),
-    ], remainder='drop')
+    ], remainder='drop', sparse_threshold=1.0)
 
-    transformed_data = column_transformer.fit_transform(df)
+    transformed_data = csr_matrix(column_transformer.fit_transform(df))
 
-    if issparse(transformed_data):
-        transformed_data = transformed_data.toarray()
-
-    start_idx = 0
-    for col, weight in TEXT_COLUMN_WEIGHTS.items():
-        end_idx = start_idx + column_transformer.transformers_[list(TEXT_COLUMN_WEIGHTS.keys()).index(col)][1].vocabulary_.__len__()
-        transformed_data[:, start_idx:end_idx] *= weight
-        start_idx = end_idx
-
-    numeric_indices = slice(-len(NUMERIC_COLUMN_WEIGHTS), None)
-    transformed_data[:, numeric_indices] *= np.array(list(NUMERIC_COLUMN_WEIGHTS.values()))
+    # I pesi si applicano ai soli valori non nulli: la matrice resta sparsa (memoria proporzionale a nnz)
+    column_weights = _column_weights(column_transformer)
+    transformed_data.data *= column_weights[transformed_data.indices]
 
     return transformed_data, column_transformer
 
 
-def filter_movies(dataset, genre=None, max_duration=None, actors=None, directors=None, start_year=None, end_year=None):
-
-    filtered = dataset.copy()
-
-    if genre:
-        filtered = filtered[filtered['genre'].str.contains('|'.join(genre), case=False, na=False)]
-
-    if max_duration is not None:
-        filtered = filtered[filtered['duration'] <= max_duration]
-
-    if actors:
-        filtered = filtered[filtered['actors'].str.contains(actors, case=False, na=False)]
-
-    if directors:
-        filtered = filtered[filtered['directors'].str.contains(directors, case=False, na=False)]
+def build_feature_artifact(source_path=csv_path):
+    """Addestra il ColumnTransformer sull'intero catalogo e calcola la matrice pesata di tutti i film."""
+    catalog = read_catalog(source_path).dropna()
+    transformed_data, column_transformer = preprocess_dataset(catalog[SELECTED_COLUMNS])
+
+    return {
+        "version": FEATURE_ARTIFACT_VERSION,
+        # Firma del CSV, o del file binario se il catalogo esiste solo in quel formato
+        "source": file_signature(source_path) or source_signature(resolve_catalog_source(source_path)),
+        "column_transformer": column_transformer,
+        "matrix": transformed_data,
+        "row_sq_norms": row_sq_norms(transformed_data),
+        "filmtv_ids": catalog['filmtv_id'].to_numpy(),
+    }
+
+def save_feature_artifact(artifact, path=artifact_path):
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    # File temporaneo con nome univoco: due costruzioni contemporanee non scrivono sullo stesso file
+    with tempfile.NamedTemporaryFile(dir=directory, prefix=os.path.basename(path), suffix=".tmp", delete=False) as f:
+        tmp_path = f.name
+    try:
+        joblib.dump(artifact, tmp_path)
+        os.replace(tmp_path, path)  # Scrittura atomica: i processi in lettura non vedono mai un file parziale
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+def load_feature_artifact(path=artifact_path, source_path=csv_path):
+    """Carica l'artefatto salvato. Restituisce None se manca, è di un'altra versione o il CSV è cambiato."""
+    if not os.path.exists(path):
+        return None
+    try:
+        artifact = joblib.load(path)
+    except Exception as e:
+        print(f"Errore durante il caricamento dell'artefatto delle feature: {e}")
+        return None
+
+    if artifact.get("version") != FEATURE_ARTIFACT_VERSION:
+        return None
+    if not _source_is_current(artifact, source_path):
+        return None
+    return artifact
+
+def _source_is_current(artifact, source_path):
+    """
+    L'artefatto è costruito dal CSV attuale. Come per il catalogo binario (vedi catalog._binary_is_fresh),
+    se il CSV non esiste e il catalogo è distribuito solo come .arrow non c'è nulla con cui confrontarlo.
+    """
+    signature = file_signature(source_path)
+    return signature is None or artifact.get("source") == signature
+
+_feature_artifact = None
+_feature_artifact_lock = threading.Lock()
+
+def get_feature_artifact():
+    """
+    Restituisce l'artefatto delle feature condiviso dal processo, letto dal disco al primo uso o quando il
+    catalogo cambia. Non viene mai costruito durante una richiesta: se manca o non è aggiornato solleva
+    FeatureArtifactMissingError (va ricostruito offline con python -m src.knn_model).
+    """
+    global _feature_artifact
+
+    artifact = loaded_feature_artifact()
+    if artifact is not None:
+        return artifact
+
+    with _feature_artifact_lock:
+        # Un'altra sessione potrebbe averlo caricato mentre attendevamo il lock
+        artifact = loaded_feature_artifact()
+        if artifact is None:
+            artifact = load_feature_artifact(artifact_path, csv_path)
+            if artifact is None:
+                raise FeatureArtifactMissingError("Feature artifact missing or stale: build it with python -m src.knn_model.")
+            artifact["id_positions"] = pd.Index(artifact["filmtv_ids"])
+            _feature_artifact = artifact
+    return artifact
+
+
+def loaded_feature_artifact():
+    """L'artefatto delle feature se il processo lo ha già caricato ed è aggiornato, senza leggerlo dal disco; altrimenti None."""
+    if _feature_artifact is not None and _source_is_current(_feature_artifact, csv_path):
+        return _feature_artifact
+    return None
+
+def filter_positions(dataset, genre=None, max_duration=None, actors=None, directors=None, start_year=None, end_year=None, actor_names=None, director_names=None):
+    """
+    Posizioni di riga dei film che soddisfano i filtri (testo cercato senza distinguere maiuscole; i nomi
+    completi scelti tra i suggerimenti sono risolti sulle posting list).
+    """
+    return evaluate(dataset, [
+        ContainsAny('genre', genre, case_sensitive=False, regex=True) if genre else None,
+        range_predicate('duration', None, max_duration),
+        ContainsAny('actors', [actors], case_sensitive=False, regex=True) if actors else None,
+        ContainsAny('directors', [directors], case_sensitive=False, regex=True) if directors else None,
+        HasAnyToken('actors', actor_names) if actor_names else None,
+        HasAnyToken('directors', director_names) if director_names else None,
+        range_predicate('year', start_year, end_year),
+    ])
 
-    if start_year is not None:
-        filtered = filtered[filtered['year'] >= start_year]
-    if end_year is not None:
-        filtered = filtered[filtered['year'] <= end_year]
-
-    return filtered
-
-def get_recommendations(user_liked_movies_ids, user_disliked_movies_ids, filters):
-
-    current_dir = os.path.dirname(os.path.abspath(__file__))
-    csv_path = os.path.join(current_dir, '..', 'data', 'preprocessed_filmtv_movies.csv')
-    df = pd.read_csv(csv_path).dropna()
+def filter_movies(dataset, genre=None, max_duration=None, actors=None, directors=None, start_year=None, end_year=None):
+    return dataset.iloc[filter_positions(dataset, genre, max_duration, actors, directors, start_year, end_year)]
+
+def _artifact_positions(artifact, movie_ids):
+    """Converte una lista di filmtv_id nelle righe corrispondenti della matrice precalcolata."""
+    positions = artifact["id_positions"].get_indexer(pd.Index(movie_ids))
+    return positions[positions >= 0]
+
+def canonical_recommendation_filters(filters):
+    """Filtri di get_recommendations in forma normalizzata (attori e registi sono cercati senza distinguere maiuscole)."""
+    year_range = filters.get("year_range") or (None, None)
+    return {
+        "genre": sorted(set(filters.get("genre") or [])),
+        "max_duration": (filters.get("duration_range") or (None, None))[1],
+        "actor": (filters.get("actor") or "").lower(),
+        "director": (filters.get("director") or "").lower(),
+        "actor_names": sorted(set(filters.get("actor_names") or [])),
+        "director_names": sorted(set(filters.get("director_names") or [])),
+        "year_range": list(year_range),
+    }
+
+def model_version(mode):
+    """
+    Versione di catalogo, artefatto e modalità da cui dipendono le raccomandazioni. L'artefatto è identificato
+    dal catalogo da cui è costruito e da FEATURE_ARTIFACT_VERSION, senza leggerlo: una richiesta servita dalla
+    cache non carica l'artefatto. Il catalogo è identificato dal contenuto e non da percorso e mtime, così le
+    liste precalcolate in un altro checkout, su un'altra macchina o prima di un nuovo deploy restano valide.
+    """
+    return [get_catalog(csv_path).digest, FEATURE_ARTIFACT_VERSION, mode]
+
+def profile_version(artifact):
+    """Versione dell'artefatto da cui dipendono i profili salvati degli utenti (vedi src/profile_store.py)."""
+    return [FEATURE_ARTIFACT_VERSION, artifact["source"]["size"], artifact["source"]["mtime_ns"]]
+
+def filters_are_unrestricted(filters, dataset):
+    """True se i filtri non escludono nessun film del catalogo (nessun testo o genere, intervalli che coprono tutto)."""
+    canonical = canonical_recommendation_filters(filters)
+    if canonical["genre"] or canonical["actor"] or canonical["director"] or canonical["actor_names"] or canonical["director_names"]:
+        return False
+    max_duration = canonical["max_duration"]
+    start_year, end_year = canonical["year_range"]
+    return (
+        (max_duration is None or max_duration >= dataset['duration'].max())
+        and (start_year is None or start_year <= dataset['year'].min())
+        and (end_year is None or end_year >= dataset['year'].max())
+    )
 
-    filtered_df = filter_movies(
+def get_recommendations(user_liked_movies_ids, user_disliked_movies_ids, filters, mode=None, username=None, precomputed=None):
+    """
+    Raccomandazioni per il profilo e i filtri, riusate dalla cache se nulla è cambiato dall'ultima richiesta.
+    Con username le voci vengono eliminate quando l'utente aggiorna le sue liste. precomputed è la lista
+    salvata dal calcolo batch (src.batch_recommender): viene usata se i filtri non escludono nulla e la sua
+    impronta corrisponde al profilo e al modello attuali. Con username il profilo dell'utente è letto dal
+    profilo salvato (somme aggiornate a ogni reazione) invece di essere ricalcolato dai vettori dei film.
+    """
+    mode = mode or RECOMMENDATION_MODE
+    if mode not in RECOMMENDATION_MODES:
+        raise ValueError(f"Unknown recommendation mode: {mode}")
+
+    version = model_version(mode)
+    key = recommendation_cache.recommendation_key(
+        user_liked_movies_ids, user_disliked_movies_ids, canonical_recommendation_filters(filters), version
+    )
+    recommendations = recommendation_cache.get(key)
+    if recommendations is not None:
+        return recommendations
+
+    if precomputed and filters_are_unrestricted(filters, get_catalog(csv_path).frame):
+        unfiltered_key = recommendation_cache.recommendation_key(
+            user_liked_movies_ids, user_disliked_movies_ids, canonical_recommendation_filters({}), version
+        )
+        if precomputed.get("fingerprint") == unfiltered_key:
+            recommendations = np.asarray(precomputed["ids"])
+            recommendations.flags.writeable = False
+
+    if recommendations is None:
+        recommendations = compute_recommendations(user_liked_movies_ids, user_disliked_movies_ids, filters, mode, username)
+        # Un risultato calcolato ripiegando sulla ricerca esatta non va servito dopo la costruzione degli artefatti
+        if not mode_is_available(mode):
+            return recommendations
+    recommendation_cache.put(key, recommendations, username)
+    return recommendations
+
+def mode_is_available(mode):
+    """
+    True se gli artefatti derivati di mode (embedding, indice IVF, liste dei vicini) sono costruiti e aggiornati;
+    altrimenti compute_recommendations ripiega sulla ricerca esatta (o sugli embedding senza indice IVF).
+    """
+    if mode == "exact":
+        return True
+    artifact = get_feature_artifact()
+    if mode == "neighbors":
+        return get_item_neighbors(artifact) is not None
+    embeddings = get_embeddings(artifact)
+    return embeddings is not None and (mode != "ann" or get_ivf_index(embeddings) is not None)
+
+def get_similar_movies(movie_id, n=10):
+    """filmtv_id dei film più simili a movie_id, letti dalle liste precalcolate dei vicini (nessuno senza artefatto)."""
+    try:
+        artifact = get_feature_artifact()
+    except FeatureArtifactMissingError:
+        return np.array([], dtype=np.int64)
+    return similar_movies(artifact, movie_id, n)
+
+def compute_recommendations(user_liked_movies_ids, user_disliked_movies_ids, filters, mode, username=None):
+    """Con username il profilo è letto dal profilo salvato dell'utente invece di essere ricalcolato dai vettori dei film."""
+    # Le righe con valori mancanti non sono nell'artefatto e vengono scartate da _artifact_positions
+    df = get_catalog(csv_path).frame
+
+    filtered_positions = filter_positions(
         dataset=df,
         genre=filters.get("genre"),
         max_duration=filters.get("duration_range", (None, None))[1],
         actors=filters.get("actor"),
         directors=filters.get("director"),
+        actor_names=filters.get("actor_names"),
+        director_names=filters.get("director_names"),
         start_year=filters.get("year_range", (None, None))[0],
         end_year=filters.get("year_range", (None, None))[1]
     )
 
-    print(f"Number of movies after filtering: {len(filtered_df)}")
-    if filtered_df.empty:
+    print(f"Number of movies after filtering: {len(filtered_positions)}")
+    if len(filtered_positions) == 0:
         print("Filtered dataset is empty. Check the filters.")
         return []
 
-    filtered_df = filtered_df[
-        ~filtered_df['filmtv_id'].isin(user_liked_movies_ids + user_disliked_movies_ids)
-    ]
-
-    if filtered_df.empty:
-        print("Filtered dataset is empty after removing liked and disliked movies.")
-        return []
+    artifact = get_feature_artifact()
+    matrix = artifact["matrix"]
+    filmtv_ids = artifact["filmtv_ids"]
 
-    liked_data = df[df['filmtv_id'].isin(user_liked_movies_ids)]
-    disliked_data = df[df['filmtv_id'].isin(user_disliked_movies_ids)]
+    liked_positions = _artifact_positions(artifact, user_liked_movies_ids)
+    disliked_positions = _artifact_positions(artifact, user_disliked_movies_ids)
 
-    if liked_data.empty:
-        raise ValueError("No liked movies found in the dataset. Cannot generate recommendations.")
+    # Maschera sulle righe del catalogo: film che passano i filtri, esclusi quelli già valutati
+    mask = np.zeros(len(filmtv_ids), dtype=bool)
+    mask[_artifact_positions(artifact, df['filmtv_id'].to_numpy()[filtered_positions])] = True
+    mask[liked_positions] = False
+    mask[disliked_positions] = False
 
-    transformed_data, column_transformer = preprocess_dataset(filtered_df)
-    liked_transformed = column_transformer.transform(liked_data)
-    if issparse(liked_transformed):
-        liked_transformed = liked_transformed.toarray()
-    user_liked_profile = np.mean(liked_transformed, axis=0)
+    if not mask.any():
+        print("Filtered dataset is empty after removing liked and disliked movies.")
+        return []
 
-    if not disliked_data.empty:
-        disliked_transformed = column_transformer.transform(disliked_data)
-        if issparse(disliked_transformed):
-            disliked_transformed = disliked_transformed.toarray()
-        user_disliked_profile = np.mean(disliked_transformed, axis=0)
+    if len(liked_positions) == 0:
+        raise NoLikedMoviesError("No liked movies found in the dataset. Cannot generate recommendations.")
+
+    embeddings = None
+    if mode not in ("exact", "neighbors"):
+        embeddings = get_embeddings(artifact)
+        if embeddings is None:
+            # Embedding non ancora costruiti offline (python -m src.knn_model): ricerca esatta
+            mode = "exact"
+    vectors = matrix if embeddings is None else embeddings["vectors"]
+
+    user_profile = None
+    if username is not None:
+        user_profile = profile_store.load_profile_vector(
+            artifact, profile_version(artifact), username, user_liked_movies_ids, user_disliked_movies_ids
+        )
+
+    if user_profile is not None:
+        # La media è lineare: negli embedding il profilo è la proiezione di quello nello spazio completo
+        if embeddings is not None:
+            user_profile = project(embeddings, user_profile)
     else:
-        user_disliked_profile = np.zeros(user_liked_profile.shape)
-
-    user_profile = user_liked_profile - user_disliked_profile
-    user_profile = user_profile.reshape(1, -1)
-
-    filtered_transformed = column_transformer.transform(filtered_df)
-    if issparse(filtered_transformed):
-        filtered_transformed = filtered_transformed.toarray()
-
-    knn_model = NearestNeighbors(n_neighbors=20, metric='euclidean')
-    knn_model.fit(filtered_transformed)
-    _, indices = knn_model.kneighbors(user_profile)
-
-    recommended_movies_ids = filtered_df.iloc[indices[0]]['filmtv_id'].values
+        # Media calcolata direttamente sulle righe (CSR o embedding): solo il profilo (una riga) è denso
+        user_liked_profile = np.asarray(vectors[liked_positions].mean(axis=0)).ravel()
+
+        if len(disliked_positions) > 0:
+            user_disliked_profile = np.asarray(vectors[disliked_positions].mean(axis=0)).ravel()
+        else:
+            user_disliked_profile = np.zeros(user_liked_profile.shape, dtype=user_liked_profile.dtype)
+
+        user_profile = user_liked_profile - user_disliked_profile
+
+    positions = None
+    if mode == "neighbors":
+        neighbors = get_item_neighbors(artifact)
+        if neighbors is not None:
+            positions = recommend_from_neighbors(
+                neighbors, matrix, liked_positions, mask, user_profile, k=20, sq_norms=artifact["row_sq_norms"]
+            )
+
+    if positions is None:
+        # Anche per "neighbors" senza liste dei vicini o con troppo pochi candidati (filtri selettivi)
+        if mode in ("exact", "neighbors"):
+            positions, _ = top_k_neighbors(matrix, mask, user_profile, k=20, sq_norms=artifact["row_sq_norms"])
+        elif mode == "ann" and get_ivf_index(embeddings) is not None:
+            positions, _ = search_ivf(get_ivf_index(embeddings), vectors, user_profile, k=20, mask=mask, sq_norms=embeddings["sq_norms"])
+        else:
+            # Senza indice IVF costruito offline la modalità "ann" cerca in modo esatto sugli embedding float32
+            positions, _ = top_k_embeddings(embeddings, mask, user_profile, k=20, quantized=(mode == "int8"))
+
+    recommended_movies_ids = filmtv_ids[positions]
+    recommended_movies_ids.flags.writeable = False  # condiviso dalla cache
     return recommended_movies_ids
 
+
+if __name__ == "__main__":
+    # Costruzione offline dell'artefatto e degli embedding: python -m src.knn_model
+    from src.embeddings import build_embeddings, save_embeddings, embeddings_path
+    from src.ann_index import build_ivf_index, save_ivf_index, ann_index_path
+    from src.item_neighbors import build_item_neighbors, save_item_neighbors, item_neighbors_path
+
+    artifact = build_feature_artifact()
+    save_feature_artifact(artifact)
+    print(f"Feature artifact saved to {artifact_path}")
+    embeddings = build_embeddings(artifact["matrix"], source=artifact_source(artifact))
+    save_embeddings(embeddings)
+    print(f"Embeddings saved to {embeddings_path}")
+    save_ivf_index(build_ivf_index(embeddings["vectors"], source=embeddings["source"]))
+    print(f"ANN index saved to {ann_index_path}")
+    save_item_neighbors(build_item_neighbors(artifact["matrix"], sq_norms=artifact["row_sq_norms"], source=artifact_source(artifact)))
+    print(f"Item neighbours saved to {item_neighbors_path}")
@@ -0,0 +1,57 @@
+import threading
+from collections import deque
+import numpy as np
+
+
+class LatencyStats:
+    """Numero di operazioni e latenze (totale e massima, in secondi) per tipo di operazione."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def record(self, operation, elapsed):
+        with self._lock:
+            entry = self._stats.setdefault(operation, {"count": 0, "total": 0.0, "max": 0.0})
+            entry["count"] += 1
+            entry["total"] += elapsed
+            entry["max"] = max(entry["max"], elapsed)
+
+    def count(self, operation=None):
+        with self._lock:
+            if operation is not None:
+                return self._stats.get(operation, {"count": 0})["count"]
+            return sum(entry["count"] for entry in self._stats.values())
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                operation: dict(entry, mean=entry["total"] / entry["count"])
+                for operation, entry in self._stats.items()
+            }
+
+    def reset(self):
+        with self._lock:
+            self._stats = {}
+
+
+class LatencyReservoir:
+    """Ultime max_samples latenze (in secondi), per calcolare i percentili di coda."""
+
+    def __init__(self, max_samples=1000):
+        self._samples = deque(maxlen=max_samples)
+        self._lock = threading.Lock()
+
+    def record(self, elapsed):
+        with self._lock:
+            self._samples.append(elapsed)
+
+    def percentiles(self, quantiles=(50, 95, 99)):
+        with self._lock:
+            samples = np.fromiter(self._samples, dtype=float)
+        if len(samples) == 0:
+            return {f"p{q}": None for q in quantiles}
+        return {f"p{q}": float(value) for q, value in zip(quantiles, np.percentile(samples, quantiles))}
+
+    def __len__(self):
+        return len(self._samples)
@@ -1,15 +1,34 @@
+import os
 import streamlit as st
 import pandas as pd
 import requests
+from src.catalog import get_autocomplete, get_catalog
+
+OMDB_BASE_URL = os.getenv("OMDB_BASE_URL", "http://www.omdbapi.com/")
+OMDB_API_KEY = os.getenv("OMDB_API_KEY", "f34d45dd")
+OMDB_TIMEOUT = float(os.getenv("OMDB_TIMEOUT", "5"))
 
 def load_preprocessed_data(file_path):
+    """Restituisce il DataFrame del catalogo condiviso dal processo (letto dal disco solo se il file cambia)."""
     try:
-        movies = pd.read_csv(file_path)
+        movies = get_catalog(file_path).frame
         return movies
     except Exception as e:
         st.error(f"Errore durante il caricamento dei dati: {e}")
         return pd.DataFrame()
 
+def name_input(movies, column, label):
+    """
+    Campo di testo per attori o registi con i suggerimenti dei nomi che iniziano con il testo digitato.
+    Restituisce il testo digitato e i nomi scelti tra i suggerimenti.
+    """
+    text = st.text_input(label)
+    suggestions = get_autocomplete(movies, column).suggest(text) if text.strip() and not movies.empty else []
+    if not suggestions:
+        return text, []
+    selected = st.multiselect(f"Suggestions for \"{text.strip()}\"", options=suggestions, key=f"{column}_suggestions")
+    return text, selected
+
 def get_random_movies(movies_df, num_movies=30, min_avg_vote=7.5):  
     filtered_movies = movies_df[movies_df['avg_vote'] >= min_avg_vote]
     if len(filtered_movies) < num_movies:
@@ -17,17 +36,23 @@ def get_random_movies(movies_df, num_movies=30, min_avg_vote=7.5):
         num_movies = len(filtered_movies)
     return filtered_movies.sample(n=num_movies).to_dict(orient="records")
 
+def request_poster(title, year, session=None, timeout=None):
+    """
+    Interroga OMDb: URL del poster ("N/A" se il film non ne ha uno) o None se il film non è trovato.
+    Gli errori di rete e le risposte HTTP di errore vengono propagati. Con session le connessioni vengono riusate (keep-alive).
+    """
+    params = {"apikey": OMDB_API_KEY, "t": title, "y": year}
+    response = (session or requests).get(OMDB_BASE_URL, params=params, timeout=timeout or OMDB_TIMEOUT)
+    response.raise_for_status()
+    data = response.json()
+    if data.get("Response") == "True":
+        return data.get("Poster")
+    return None  # Nessun poster trovato
+
 def get_movie_poster(title, year):
     """Recupera il poster di un film utilizzando l'API OMDb."""
-    api_key = "f34d45dd"
-    url = f"http://www.omdbapi.com/?apikey={api_key}&t={title}&y={year}"
     try:
-        response = requests.get(url)
-        data = response.json()
-        if data.get("Response") == "True":
-            return data.get("Poster")
-        else:
-            return None  # Nessun poster trovato
+        return request_poster(title, year)
     except Exception as e:
         print(f"Errore durante il recupero del poster: {e}")
         return None
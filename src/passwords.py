@@ -0,0 +1,85 @@
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import bcrypt
+from src.metrics import LatencyStats
+
+# Fattore di lavoro di bcrypt per i nuovi hash; gli hash con un costo diverso vengono rigenerati al login
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Operazioni ammesse contemporaneamente (in esecuzione o in coda); oltre questo limite vengono rifiutate
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "32"))
+
+
+class HasherBusyError(RuntimeError):
+    """La coda del pool di hashing è piena."""
+
+
+def hash_rounds(hashed):
+    """Fattore di lavoro di un hash bcrypt ($2b$<costo>$...)."""
+    return int(hashed.split(b"$")[2])
+
+
+class PasswordHasher:
+    """
+    Hash e verifica delle password con bcrypt in un pool di thread dedicato (bcrypt rilascia il GIL),
+    così un picco di login non blocca i rerun delle altre sessioni. Le richieste oltre max_pending
+    vengono rifiutate con HasherBusyError invece di accodarsi senza limite.
+    """
+
+    def __init__(self, rounds=BCRYPT_ROUNDS, workers=PASSWORD_HASH_WORKERS, max_pending=PASSWORD_HASH_MAX_PENDING):
+        self.rounds = rounds
+        self.workers = workers
+        self.stats = LatencyStats()
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+        return self._executor
+
+    def _run(self, operation, function, *args):
+        if not self._slots.acquire(blocking=False):
+            self.stats.record("rejected", 0.0)
+            raise HasherBusyError("Too many password operations in progress.")
+
+        submitted = time.perf_counter()
+
+        def task():
+            started = time.perf_counter()
+            self.stats.record("queue_wait", started - submitted)
+            try:
+                return function(*args)
+            finally:
+                self.stats.record(operation, time.perf_counter() - started)
+                self._slots.release()
+
+        try:
+            future = self._get_executor().submit(task)
+        except BaseException:
+            self._slots.release()
+            raise
+        return future.result()
+
+    def hash(self, password):
+        return self._run("hash", lambda: bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(self.rounds)))
+
+    def verify(self, password, hashed):
+        return self._run("verify", bcrypt.checkpw, password.encode('utf-8'), hashed)
+
+    def needs_rehash(self, hashed):
+        return hash_rounds(hashed) != self.rounds
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,192 @@
+import os
+import time
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+import requests
+from requests.adapters import HTTPAdapter
+from src.cache import LRUCache
+from src.poster_client import PosterUnavailableError, poster_client
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+poster_cache_path = os.path.normpath(os.path.join(current_dir, '..', 'data', 'posters.sqlite'))
+
+# Durata in secondi dei poster trovati e delle risposte senza poster (ricontrollate più spesso)
+POSTER_TTL = int(os.getenv("POSTER_CACHE_TTL", str(30 * 24 * 3600)))
+POSTER_NEGATIVE_TTL = int(os.getenv("POSTER_CACHE_NEGATIVE_TTL", str(24 * 3600)))
+POSTER_MEMORY_ENTRIES = int(os.getenv("POSTER_CACHE_MEMORY_ENTRIES", "2048"))
+# Richieste a OMDb contemporanee del prefetch dei poster
+POSTER_PREFETCH_WORKERS = int(os.getenv("POSTER_PREFETCH_WORKERS", "8"))
+
+
+class PosterCache:
+    """
+    Cache persistente (SQLite) degli URL dei poster per (titolo, anno), con una cache LRU in memoria davanti.
+    Anche l'assenza del poster viene memorizzata (poster None), con una durata più breve.
+    """
+
+    def __init__(self, path=poster_cache_path, ttl=POSTER_TTL, negative_ttl=POSTER_NEGATIVE_TTL, memory_entries=POSTER_MEMORY_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.memory = LRUCache(max_entries=memory_entries)
+        self.counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "expired": 0}
+        self._lock = threading.Lock()
+        self._connection = None
+
+    def _connect(self):
+        if self._connection is None:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._connection = sqlite3.connect(self.path, check_same_thread=False)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS posters ("
+                "title TEXT NOT NULL, year TEXT NOT NULL, poster TEXT, expires_at REAL NOT NULL, "
+                "PRIMARY KEY (title, year))"
+            )
+        return self._connection
+
+    def _count(self, counter, record=True):
+        if record:
+            with self._lock:
+                self.counters[counter] += 1
+
+    def get(self, title, year, record=True):
+        """(True, poster) se (title, year) è in cache e non è scaduto, altrimenti (False, None); record=False non aggiorna le statistiche."""
+        key = (title, str(year))
+        now = time.time()
+        entry = self.memory.get(key)
+        if entry is not None and entry[1] > now:
+            self._count("memory_hits", record)
+            return True, entry[0]
+
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT poster, expires_at FROM posters WHERE title = ? AND year = ?", key
+            ).fetchone()
+        if row is not None and row[1] > now:
+            self.memory.put(key, row)
+            self._count("disk_hits", record)
+            return True, row[0]
+
+        self._count("expired" if row is not None else "misses", record)
+        return False, None
+
+    def put(self, title, year, poster):
+        key = (title, str(year))
+        expires_at = time.time() + (self.ttl if poster else self.negative_ttl)
+        with self._lock:
+            connection = self._connect()
+            connection.execute(
+                "INSERT OR REPLACE INTO posters (title, year, poster, expires_at) VALUES (?, ?, ?, ?)",
+                (*key, poster, expires_at),
+            )
+            connection.commit()
+        self.memory.put(key, (poster, expires_at))
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.counters)
+        lookups = sum(stats.values())
+        stats["hit_rate"] = (stats["memory_hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+        return stats
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+
+poster_cache = PosterCache()
+
+
+def get_cached_poster(title, year, cache=None, session=None, client=None):
+    """
+    URL del poster (None se non disponibile) letto dalla cache, o da OMDb (con il PosterClient) solo se assente
+    o scaduto. Gli errori di OMDb e il circuito aperto non vengono memorizzati, così la richiesta viene
+    ritentata alla visita successiva.
+    """
+    cache = cache or poster_cache
+    client = client or poster_client
+    found, poster = cache.get(title, year)
+    if found:
+        return poster
+
+    try:
+        poster = client.lookup(title, year, session)
+    except PosterUnavailableError as e:
+        print(f"Errore durante il recupero del poster: {e}")
+        return None
+
+    poster = None if poster in (None, "", "N/A") else poster
+    cache.put(title, year, poster)
+    return poster
+
+
+class PosterPrefetcher:
+    """
+    Recupera in parallelo i poster dei film di una pagina di risultati, al massimo max_workers alla volta,
+    su una requests.Session condivisa (connessioni keep-alive riusate). I poster finiscono nella cache,
+    così la pagina dei dettagli li trova già pronti; i film già in cache o già richiesti non vengono ripetuti.
+    """
+
+    def __init__(self, cache=None, max_workers=POSTER_PREFETCH_WORKERS):
+        self.cache = cache or poster_cache
+        self.max_workers = max_workers
+        self._executor = None
+        self._session = None
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def _start(self):
+        if self._executor is None:
+            self._session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_workers)
+            self._session.mount("http://", adapter)
+            self._session.mount("https://", adapter)
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="posters")
+
+    def _lookup(self, key):
+        try:
+            return get_cached_poster(*key, cache=self.cache, session=self._session)
+        finally:
+            with self._lock:
+                self._pending.pop(key, None)
+
+    def prefetch(self, movies):
+        """
+        Avvia senza attendere il recupero dei poster di movies (coppie titolo, anno) non ancora in cache.
+        Restituisce i future per chiave, da passare a wait() se la pagina deve attendere.
+        """
+        futures = {}
+        for title, year in movies:
+            key = (title, str(year))
+            if key in futures or self.cache.get(title, year, record=False)[0]:
+                continue
+            with self._lock:
+                self._start()
+                future = self._pending.get(key)
+                if future is None:
+                    future = self._executor.submit(self._lookup, key)
+                    self._pending[key] = future
+            futures[key] = future
+        return futures
+
+    def fetch_all(self, movies, timeout=None):
+        """Poster di tutti i movies (None se non disponibili o non arrivati entro timeout), recuperati in parallelo."""
+        movies = list(movies)
+        wait(self.prefetch(movies).values(), timeout=timeout)
+        return {(title, year): self.cache.get(title, year, record=False)[1] for title, year in movies}
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._session.close()
+                self._executor = None
+                self._session = None
+
+
+poster_prefetcher = PosterPrefetcher()
@@ -0,0 +1,164 @@
+import os
+import time
+import random
+import threading
+from collections import deque
+import requests
+from src.metrics import LatencyReservoir
+from src.movies_utils import OMDB_TIMEOUT, request_poster
+
+# Budget complessivo di una ricerca del poster (tentativi e attese comprese) e numero di nuovi tentativi
+OMDB_DEADLINE = float(os.getenv("OMDB_DEADLINE", "8"))
+OMDB_RETRIES = int(os.getenv("OMDB_RETRIES", "2"))
+OMDB_BACKOFF = float(os.getenv("OMDB_BACKOFF", "0.2"))
+# Il circuito si apre quando almeno BREAKER_ERROR_RATE degli ultimi BREAKER_WINDOW tentativi (minimo
+# BREAKER_MIN_REQUESTS) è fallito, e resta aperto per BREAKER_RESET_SECONDS prima di un tentativo di prova
+BREAKER_WINDOW = int(os.getenv("OMDB_BREAKER_WINDOW", "20"))
+BREAKER_MIN_REQUESTS = int(os.getenv("OMDB_BREAKER_MIN_REQUESTS", "5"))
+BREAKER_ERROR_RATE = float(os.getenv("OMDB_BREAKER_ERROR_RATE", "0.5"))
+BREAKER_RESET_SECONDS = float(os.getenv("OMDB_BREAKER_RESET_SECONDS", "30"))
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class PosterUnavailableError(RuntimeError):
+    """OMDb non ha risposto entro il budget o dopo tutti i tentativi."""
+
+
+class CircuitOpenError(PosterUnavailableError):
+    """Il circuito è aperto: la richiesta non viene nemmeno inviata."""
+
+
+class CircuitBreaker:
+    """
+    Interruttore sugli errori recenti: chiuso lascia passare le richieste, aperto le rifiuta subito,
+    trascorso reset_seconds passa a semiaperto e lascia passare una sola richiesta di prova,
+    che lo richiude se va a buon fine e lo riapre altrimenti.
+    """
+
+    def __init__(self, window=BREAKER_WINDOW, min_requests=BREAKER_MIN_REQUESTS, error_rate=BREAKER_ERROR_RATE, reset_seconds=BREAKER_RESET_SECONDS):
+        self.min_requests = min_requests
+        self.error_rate = error_rate
+        self.reset_seconds = reset_seconds
+        self._outcomes = deque(maxlen=window)
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.reset_seconds:
+                return HALF_OPEN
+            return self._state
+
+    def allow(self):
+        with self._lock:
+            if self._state == CLOSED:
+                return True
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.reset_seconds:
+                self._state = HALF_OPEN
+            if self._state == HALF_OPEN and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record(self, success):
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._trial_running = False
+                if success:
+                    self._state = CLOSED
+                    self._outcomes.clear()
+                else:
+                    self._open()
+                return
+
+            self._outcomes.append(success)
+            failures = self._outcomes.count(False)
+            if len(self._outcomes) >= self.min_requests and failures / len(self._outcomes) >= self.error_rate:
+                self._open()
+
+    def _open(self):
+        self._state = OPEN
+        self._opened_at = time.monotonic()
+        self._outcomes.clear()
+
+
+def _is_retryable(error):
+    if isinstance(error, requests.HTTPError):
+        status = error.response.status_code if error.response is not None else 500
+        return status >= 500 or status == 429
+    # Errori di connessione, timeout e risposte che non sono JSON
+    return isinstance(error, (requests.ConnectionError, requests.Timeout, ValueError))
+
+
+class PosterClient:
+    """
+    Client OMDb dei poster: ogni tentativo ha un timeout (mai oltre il budget residuo), gli errori transitori
+    vengono ritentati con backoff esponenziale e jitter entro il budget totale, e un circuit breaker evita
+    di insistere su un OMDb in errore. Espone lo stato del circuito e i percentili di latenza.
+    """
+
+    def __init__(self, timeout=OMDB_TIMEOUT, deadline=OMDB_DEADLINE, retries=OMDB_RETRIES, backoff=OMDB_BACKOFF, breaker=None):
+        self.timeout = timeout
+        self.deadline = deadline
+        self.retries = retries
+        self.backoff = backoff
+        self.breaker = breaker or CircuitBreaker()
+        self.latency = LatencyReservoir()
+        self.counters = {"lookups": 0, "attempts": 0, "retries": 0, "failures": 0, "short_circuits": 0}
+        self._lock = threading.Lock()
+
+    def _count(self, counter):
+        with self._lock:
+            self.counters[counter] += 1
+
+    def lookup(self, title, year, session=None):
+        """Come request_poster, ma con timeout, tentativi e circuit breaker; solleva PosterUnavailableError se OMDb non risponde."""
+        self._count("lookups")
+        start = time.monotonic()
+        last_error = "deadline exceeded"
+        try:
+            for attempt in range(self.retries + 1):
+                remaining = self.deadline - (time.monotonic() - start)
+                if remaining <= 0:
+                    break
+                if not self.breaker.allow():
+                    self._count("short_circuits")
+                    raise CircuitOpenError("OMDb circuit is open.")
+
+                self._count("attempts")
+                try:
+                    poster = request_poster(title, year, session, timeout=min(self.timeout, remaining))
+                except Exception as e:
+                    self.breaker.record(False)
+                    if not _is_retryable(e):
+                        self._count("failures")
+                        raise PosterUnavailableError(str(e)) from e
+                    last_error = e
+                else:
+                    self.breaker.record(True)
+                    return poster
+
+                # Backoff esponenziale con jitter completo, senza superare il budget
+                if attempt < self.retries:
+                    self._count("retries")
+                    pause = random.uniform(0, self.backoff * 2 ** attempt)
+                    time.sleep(max(0.0, min(pause, self.deadline - (time.monotonic() - start))))
+
+            self._count("failures")
+            raise PosterUnavailableError(f"OMDb unavailable: {last_error}")
+        finally:
+            self.latency.record(time.monotonic() - start)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.counters)
+        stats["breaker_state"] = self.breaker.state
+        stats.update(self.latency.percentiles())
+        return stats
+
+
+poster_client = PosterClient()
@@ -0,0 +1,172 @@
+import hashlib
+import os
+import sys
+import time
+import numpy as np
+from pymongo import ReplaceOne
+from src.db import get_profiles_collection, get_users_collection
+
+# Utenti letti e profili scritti per pagina dal job di ricostruzione
+PROFILE_REBUILD_PAGE_SIZE = int(os.getenv("PROFILE_REBUILD_PAGE_SIZE", "256"))
+# Liste dell'utente (campo del documento utente) e sezione corrispondente del profilo
+PROFILE_LISTS = {"preferences": "liked", "disliked": "disliked"}
+
+
+def _positions(artifact, movie_ids):
+    positions = artifact["id_positions"].get_indexer(list(movie_ids))
+    return positions[positions >= 0]
+
+def ids_digest(movie_ids):
+    """Impronta (sha256) dell'insieme degli id di una lista, indipendente dall'ordine."""
+    return hashlib.sha256(",".join(map(str, sorted({int(movie_id) for movie_id in movie_ids}))).encode()).hexdigest()
+
+def _list_profile(artifact, movie_ids):
+    """
+    Somma dei vettori dei film (solo le colonne non nulle, con l'indice di colonna come chiave) e numero di film
+    nell'artefatto. digest identifica la lista da cui è calcolata, per riconoscere un profilo non aggiornato.
+    """
+    positions = _positions(artifact, movie_ids)
+    sums = np.asarray(artifact["matrix"][positions].sum(axis=0)).ravel()
+    columns = np.flatnonzero(sums)
+    return {
+        "sum": {str(column): float(sums[column]) for column in columns},
+        "count": int(len(positions)),
+        "digest": ids_digest(movie_ids),
+    }
+
+def build_profile(artifact, version, username, liked, disliked):
+    """Documento del profilo di un utente calcolato dalle sue liste."""
+    return {
+        "username": username,
+        "version": version,
+        "liked": _list_profile(artifact, liked),
+        "disliked": _list_profile(artifact, disliked),
+    }
+
+def _matches(profile, version, liked, disliked):
+    return (
+        profile.get("version") == version
+        and all(
+            profile[section].get("digest") == ids_digest(movie_ids)
+            for section, movie_ids in (("liked", liked), ("disliked", disliked))
+        )
+    )
+
+def profile_vector(profile, n_features):
+    """Media dei film piaciuti meno media dei non piaciuti, nello spazio completo delle feature (come in get_recommendations)."""
+    vector = np.zeros(n_features)
+    for section, sign in (("liked", 1.0), ("disliked", -1.0)):
+        count = profile[section]["count"]
+        if count == 0:
+            continue
+        sums = profile[section]["sum"]
+        columns = np.fromiter((int(column) for column in sums), dtype=np.int64, count=len(sums))
+        values = np.fromiter(sums.values(), dtype=np.float64, count=len(sums))
+        vector[columns] += sign * values / count
+    return vector
+
+def load_profile_vector(artifact, version, username, liked, disliked, collection=None):
+    """
+    Vettore del profilo di username dal documento salvato: una find_one e O(dimensione) operazioni, senza
+    rileggere i vettori dei film. Se manca o non corrisponde alle liste o al modello attuali viene ricalcolato e salvato.
+    """
+    collection = collection if collection is not None else get_profiles_collection()
+    profile = collection.find_one({"username": username}, {"_id": 0})
+    if profile is None or not _matches(profile, version, liked, disliked):
+        profile = build_profile(artifact, version, username, liked, disliked)
+        collection.replace_one({"username": username}, profile, upsert=True)
+    return profile_vector(profile, artifact["matrix"].shape[1])
+
+def reaction_update(artifact, movie_id, changes, lists):
+    """
+    Update di una reazione: changes contiene (lista, segno) per ogni lista a cui il film è stato aggiunto (+1)
+    o da cui è stato tolto (-1), lists le liste dell'utente dopo la reazione. Solo le colonne non nulle del vettore
+    del film vengono incrementate; l'impronta delle liste modificate viene sostituita.
+    """
+    increments, digests = {}, {}
+    position = artifact["id_positions"].get_indexer([movie_id])[0]
+    for field, sign in changes:
+        section = PROFILE_LISTS[field]
+        digests[f"{section}.digest"] = ids_digest(lists[field])
+        if position < 0:
+            continue
+        increments[f"{section}.count"] = sign
+        row = artifact["matrix"][position]
+        for column, value in zip(row.indices, row.data):
+            increments[f"{section}.sum.{column}"] = sign * float(value)
+    update = {"$set": digests}
+    if increments:
+        update["$inc"] = increments
+    return update
+
+def apply_reaction(username, movie_id, changes, lists, collection=None):
+    """
+    Aggiorna il profilo salvato dopo una reazione con un solo update atomico. Se l'utente non ha un profilo
+    del modello attuale non corrisponde nessun documento e non cambia nulla. Lo stesso se il processo non ha
+    ancora caricato l'artefatto delle feature: l'impronta salvata non corrisponde più alle liste, quindi
+    in entrambi i casi il profilo sarà ricalcolato alla prossima raccomandazione.
+    """
+    if not changes:
+        return False
+
+    from src import knn_model
+    artifact = knn_model.loaded_feature_artifact()
+    if artifact is None:
+        return False
+    collection = collection if collection is not None else get_profiles_collection()
+    result = collection.update_one(
+        {"username": username, "version": knn_model.profile_version(artifact)},
+        reaction_update(artifact, movie_id, changes, lists)
+    )
+    return result.matched_count == 1
+
+def invalidate_profiles(usernames, collection=None):
+    """Elimina i profili salvati (es. dopo la sostituzione di un'intera lista): saranno ricalcolati al prossimo uso."""
+    collection = collection if collection is not None else get_profiles_collection()
+    collection.delete_many({"username": {"$in": list(usernames)}})
+
+
+def rebuild_profiles(users=None, profiles=None, force=False, page_size=PROFILE_REBUILD_PAGE_SIZE):
+    """
+    Ricalcola i profili salvati per il modello attuale. Senza force solo quelli di una versione precedente
+    (da eseguire dopo la ricostruzione dell'artefatto delle feature); con force quelli di tutti gli utenti.
+    """
+    from src import knn_model
+    from src.batch_recommender import iter_user_pages
+
+    users = users if users is not None else get_users_collection()
+    profiles = profiles if profiles is not None else get_profiles_collection()
+    artifact = knn_model.get_feature_artifact()
+    version = knn_model.profile_version(artifact)
+
+    if force:
+        pages = iter_user_pages(users, page_size)
+    else:
+        stale = [profile["username"] for profile in profiles.find({"version": {"$ne": version}}, {"_id": 0, "username": 1})]
+        pages = (
+            list(users.find({"username": {"$in": stale[start:start + page_size]}}, {"username": 1, "preferences": 1, "disliked": 1}))
+            for start in range(0, len(stale), page_size)
+        )
+
+    stats = {"pages": 0, "written": 0}
+    for page in pages:
+        operations = [
+            ReplaceOne(
+                {"username": user["username"]},
+                build_profile(artifact, version, user["username"], user.get("preferences") or [], user.get("disliked") or []),
+                upsert=True,
+            )
+            for user in page
+        ]
+        if operations:
+            profiles.bulk_write(operations, ordered=False)
+        stats["pages"] += 1
+        stats["written"] += len(operations)
+    return stats
+
+
+if __name__ == "__main__":
+    # Ricostruzione dei profili dopo un cambio di modello: python -m src.profile_store [--all]
+    start = time.perf_counter()
+    stats = rebuild_profiles(force="--all" in sys.argv[1:])
+    print(f"{stats['written']} profiles rebuilt in {stats['pages']} pages in {time.perf_counter() - start:.1f}s")
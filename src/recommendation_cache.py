@@ -0,0 +1,81 @@
+import os
+import json
+import hashlib
+import threading
+from src.cache import LRUCache
+
+# Chiavi calcolate per ogni utente, per eliminarle quando cambiano le sue liste, e utenti di ogni chiave:
+# contengono solo chiavi presenti in cache, quindi restano limitati come la cache
+_user_keys = {}
+_key_users = {}
+_lock = threading.Lock()
+
+
+def _forget(key):
+    """Toglie key dagli indici per utente (voce scartata dalla cache o eliminata)."""
+    with _lock:
+        for username in _key_users.pop(key, ()):
+            keys = _user_keys.get(username)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del _user_keys[username]
+
+
+# Raccomandazioni per profilo, filtri e versione del modello, condivise dalle sessioni del processo
+recommendation_cache = LRUCache(
+    max_entries=int(os.getenv("RECOMMENDATION_CACHE_MAX_ENTRIES", "512")),
+    max_bytes=int(os.getenv("RECOMMENDATION_CACHE_MAX_BYTES", str(32 * 1024 * 1024))),
+    on_evict=_forget,
+)
+
+
+def _ids(movie_ids):
+    return sorted({int(movie_id) for movie_id in movie_ids})
+
+
+def recommendation_key(liked_ids, disliked_ids, filters, model_version):
+    """Impronta (sha256) di film piaciuti e non piaciuti ordinati, filtri normalizzati e versione del modello."""
+    payload = json.dumps([_ids(liked_ids), _ids(disliked_ids), filters, model_version], default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def get(key):
+    return recommendation_cache.get(key)
+
+
+def put(key, recommendations, username=None):
+    if username is not None:
+        with _lock:
+            _user_keys.setdefault(username, set()).add(key)
+            _key_users.setdefault(key, set()).add(username)
+    recommendation_cache.put(key, recommendations)
+    # Valore non memorizzato (più grande dell'intera cache): la chiave non resta negli indici
+    if username is not None and key not in recommendation_cache:
+        _forget(key)
+
+
+def invalidate_user(username):
+    """
+    Elimina le raccomandazioni calcolate per username (chiamata quando cambiano le sue liste). La chiave
+    dipende solo dal contenuto, quindi una voce usata anche da altri utenti resta in cache per loro.
+    """
+    unused = []
+    with _lock:
+        for key in _user_keys.pop(username, ()):
+            users = _key_users.get(key)
+            if users is not None:
+                users.discard(username)
+                if not users:
+                    del _key_users[key]
+                    unused.append(key)
+    for key in unused:
+        recommendation_cache.pop(key)
+
+
+def clear():
+    # on_evict toglie ogni chiave svuotata dagli indici per utente; vengono svuotati comunque anche loro
+    recommendation_cache.clear()
+    with _lock:
+        _user_keys.clear()
+        _key_users.clear()
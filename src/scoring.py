@@ -0,0 +1,94 @@
+import numpy as np
+from scipy.sparse import issparse
+
+
+def row_sq_norms(matrix):
+    """Norma euclidea al quadrato di ogni riga, per matrici sparse (CSR) o dense."""
+    if issparse(matrix):
+        return np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel()
+    return np.einsum('ij,ij->i', matrix, matrix, dtype=np.float64)
+
+
+def top_k_neighbors(matrix, mask, profile, k=20, sq_norms=None, profile_sq_norm=None):
+    """
+    Restituisce le posizioni (righe di matrix, sparsa o densa) dei k film più vicini al profilo tra quelli ammessi da mask,
+    ordinate per distanza euclidea crescente, insieme alle distanze.
+    Se i candidati sono meno di k li restituisce tutti invece di sollevare un errore.
+    profile_sq_norm sostituisce ||profile||^2 quando il profilo passato è riscalato (vettori quantizzati).
+    """
+    candidate_positions = np.flatnonzero(mask)
+    if len(candidate_positions) == 0 or k <= 0:
+        return candidate_positions[:0], np.empty(0)
+
+    candidates = matrix[candidate_positions]
+    if sq_norms is None:
+        candidate_sq_norms = row_sq_norms(candidates)
+    else:
+        candidate_sq_norms = sq_norms[candidate_positions]
+
+    # ||x - p||^2 = ||x||^2 - 2 x·p + ||p||^2: un solo prodotto matrice-vettore sui candidati
+    if profile_sq_norm is None:
+        profile_sq_norm = profile @ profile
+    sq_distances = candidate_sq_norms - 2 * (candidates @ profile) + profile_sq_norm
+    np.maximum(sq_distances, 0, out=sq_distances)
+
+    if k < len(candidate_positions):
+        top = np.argpartition(sq_distances, k - 1)[:k]
+    else:
+        top = np.arange(len(candidate_positions))
+    top = top[np.argsort(sq_distances[top], kind='stable')]
+
+    return candidate_positions[top], np.sqrt(sq_distances[top])
+
+
+def _block_top_k(matrix, start, stop, profiles, profile_sq_norms, sq_norms, exclude, k):
+    """Top-k locale delle righe start:stop per tutti i profili: (posizioni, distanze^2), entrambe k x n_profili."""
+    block = matrix[start:stop]
+    # Prodotto matrice-matrice: distanze di tutte le righe del blocco da tutti i profili
+    sq_distances = np.asarray(block @ profiles.T, dtype=np.float64)
+    sq_distances *= -2
+    sq_distances += sq_norms[start:stop, None]
+    sq_distances += profile_sq_norms[None, :]
+    np.maximum(sq_distances, 0, out=sq_distances)
+
+    for column, positions in enumerate(exclude):
+        inside = positions[(positions >= start) & (positions < stop)]
+        sq_distances[inside - start, column] = np.inf
+
+    if k < stop - start:
+        top = np.argpartition(sq_distances, k - 1, axis=0)[:k]
+    else:
+        top = np.broadcast_to(np.arange(stop - start)[:, None], sq_distances.shape)
+    return top + start, np.take_along_axis(sq_distances, top, axis=0)
+
+
+def top_k_neighbors_batch(matrix, profiles, exclude, k=20, sq_norms=None, block_rows=4096, executor=None, return_distances=False):
+    """
+    Versione a blocchi di top_k_neighbors per molti profili insieme (righe di profiles, dense): le righe di matrix
+    sono divise in blocchi, ogni blocco è confrontato con tutti i profili con un prodotto matrice-matrice
+    (in parallelo se è dato un executor) e i top-k locali vengono fusi. exclude contiene per ogni profilo
+    le posizioni da escludere. Restituisce per ogni profilo le posizioni ordinate per distanza crescente
+    (e, con return_distances, le distanze).
+    """
+    profiles = np.asarray(profiles)
+    n_rows = matrix.shape[0]
+    if sq_norms is None:
+        sq_norms = row_sq_norms(matrix)
+    profile_sq_norms = np.einsum('ij,ij->i', profiles, profiles, dtype=np.float64)
+    exclude = [np.asarray(positions, dtype=np.int64) for positions in exclude]
+
+    starts = range(0, n_rows, block_rows)
+    run = lambda start: _block_top_k(matrix, start, min(start + block_rows, n_rows), profiles, profile_sq_norms, sq_norms, exclude, k)
+    blocks = list(executor.map(run, starts)) if executor is not None else [run(start) for start in starts]
+
+    positions = np.concatenate([block[0] for block in blocks], axis=0)
+    sq_distances = np.concatenate([block[1] for block in blocks], axis=0)
+    results = []
+    for column in range(profiles.shape[0]):
+        order = np.argsort(sq_distances[:, column], kind='stable')
+        order = order[np.isfinite(sq_distances[order, column])][:k]
+        if return_distances:
+            results.append((positions[order, column], np.sqrt(sq_distances[order, column])))
+        else:
+            results.append(positions[order, column])
+    return results
@@ -0,0 +1,155 @@
+import re
+import unicodedata
+import numpy as np
+import pandas as pd
+
+# Parametri BM25
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_WORD_RE = re.compile(r'\w+')
+_COMBINING_RE = re.compile('[\u0300-\u036f]')  # Diacritici separati dalla decomposizione NFKD
+_SEPARATOR = '\x00'  # Separa i documenti concatenati: nessun trigramma lo attraversa
+
+
+def fold(text):
+    """Normalizza il testo per la ricerca: senza accenti (è -> e, ë -> e) e senza distinzione di maiuscole."""
+    if text.isascii():
+        return text.lower()
+    return _COMBINING_RE.sub('', unicodedata.normalize('NFKD', text)).casefold()
+
+def _codepoints(text):
+    return np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32).astype(np.int64)
+
+def _group_sorted(keys):
+    """Chiavi distinte e offsets di un array di chiavi già ordinato."""
+    if len(keys) == 0:
+        return keys, np.zeros(1, dtype=np.int64)
+    boundaries = np.flatnonzero(np.diff(keys)) + 1
+    starts = np.concatenate([[0], boundaries]).astype(np.int64)
+    offsets = np.append(starts, len(keys))
+    return keys[starts], offsets
+
+
+class TextIndex:
+    """
+    Indice full-text di una colonna di testo (titolo o descrizione), con il testo normalizzato da fold():
+    - un indice di trigrammi per la ricerca di sottostringhe (find),
+    - un indice di parole con frequenze per l'ordinamento BM25 (rank).
+    """
+
+    def __init__(self, values):
+        series = pd.Series(values, copy=False).reset_index(drop=True)
+        self.n_rows = len(series)
+        self.folded = pd.Series([fold(v) if isinstance(v, str) else '' for v in series], dtype=object)
+        self._build_trigrams()
+        self._build_words()
+
+    def _build_trigrams(self):
+        lengths = self.folded.str.len().to_numpy() + 1
+        codepoints = _codepoints(_SEPARATOR.join(self.folded) + _SEPARATOR)
+        rows = np.repeat(np.arange(self.n_rows, dtype=np.int64), lengths)
+
+        # I caratteri vengono rinumerati sull'alfabeto del corpus: trigramma e riga entrano in un solo int64,
+        # così raggruppamento ed eliminazione dei duplicati sono un unico ordinamento
+        self._alphabet = np.unique(codepoints)
+        char_ids = np.searchsorted(self._alphabet, codepoints)
+        separator_id = np.searchsorted(self._alphabet, 0)
+        valid = (char_ids[:-2] != separator_id) & (char_ids[1:-1] != separator_id) & (char_ids[2:] != separator_id)
+        codes = self._trigram_codes(char_ids)[valid]
+
+        packed = np.unique(codes * max(self.n_rows, 1) + rows[:-2][valid])
+        self._trigrams, self._trigram_offsets = _group_sorted(packed // max(self.n_rows, 1))
+        self._trigram_positions = (packed % max(self.n_rows, 1)).astype(np.int32)
+
+    def _trigram_codes(self, char_ids):
+        size = len(self._alphabet)
+        return (char_ids[:-2] * size + char_ids[1:-1]) * size + char_ids[2:]
+
+    def _build_words(self):
+        words = self.folded.str.findall(_WORD_RE).explode().dropna()
+        term_ids, vocabulary = pd.factorize(words)
+        pairs = pd.DataFrame({'term': term_ids, 'row': words.index.to_numpy()}).value_counts().reset_index()
+        terms, rows = pairs['term'].to_numpy(), pairs['row'].to_numpy()
+        order = np.lexsort((rows, terms))
+
+        self._vocabulary = {term: i for i, term in enumerate(vocabulary)}
+        self._word_offsets = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(terms, minlength=len(vocabulary)), out=self._word_offsets[1:])
+        self._word_positions = rows[order].astype(np.int32)
+        self._word_tf = pairs['count'].to_numpy()[order].astype(np.float32)
+        self._doc_lengths = np.bincount(words.index.to_numpy(dtype=np.int64), minlength=self.n_rows).astype(np.float32)
+        self._avg_doc_length = max(float(self._doc_lengths.mean()) if self.n_rows else 0.0, 1.0)
+
+    def _trigram_postings(self, code):
+        i = np.searchsorted(self._trigrams, code)
+        if i == len(self._trigrams) or self._trigrams[i] != code:
+            return np.empty(0, dtype=np.int32)
+        return self._trigram_positions[self._trigram_offsets[i]:self._trigram_offsets[i + 1]]
+
+    def find(self, query, candidates=None):
+        """
+        Posizioni ordinate delle righe che contengono query (normalizzata) come sottostringa.
+        Le posting list dei trigrammi vengono intersecate dalla più corta e solo i candidati rimasti
+        vengono verificati sul testo: il costo dipende dai risultati, non dalla dimensione del catalogo.
+        """
+        query = fold(query)
+        if candidates is not None:
+            candidates = np.asarray(candidates)
+
+        if len(query) >= 3:
+            codepoints = _codepoints(query)
+            char_ids = np.searchsorted(self._alphabet, codepoints)
+            if np.any(char_ids == len(self._alphabet)) or np.any(self._alphabet[np.minimum(char_ids, len(self._alphabet) - 1)] != codepoints):
+                return np.empty(0, dtype=np.int32)  # Un carattere che non compare nel corpus
+            postings = sorted((self._trigram_postings(code) for code in set(self._trigram_codes(char_ids).tolist())), key=len)
+            for posting in postings:
+                candidates = posting if candidates is None else np.intersect1d(candidates, posting, assume_unique=True)
+                if len(candidates) == 0:
+                    return candidates.astype(np.int32)
+        elif candidates is None:
+            # Query di uno o due caratteri: nessun trigramma utilizzabile, si verificano tutte le righe
+            candidates = np.arange(self.n_rows, dtype=np.int32)
+
+        texts = self.folded.to_numpy()[candidates]
+        keep = np.fromiter((query in text for text in texts), dtype=bool, count=len(texts))
+        return candidates[keep]
+
+    def scores(self, query, candidates=None):
+        """Punteggi BM25 della query per le righe candidate (ordinate) o per tutte le righe che contengono almeno un termine."""
+        positions, contributions = [], []
+        for term in set(_WORD_RE.findall(fold(query))):
+            term_id = self._vocabulary.get(term)
+            if term_id is None:
+                continue
+            start, end = self._word_offsets[term_id], self._word_offsets[term_id + 1]
+            rows, tf = self._word_positions[start:end], self._word_tf[start:end]
+            idf = np.log(1 + (self.n_rows - len(rows) + 0.5) / (len(rows) + 0.5))
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * self._doc_lengths[rows] / self._avg_doc_length)
+            positions.append(rows)
+            contributions.append(idf * tf * (BM25_K1 + 1) / (tf + norm))
+
+        if candidates is None:
+            if not positions:
+                return np.empty(0, dtype=np.int32), np.empty(0)
+            candidates = np.unique(np.concatenate(positions))
+        candidates = np.asarray(candidates)
+
+        result = np.zeros(len(candidates))
+        for rows, contribution in zip(positions, contributions):
+            idx = np.searchsorted(candidates, rows)
+            idx[idx == len(candidates)] = 0
+            hit = candidates[idx] == rows
+            np.add.at(result, idx[hit], contribution[hit])
+        return candidates, result
+
+    def rank(self, query, candidates=None, limit=None):
+        """Posizioni ordinate per rilevanza BM25 decrescente (a parità di punteggio, in ordine di catalogo)."""
+        candidates, scores = self.scores(query, candidates)
+        order = np.lexsort((candidates, -scores))
+        ranked = candidates[order]
+        return ranked if limit is None else ranked[:limit]
+
+    def search(self, query, limit=None):
+        """Righe che contengono query come sottostringa, ordinate per rilevanza BM25."""
+        return self.rank(query, self.find(query), limit)
@@ -0,0 +1,144 @@
+import io
+import os
+import time
+import hashlib
+import sqlite3
+import threading
+import requests
+from PIL import Image
+from src.movies_utils import OMDB_TIMEOUT
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+thumbnails_dir = os.path.normpath(os.path.join(current_dir, '..', 'data', 'thumbnails'))
+
+# Dimensioni massime (larghezza, altezza) delle miniature usate dall'interfaccia
+THUMBNAIL_SIZES = {"details": (400, 600)}
+THUMBNAIL_QUALITY = int(os.getenv("THUMBNAIL_QUALITY", "85"))
+THUMBNAIL_CACHE_MAX_BYTES = int(os.getenv("THUMBNAIL_CACHE_MAX_BYTES", str(200 * 1024 * 1024)))
+
+
+def make_thumbnail(image_bytes, size, quality=THUMBNAIL_QUALITY):
+    """JPEG ridimensionato (mantenendo le proporzioni, mai ingrandito) e ricompresso dell'immagine."""
+    with Image.open(io.BytesIO(image_bytes)) as image:
+        image = image.convert("RGB")
+        image.thumbnail(size, Image.Resampling.LANCZOS)
+        output = io.BytesIO()
+        image.save(output, format="JPEG", quality=quality, optimize=True, progressive=True)
+    return output.getvalue()
+
+
+class ThumbnailStore:
+    """
+    Miniature dei poster su disco, scaricate una volta sola per URL e dimensione. I file sono indirizzati per
+    contenuto (sha256 della miniatura, così poster identici occupano un solo file); un indice SQLite associa
+    URL e dimensione al file e registra l'ultimo accesso. Oltre max_bytes vengono eliminati i file usati meno di recente.
+    """
+
+    def __init__(self, directory=thumbnails_dir, max_bytes=THUMBNAIL_CACHE_MAX_BYTES, sizes=THUMBNAIL_SIZES, quality=THUMBNAIL_QUALITY):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.sizes = sizes
+        self.quality = quality
+        self.counters = {"hits": 0, "downloads": 0, "errors": 0, "evictions": 0}
+        self._lock = threading.Lock()
+        self._connection = None
+        self._session = requests.Session()
+
+    def _connect(self):
+        if self._connection is None:
+            os.makedirs(self.directory, exist_ok=True)
+            self._connection = sqlite3.connect(os.path.join(self.directory, "index.sqlite"), check_same_thread=False)
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS thumbnails ("
+                "url TEXT NOT NULL, size TEXT NOT NULL, digest TEXT NOT NULL, bytes INTEGER NOT NULL, "
+                "last_access REAL NOT NULL, PRIMARY KEY (url, size))"
+            )
+        return self._connection
+
+    def _path(self, digest):
+        return os.path.join(self.directory, f"{digest}.jpg")
+
+    def get(self, url, size="details"):
+        """Byte JPEG della miniatura di url (scaricata e creata se manca), o None se il download non riesce."""
+        with self._lock:
+            connection = self._connect()
+            row = connection.execute("SELECT digest FROM thumbnails WHERE url = ? AND size = ?", (url, size)).fetchone()
+            if row is not None and os.path.exists(self._path(row[0])):
+                connection.execute("UPDATE thumbnails SET last_access = ? WHERE url = ? AND size = ?", (time.time(), url, size))
+                connection.commit()
+                self.counters["hits"] += 1
+                with open(self._path(row[0]), "rb") as f:
+                    return f.read()
+
+        # Download e ridimensionamento fuori dal lock, così le altre richieste non attendono
+        try:
+            response = self._session.get(url, timeout=OMDB_TIMEOUT)
+            response.raise_for_status()
+            thumbnail = make_thumbnail(response.content, self.sizes[size], self.quality)
+        except Exception as e:
+            print(f"Errore durante il download del poster: {e}")
+            with self._lock:
+                self.counters["errors"] += 1
+            return None
+
+        digest = hashlib.sha256(thumbnail).hexdigest()
+        with self._lock:
+            path = self._path(digest)
+            if not os.path.exists(path):
+                tmp_path = f"{path}.tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(thumbnail)
+                os.replace(tmp_path, path)
+            connection = self._connect()
+            connection.execute(
+                "INSERT OR REPLACE INTO thumbnails (url, size, digest, bytes, last_access) VALUES (?, ?, ?, ?, ?)",
+                (url, size, digest, len(thumbnail), time.time()),
+            )
+            connection.commit()
+            self.counters["downloads"] += 1
+            self._evict(keep=digest)
+        return thumbnail
+
+    def total_bytes(self):
+        with self._lock:
+            return self._total_bytes(self._connect())
+
+    def _total_bytes(self, connection):
+        return connection.execute("SELECT COALESCE(SUM(bytes), 0) FROM (SELECT digest, MAX(bytes) AS bytes FROM thumbnails GROUP BY digest)").fetchone()[0]
+
+    def _evict(self, keep=None):
+        """Elimina i file con l'ultimo accesso più vecchio finché lo spazio occupato supera max_bytes."""
+        connection = self._connect()
+        total = self._total_bytes(connection)
+        if total <= self.max_bytes:
+            return
+        files = connection.execute(
+            "SELECT digest, MAX(bytes), MAX(last_access) AS last_access FROM thumbnails GROUP BY digest ORDER BY last_access"
+        ).fetchall()
+        for digest, size, _ in files:
+            if total <= self.max_bytes:
+                break
+            if digest == keep:
+                continue
+            connection.execute("DELETE FROM thumbnails WHERE digest = ?", (digest,))
+            if os.path.exists(self._path(digest)):
+                os.remove(self._path(digest))
+            total -= size
+            self.counters["evictions"] += 1
+        connection.commit()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.counters)
+            stats["bytes"] = self._total_bytes(self._connect())
+        return stats
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+            self._session.close()
+
+
+thumbnail_store = ThumbnailStore()
@@ -0,0 +1,105 @@
+import mongomock
+import numpy as np
+import pandas as pd
+import pytest
+from src import db, knn_model, recommendation_cache
+from src.catalog import clear_catalogs
+from src.filtering_functions import query_cache
+
+
+def random_movies(n, seed=0, first_id=1):
+    """Catalogo casuale di n film con le colonne usate dal modello e dalle ricerche."""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "filmtv_id": np.arange(first_id, first_id + n),
+        "title": [f"Movie {i}" for i in range(n)],
+        "year": rng.integers(1980, 2020, n),
+        "genre": rng.choice(["Drama", "Comedy", "Horror"], n),
+        "duration": rng.integers(80, 160, n),
+        "country": rng.choice(["USA", "Italy", "France"], n),
+        "directors": [f"Dir{i % 7}" for i in range(n)],
+        "actors": [f"Act{i % 5}, Act{i % 11}" for i in range(n)],
+        "total_votes": rng.integers(1, 1000, n),
+        "humor": rng.integers(0, 5, n),
+        "rhythm": rng.integers(0, 5, n),
+        "effort": rng.integers(0, 5, n),
+        "tension": rng.integers(0, 5, n),
+        "erotism": rng.integers(0, 5, n),
+        "weighted_rating": rng.uniform(5, 9, n),
+        "duration_log": rng.uniform(4, 5, n),
+        "genre_encoded": rng.integers(0, 3, n),
+    })
+
+
+@pytest.fixture
+def catalog_csv(tmp_path):
+    """Fixture che scrive un piccolo catalogo CSV con le colonne usate dal modello e dalle ricerche."""
+    movies = pd.DataFrame({
+        "filmtv_id": [1, 2, 3, 4, 5, 6],
+        "title": ["Movie1", "Movie2", "Movie3", "Movie4", "Movie5", "Movie6"],
+        "year": [2000, 2010, 2020, 2003, 2004, 2005],
+        "genre": ["Drama", "Comedy", "Drama", "Horror", "Horror", "Horror"],
+        "duration": [90, 100, 110, 120, 130, 140],
+        "country": ["USA", "Italy", "USA", "Italy", "France", "France"],
+        "directors": ["Dir1", "Dir1", "Dir2", "Dir2", "Dir3", "Dir3"],
+        "actors": ["Tom Hanks", "Meg Ryan", "Tom Hanks, Meg Ryan", "Act3", "Act3", "Act4, Act1"],
+        "avg_vote": [7.5, 8.0, 6.5, 7.0, 6.0, 5.5],
+        "total_votes": [10, 20, 30, 40, 50, 60],
+        "humor": [1, 2, 3, 1, 2, 3],
+        "rhythm": [1, 2, 3, 1, 2, 3],
+        "effort": [1, 2, 3, 1, 2, 3],
+        "tension": [1, 2, 3, 1, 2, 3],
+        "erotism": [1, 2, 3, 1, 2, 3],
+        "weighted_rating": [6.0, 6.5, 7.0, 7.5, 8.0, 8.5],
+        "duration_log": np.log([91, 101, 111, 121, 131, 141]),
+        "genre_encoded": [0, 0, 1, 1, 2, 2],
+    })
+    path = tmp_path / "catalog.csv"
+    movies.to_csv(path, index=False)
+    yield str(path)
+    clear_catalogs()
+    query_cache.clear()
+
+
+@pytest.fixture
+def append_movie(catalog_csv):
+    """Fixture che aggiunge un film al catalogo CSV: i campi non indicati sono copiati dall'ultima riga."""
+    def append(**values):
+        movies = pd.read_csv(catalog_csv)
+        row = {**movies.iloc[-1].to_dict(), "filmtv_id": int(movies["filmtv_id"].max()) + 1, **values}
+        pd.concat([movies, pd.DataFrame([row])], ignore_index=True).to_csv(catalog_csv, index=False)
+    return append
+
+
+@pytest.fixture
+def model_catalog(tmp_path, monkeypatch):
+    """
+    Fixture che scrive un catalogo casuale (random_movies(n, seed, first_id)) e vi collega il modello, con
+    l'artefatto delle feature costruito in memoria. Restituisce il catalogo e l'artefatto.
+    """
+    def link(n=60, seed=0, first_id=1):
+        movies = random_movies(n, seed, first_id)
+        path = tmp_path / "catalog.csv"
+        movies.to_csv(path, index=False)
+        artifact = knn_model.build_feature_artifact(str(path))
+        artifact["id_positions"] = pd.Index(artifact["filmtv_ids"])
+        monkeypatch.setattr(knn_model, "csv_path", str(path))
+        monkeypatch.setattr(knn_model, "get_feature_artifact", lambda: artifact)
+        monkeypatch.setattr(knn_model, "loaded_feature_artifact", lambda: artifact)
+        recommendation_cache.clear()
+        return movies, artifact
+
+    yield link
+    recommendation_cache.clear()
+    clear_catalogs()
+
+
+@pytest.fixture
+def mock_db():
+    """Fixture che sostituisce il client MongoDB con uno in memoria e azzera le metriche delle query."""
+    client = mongomock.MongoClient()
+    db.set_client(client)
+    db.query_stats.reset()
+    db.profile_query_stats.reset()
+    yield client
+    db.set_client(None)
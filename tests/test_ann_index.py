@@ -0,0 +1,42 @@
+import pytest
+import numpy as np
+from src.ann_index import build_ivf_index, search_ivf, save_ivf_index, load_ivf_index
+from src.scoring import top_k_neighbors
+
+@pytest.fixture
+def clustered_vectors():
+    """Fixture per vettori float32 raggruppati attorno a 10 centri."""
+    rng = np.random.default_rng(0)
+    centers = rng.normal(scale=10, size=(10, 8))
+    return (centers[rng.integers(0, 10, 2000)] + rng.normal(size=(2000, 8))).astype(np.float32)
+
+def test_ivf_all_probes_matches_exact(clustered_vectors):
+    """Test per verificare che visitando tutte le liste il risultato coincida con la ricerca esatta."""
+    index = build_ivf_index(clustered_vectors, n_lists=20)
+    assert index["list_offsets"][-1] == len(clustered_vectors)
+
+    profile = clustered_vectors[:5].mean(axis=0)
+    exact, _ = top_k_neighbors(clustered_vectors, np.ones(2000, dtype=bool), profile, k=20)
+    approx, _ = search_ivf(index, clustered_vectors, profile, k=20, n_probes=20)
+    assert list(approx) == list(exact)
+
+def test_ivf_respects_mask_and_widens_probes(clustered_vectors):
+    """Test per verificare che la maschera sia rispettata anche quando ammette pochi film."""
+    index = build_ivf_index(clustered_vectors, n_lists=20)
+    mask = np.zeros(2000, dtype=bool)
+    mask[[3, 500, 1999]] = True
+
+    positions, _ = search_ivf(index, clustered_vectors, clustered_vectors[0], k=20, mask=mask, n_probes=1)
+    assert sorted(positions) == [3, 500, 1999]
+
+def test_ivf_save_and_load(clustered_vectors, tmp_path):
+    """Test per verificare il salvataggio e il caricamento dell'indice."""
+    source = {"size": 1, "mtime_ns": 2, "feature_version": 3}
+    index = build_ivf_index(clustered_vectors, n_lists=5, source=source)
+    path = str(tmp_path / "ann.npz")
+    save_ivf_index(index, path)
+
+    loaded = load_ivf_index(path, source=source)
+    assert np.array_equal(loaded["list_positions"], index["list_positions"])
+    assert load_ivf_index(path, source={"size": 3, "mtime_ns": 2, "feature_version": 3}) is None
+    assert load_ivf_index(path, source={"size": 1, "mtime_ns": 2, "feature_version": 4}) is None
@@ -8,21 +8,15 @@ from src.auth import (
     update_disliked,
     get_disliked,
 )
-from pymongo import MongoClient
-import os
-
-# Configurazione del client MongoDB
-MONGO_URI = os.getenv("MONGO_URI")
-client = MongoClient(MONGO_URI)
-db = client["FilmRecommender"]
-users_collection = db["users"]
+from src.db import get_users_collection
 
 @pytest.fixture(scope="function")
-def setup_test_user():
-    """Crea un utente di test e lo elimina dopo il test."""
+def setup_test_user(mock_db):
+    """Crea un utente di test (nel database MongoDB in memoria di mock_db) e lo elimina dopo il test."""
     username = "test_user"
     password = "secure_password"
     profile_pic = "profile_pic_url"
+    users_collection = get_users_collection()
 
     users_collection.delete_one({"username": username})
 
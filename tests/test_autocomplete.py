@@ -0,0 +1,42 @@
+import pandas as pd
+from src.inverted_index import InvertedIndex
+from src.autocomplete import NameAutocomplete
+from src.filtering_functions import filter_movies
+
+ACTORS = pd.Series(["Tom Hanks, Meg Ryan", "Tom Cruise", "Tom Hanks", "Gérard Depardieu, Meg Ryan", "Tomas Milian"])
+
+def test_suggest_by_prefix_and_weight():
+    """Test per verificare i suggerimenti per prefisso del nome o di una parola, ordinati per peso."""
+    index = InvertedIndex(ACTORS)
+
+    # Senza pesi conta il numero di film
+    autocomplete = NameAutocomplete(index)
+    assert autocomplete.suggest("tom") == ["Tom Hanks", "Tom Cruise", "Tomas Milian"]
+    assert autocomplete.suggest("TOM H") == ["Tom Hanks"]
+    assert autocomplete.suggest("ryan") == ["Meg Ryan"]
+    assert autocomplete.suggest("gerard") == ["Gérard Depardieu"]
+    assert autocomplete.suggest("tom", limit=1) == ["Tom Hanks"]
+    assert autocomplete.suggest("xyz") == []
+    assert autocomplete.suggest("  ") == []
+
+    # Con total_votes come peso
+    autocomplete = NameAutocomplete(index, row_weights=[10, 500, 10, 1, 30])
+    assert autocomplete.suggest("tom") == ["Tom Cruise", "Tomas Milian", "Tom Hanks"]
+    # Prefisso più lungo di quelli precalcolati
+    assert autocomplete.suggest("tom cr") == ["Tom Cruise"]
+
+def test_postings_of_suggested_names():
+    """Test per verificare che i nomi scelti filtrino solo i film con quel nome esatto."""
+    index = InvertedIndex(ACTORS)
+    assert list(NameAutocomplete(index).postings(["Meg Ryan", "Tom Cruise"])) == [0, 1, 3]
+
+    movies = pd.DataFrame({
+        "filmtv_id": [1, 2, 3, 4, 5],
+        "title": ["A", "B", "C", "D", "E"],
+        "actors": ["Tom Hanks, Meg Ryan", "Tom Hanks Jr.", "Tom Hanks", "Meg Ryan", "Tomas Milian"],
+        "directors": ["Nora Ephron", "X", "Robert Zemeckis", "Y", "Z"],
+        "year": [1993, 1998, 1994, 1983, 1975],
+    })
+    assert list(filter_movies(movies, actors="Tom Hanks")["filmtv_id"]) == [1, 2, 3]
+    assert list(filter_movies(movies, actor_names=["Tom Hanks"])["filmtv_id"]) == [1, 3]
+    assert list(filter_movies(movies, actor_names=["Tom Hanks"], director_names=["Nora Ephron"])["filmtv_id"]) == [1]
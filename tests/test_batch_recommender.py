@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from scipy.sparse import random as sparse_random
+from src import db, knn_model
+from src.batch_recommender import PRECOMPUTED_FIELD, iter_user_pages, run_batch
+from src.scoring import top_k_neighbors, top_k_neighbors_batch
+
+@pytest.fixture
+def catalog(model_catalog):
+    """Fixture con un catalogo casuale collegato al modello (artefatto costruito in memoria)."""
+    movies, _ = model_catalog(n=60, seed=0, first_id=100)
+    return movies
+
+@pytest.fixture
+def users(mock_db):
+    """Fixture con una collection di utenti in memoria."""
+    collection = db.get_users_collection()
+    collection.insert_many([
+        {"username": f"user{i}", "preferences": [100 + i, 101 + i, 120 + i], "disliked": [130 + i] if i % 2 else []}
+        for i in range(7)
+    ] + [{"username": "empty", "preferences": [], "disliked": []}])
+    return collection
+
+def test_batch_scoring_matches_single_profile():
+    """Test per verificare che il prodotto a blocchi dia gli stessi top-k del calcolo per singolo profilo."""
+    rng = np.random.default_rng(1)
+    matrix = sparse_random(1000, 50, density=0.5, format="csr", random_state=1)
+    profiles = rng.random((9, 50)) * 0.2
+    exclude = [rng.choice(1000, 4, replace=False) for _ in range(9)]
+    with ThreadPoolExecutor(3) as executor:
+        results = top_k_neighbors_batch(matrix, profiles, exclude, k=20, block_rows=128, executor=executor)
+    for profile, excluded, result in zip(profiles, exclude, results):
+        mask = np.ones(1000, dtype=bool)
+        mask[excluded] = False
+        assert list(result) == list(top_k_neighbors(matrix, mask, profile, k=20)[0])
+
+def test_user_pages(users):
+    """Test per verificare la lettura degli utenti a pagine."""
+    pages = list(iter_user_pages(users, page_size=3))
+    assert [len(page) for page in pages] == [3, 3, 2]
+    assert "password_hash" not in pages[0][0]
+
+def test_run_batch_matches_interactive(catalog, users):
+    """Test per verificare che le liste precalcolate coincidano con quelle interattive senza filtri."""
+    stats = run_batch(users, mode="exact", page_size=3, n_jobs=2)
+    assert stats == {"pages": 3, "users": 8, "written": 7, "skipped": 1}
+
+    for user in users.find({"username": {"$ne": "empty"}}):
+        expected = knn_model.compute_recommendations(user["preferences"], user["disliked"], {}, "exact")
+        assert user[PRECOMPUTED_FIELD]["ids"] == list(expected)
+    assert PRECOMPUTED_FIELD not in users.find_one({"username": "empty"})
+
+def test_precomputed_lists_are_served(catalog, users, monkeypatch):
+    """Test per verificare che senza filtri venga servita la lista precalcolata, se l'impronta corrisponde."""
+    run_batch(users, mode="exact")
+    user = users.find_one({"username": "user1"})
+    precomputed = user[PRECOMPUTED_FIELD]
+
+    calls = []
+    compute = knn_model.compute_recommendations
+    monkeypatch.setattr(knn_model, "compute_recommendations", lambda *args: calls.append(args) or compute(*args))
+
+    full_range = {"duration_range": (0, 1000), "year_range": (1900, 2100)}
+    result = knn_model.get_recommendations(user["preferences"], user["disliked"], full_range, mode="exact", precomputed=precomputed)
+    assert list(result) == precomputed["ids"]
+    assert calls == []
+
+    # Con un filtro o con un profilo diverso si calcola
+    knn_model.get_recommendations(user["preferences"], user["disliked"], {**full_range, "genre": ["Drama"]}, mode="exact", precomputed=precomputed)
+    knn_model.get_recommendations(user["preferences"] + [150], user["disliked"], full_range, mode="exact", precomputed=precomputed)
+    assert len(calls) == 2
+
+def test_neighbors_mode_uses_feature_matrix(catalog, users):
+    """Test per verificare che nella modalità neighbors le liste siano calcolate sulla matrice completa delle feature."""
+    run_batch(users, mode="neighbors")
+    user = users.find_one({"username": "user2"})
+    expected = knn_model.compute_recommendations(user["preferences"], user["disliked"], {}, "exact")
+    assert user[PRECOMPUTED_FIELD]["ids"] == list(expected)
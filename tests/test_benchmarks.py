@@ -0,0 +1,44 @@
+import pandas as pd
+from benchmarks.compare import compare
+from benchmarks.harness import measure
+from benchmarks.synthetic_catalog import generate_catalog
+from src import knn_model
+
+def test_synthetic_catalog_shape(tmp_path):
+    """Test per verificare che il catalogo sintetico abbia le colonne del catalogo reale e valori multipli."""
+    movies = generate_catalog(500, seed=1)
+    assert len(movies) == 500
+    assert movies["filmtv_id"].is_unique
+    assert set(knn_model.SELECTED_COLUMNS) <= set(movies.columns)
+    assert movies["actors"].str.contains(", ").mean() > 0.5
+    assert movies["total_votes"].median() < movies["total_votes"].mean()
+    assert generate_catalog(50, seed=1).equals(generate_catalog(50, seed=1))
+
+    # Il modello costruisce l'artefatto delle feature dal catalogo sintetico
+    path = tmp_path / "synthetic.csv"
+    movies.to_csv(path, index=False)
+    artifact = knn_model.build_feature_artifact(str(path))
+    assert artifact["matrix"].shape[0] == len(pd.read_csv(path).dropna(subset=knn_model.SELECTED_COLUMNS))
+
+def test_measure_and_compare():
+    """Test per verificare le misure di una fase e il confronto tra due report."""
+    result = measure("sum", lambda: sum(range(1000)), repeats=5)
+    assert result["repeats"] == 5
+    assert result["p50"] <= result["p99"]
+    assert result["throughput"] > 0
+    assert result["peak_memory_mb"] >= 0
+
+    baseline = {"sizes": {"10": [{"stage": "a", "p50": 1.0, "peak_memory_mb": 2.0}]}, "auth": None}
+    current = {"sizes": {"10": [{"stage": "a", "p50": 1.5, "peak_memory_mb": 2.0}]}, "auth": None}
+    rows, regressions = compare(baseline, current, threshold=0.2)
+    assert len(rows) == 2
+    assert [row[:3] for row in regressions] == [("10", "a", "p50")]
+
+def test_catalog_benchmarks_restore_model(tmp_path):
+    """Test per verificare che i benchmark del catalogo ripristinino il catalogo e l'artefatto del modello."""
+    from benchmarks.run import catalog_benchmarks
+    csv_path = knn_model.csv_path
+    results = catalog_benchmarks(300, str(tmp_path), repeats=2)
+    assert "compute_recommendations" in [result["stage"] for result in results]
+    assert knn_model.csv_path == csv_path
+    assert knn_model._feature_artifact is None
@@ -0,0 +1,57 @@
+import numpy as np
+from src.cache import LRUCache
+from src.catalog import get_catalog
+from src.filtering_functions import canonical_filters, filter_movies, query_cache, search_ids
+
+def test_lru_cache_eviction_and_stats():
+    """Test per verificare l'ordine di scarto LRU, il limite di memoria e i contatori."""
+    cache = LRUCache(max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert "b" not in cache
+    assert cache.get("b") is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+    assert cache.stats()["evictions"] == 1
+
+    cache = LRUCache(max_entries=10, max_bytes=100)
+    cache.put("a", np.zeros(10, dtype=np.int32))
+    cache.put("b", np.zeros(10, dtype=np.int32))
+    cache.put("c", np.zeros(10, dtype=np.int32))
+    assert "a" not in cache and len(cache) == 2
+    assert cache.stats()["bytes"] == 80
+    # Un valore più grande della cache non viene memorizzato
+    cache.put("big", np.zeros(100, dtype=np.int32))
+    assert "big" not in cache
+
+def test_canonical_filters():
+    """Test per verificare che filtri equivalenti abbiano la stessa chiave."""
+    assert canonical_filters(genre=["Drama", "Comedy"], actors="Hanks, Ryan ", start_year=2000.0) == \
+        canonical_filters(genre=["Comedy", "Drama"], actors="Ryan,Hanks", start_year=2000)
+    assert canonical_filters(title="Città") == canonical_filters(title="citta")
+    assert canonical_filters(actors="Hanks") != canonical_filters(directors="Hanks")
+
+def test_search_ids_uses_cache(catalog_csv):
+    """Test per verificare che ricerche equivalenti sul catalogo condiviso vengano servite dalla cache."""
+    movies = get_catalog(catalog_csv).frame
+    hits = query_cache.hits
+    assert list(search_ids(movies, genre=["Drama"], actors="Hanks")) == [1, 3]
+    assert list(search_ids(movies, genre=["Drama"], actors=" Hanks")) == [1, 3]
+    assert query_cache.hits == hits + 1
+
+def test_empty_terms_do_not_match_everything(catalog_csv):
+    """Test per verificare che una virgola in più non cambi né i risultati né la chiave della cache."""
+    movies = get_catalog(catalog_csv).frame
+    assert list(filter_movies(movies, actors="Hanks,")["filmtv_id"]) == [1, 3]
+    assert list(search_ids(movies, actors="Hanks")) == [1, 3]
+    assert list(search_ids(movies, actors="Hanks, ")) == [1, 3]
+    assert len(filter_movies(movies, actors=" , ")) == 6
+
+def test_search_ids_invalidated_when_catalog_changes(catalog_csv, append_movie):
+    """Test per verificare che la cache venga svuotata quando cambia la versione del catalogo."""
+    assert list(search_ids(get_catalog(catalog_csv).frame, genre=["Comedy"])) == [2]
+    append_movie(title="Movie7", genre="Comedy", actors="Al Pacino")
+    assert list(search_ids(get_catalog(catalog_csv).frame, genre=["Comedy"])) == [2, 7]
+    assert len(query_cache) == 1
@@ -0,0 +1,63 @@
+import os
+import shutil
+import pandas as pd
+from src.catalog import get_catalog, build_binary_catalog, read_catalog, resolve_catalog_source
+
+def test_get_catalog_is_shared(catalog_csv):
+    """Test per verificare che il catalogo venga letto una sola volta e condiviso."""
+    first = get_catalog(catalog_csv)
+    second = get_catalog(catalog_csv)
+    assert first is second
+    assert len(first) == 6
+
+def test_get_catalog_compact_dtypes(catalog_csv):
+    """Test per verificare i tipi compatti delle colonne."""
+    frame = get_catalog(catalog_csv).frame
+    assert frame["filmtv_id"].dtype == "int32"
+    assert frame["year"].dtype == "int32"
+    assert frame["avg_vote"].dtype == "float32"
+    assert isinstance(frame["genre"].dtype, pd.CategoricalDtype)
+
+def test_get_catalog_reloads_when_file_changes(catalog_csv, append_movie):
+    """Test per verificare che il catalogo venga ricaricato quando il file cambia."""
+    first = get_catalog(catalog_csv)
+    append_movie(title="Movie7", year=2021)
+    second = get_catalog(catalog_csv)
+    assert second is not first
+    assert len(second) == 7
+    assert second.version != first.version
+
+def test_binary_catalog_roundtrip(catalog_csv):
+    """Test per verificare che il catalogo binario venga usato al posto del CSV e conservi i tipi."""
+    binary_path = build_binary_catalog(catalog_csv)
+    assert resolve_catalog_source(catalog_csv) == binary_path
+
+    frame = read_catalog(catalog_csv)
+    assert list(frame["filmtv_id"]) == [1, 2, 3, 4, 5, 6]
+    assert frame["year"].dtype == "int32"
+    assert isinstance(frame["genre"].dtype, pd.CategoricalDtype)
+    assert list(frame["title"]) == [f"Movie{i}" for i in range(1, 7)]
+
+def test_binary_catalog_stale_falls_back_to_csv(catalog_csv, append_movie):
+    """Test per verificare il ritorno al CSV quando il file binario non è aggiornato."""
+    build_binary_catalog(catalog_csv)
+    append_movie(title="Movie7", year=2021)
+    assert resolve_catalog_source(catalog_csv) == catalog_csv
+    assert len(get_catalog(catalog_csv)) == 7
+
+def test_catalog_digest_depends_only_on_content(catalog_csv, tmp_path, append_movie):
+    """Test per verificare che l'impronta del catalogo non dipenda da percorso, mtime o formato, ma solo dal contenuto."""
+    digest = get_catalog(catalog_csv).digest
+    copy = tmp_path / "other" / "catalog.csv"
+    copy.parent.mkdir()
+    shutil.copyfile(catalog_csv, copy)
+    os.utime(copy, ns=(0, 0))
+    assert get_catalog(str(copy)).version != get_catalog(catalog_csv).version
+    assert get_catalog(str(copy)).digest == digest
+
+    build_binary_catalog(str(copy))
+    os.remove(copy)
+    assert get_catalog(str(copy)).digest == digest
+
+    append_movie(title="Movie7")
+    assert get_catalog(catalog_csv).digest != digest
@@ -0,0 +1,65 @@
+import pytest
+from src import auth, db
+
+def test_indexes_are_created_once(mock_db):
+    """Test per verificare la creazione idempotente dell'indice unico su username."""
+    collection = db.get_users_collection().collection
+    db.ensure_indexes(collection)
+    indexes = collection.index_information()
+    assert indexes["username_unique"]["unique"] is True
+    assert len(indexes) == 2
+
+def test_register_rejects_duplicates(mock_db):
+    """Test per verificare che l'indice unico impedisca username duplicati."""
+    assert auth.register_user("anna", "secret") == "User registered successfully."
+    assert auth.register_user("anna", "other") == "Username already exists."
+    assert db.get_users_collection().count_documents({"username": "anna"}) == 1
+
+def test_projections(mock_db):
+    """Test per verificare che ogni chiamata legga solo i campi necessari."""
+    auth.register_user("anna", "secret", profile_pic="pic.png")
+    authenticated, user = auth.authenticate_user("anna", "secret")
+    assert authenticated
+    assert "profile_pic" not in user
+    assert auth.get_user("anna", {"_id": 0, "profile_pic": 1}) == {"profile_pic": "pic.png"}
+    assert "password_hash" in auth.get_user("anna")
+
+def test_query_stats(mock_db):
+    """Test per verificare i contatori del numero e della latenza delle query."""
+    auth.register_user("anna", "secret")
+    auth.get_preferences("anna")
+    auth.get_disliked("anna")
+    stats = db.query_stats.snapshot()
+    assert stats["find_one"]["count"] == 2
+    assert stats["insert_one"]["count"] == 1
+    assert stats["find_one"]["max"] >= stats["find_one"]["mean"] >= 0
+    assert db.query_stats.count() == 3
+
+def test_client_configuration(monkeypatch):
+    """Test per verificare pool e timeout da variabili d'ambiente e l'errore senza MONGO_URI."""
+    monkeypatch.setenv("MONGO_MAX_POOL_SIZE", "7")
+    monkeypatch.setenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "1500")
+    options = db.client_options()
+    assert options["maxPoolSize"] == 7
+    assert options["serverSelectionTimeoutMS"] == 1500
+
+    db.set_client(None)
+    monkeypatch.delenv("MONGO_URI", raising=False)
+    with pytest.raises(ValueError):
+        db.get_client()
+
+def test_find_is_timed_while_iterating(mock_db):
+    """Test per verificare che la latenza di find sia registrata scorrendo i risultati e non alla creazione del cursore."""
+    collection = db.get_users_collection()
+    collection.insert_many([{"username": f"user{i}"} for i in range(5)])
+    cursor = collection.find({}, {"_id": 0}).sort("username", 1).batch_size(2)
+    assert db.query_stats.count("find") == 0
+    assert [user["username"] for user in cursor] == [f"user{i}" for i in range(5)]
+    assert db.query_stats.count("find") == 1
+
+    # Un cursore chiuso prima della fine viene registrato una sola volta
+    cursor = collection.find({})
+    next(cursor)
+    cursor.close()
+    cursor.close()
+    assert db.query_stats.count("find") == 2
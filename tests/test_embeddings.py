@@ -0,0 +1,54 @@
+import pytest
+import numpy as np
+from scipy.sparse import random as sparse_random
+from src import embeddings as embeddings_module
+from src.embeddings import artifact_source, build_embeddings, quantize_int8, save_embeddings, top_k_embeddings, recall_report
+
+@pytest.fixture
+def feature_matrix():
+    """Fixture per una matrice sparsa di feature casuale."""
+    return sparse_random(300, 120, density=0.05, format="csr", random_state=0)
+
+def test_quantize_int8():
+    """Test per verificare che la quantizzazione int8 approssimi i vettori originali."""
+    vectors = np.random.default_rng(0).normal(size=(50, 8)).astype(np.float32)
+    q, scale = quantize_int8(vectors)
+    assert q.dtype == np.int8
+    assert np.abs(q * scale - vectors).max() <= scale.max() / 2 + 1e-6
+
+def test_build_embeddings_and_top_k(feature_matrix):
+    """Test per verificare dimensioni, tipi e coerenza tra top-k float32 e int8."""
+    embeddings = build_embeddings(feature_matrix, n_components=16)
+    assert embeddings["vectors"].shape == (300, 16)
+    assert embeddings["vectors"].dtype == np.float32
+
+    mask = np.ones(300, dtype=bool)
+    profile = embeddings["vectors"][:3].mean(axis=0)
+    positions, distances = top_k_embeddings(embeddings, mask, profile, k=10)
+    q_positions, q_distances = top_k_embeddings(embeddings, mask, profile, k=10, quantized=True)
+    assert len(positions) == len(q_positions) == 10
+    assert np.all(np.diff(distances) >= 0)
+    assert np.allclose(distances[:3], q_distances[:3], atol=0.05)
+
+def test_recall_report(feature_matrix):
+    """Test per verificare il formato del report di recall@k."""
+    report = recall_report(feature_matrix, dims=(8, 32), k=5, n_queries=10)
+    assert [row["n_components"] for row in report] == [8, 32]
+    for row in report:
+        assert 0.0 <= row["recall@5_float32"] <= 1.0
+        assert row["bytes_int8"] * 4 == row["bytes_float32"]
+
+def test_serving_only_loads_embeddings(feature_matrix, tmp_path, monkeypatch):
+    """Test per verificare che gli embedding vengano solo letti e non valgano per un'altra versione delle feature."""
+    monkeypatch.setattr(embeddings_module, "embeddings_path", str(tmp_path / "embeddings.npz"))
+    monkeypatch.setattr(embeddings_module, "_embeddings", None)
+    monkeypatch.setattr(embeddings_module, "_embeddings_checked", None)
+    artifact = {"version": 3, "source": {"size": 1, "mtime_ns": 2}, "matrix": feature_matrix}
+
+    # File mancante: nessuna costruzione durante la richiesta
+    assert embeddings_module.get_embeddings(artifact) is None
+    assert not (tmp_path / "embeddings.npz").exists()
+
+    save_embeddings(build_embeddings(feature_matrix, n_components=8, source=artifact_source(artifact)), embeddings_module.embeddings_path)
+    assert embeddings_module.get_embeddings(artifact)["vectors"].shape == (300, 8)
+    assert embeddings_module.get_embeddings({**artifact, "version": 4}) is None
@@ -0,0 +1,42 @@
+import pandas as pd
+import pytest
+from src.filter_engine import ContainsAny, Between, evaluate, SCAN_COST
+
+@pytest.fixture
+def movies():
+    """Fixture per un piccolo DataFrame di film."""
+    return pd.DataFrame({
+        "filmtv_id": [1, 2, 3, 4],
+        "title": ["Alpha", "Beta", "Gamma", "Delta"],
+        "genre": ["Drama", "Comedy", "Drama", "Horror"],
+        "duration": [100, 110, 120, 130],
+        "actors": ["Tom Hanks, Meg Ryan", "Meg Ryan", "Tom Hanks", "Al Pacino"],
+        "year": [1993, 1998, 1994, 1983],
+    })
+
+class ExplodingPredicate:
+    """Predicato che fallisce se viene valutato: serve a verificare l'interruzione anticipata."""
+    cost = SCAN_COST
+
+    def evaluate(self, dataset, candidates):
+        raise AssertionError("Predicate should not be evaluated")
+
+def test_evaluate_combines_predicates(movies):
+    """Test per verificare che i predicati vengano combinati in AND restituendo posizioni ordinate."""
+    positions = evaluate(movies, [
+        ContainsAny("actors", ["Hanks"]),
+        Between("duration", 100, 125),
+        ContainsAny("title", ["a"], case_sensitive=False, regex=True, indexed=False),
+        None,
+    ])
+    assert list(positions) == [0, 2]
+    assert len(movies) == 4  # Il dataset non viene modificato
+
+def test_evaluate_without_predicates_returns_all_rows(movies):
+    """Test per verificare che senza filtri vengano restituite tutte le righe."""
+    assert list(evaluate(movies, [])) == [0, 1, 2, 3]
+
+def test_evaluate_short_circuits(movies):
+    """Test per verificare che la valutazione si interrompa quando non restano candidati."""
+    positions = evaluate(movies, [ExplodingPredicate(), ContainsAny("genre", ["Western"]), Between("year", 1990, None)])
+    assert len(positions) == 0
@@ -0,0 +1,40 @@
+import pandas as pd
+from src.inverted_index import InvertedIndex, can_use_index
+from src.filtering_functions import filter_movies
+
+def test_inverted_index_postings():
+    """Test per verificare token normalizzati e posting list ordinate."""
+    index = InvertedIndex(pd.Series(["Tom Hanks, Meg Ryan", "Meg Ryan", None, "Tom Hanks Jr.,Tom Hanks"]))
+    assert list(index.postings("Meg Ryan")) == [0, 1]
+    assert list(index.postings("Tom Hanks")) == [0, 3]
+    assert len(index.postings("Nobody")) == 0
+
+    # Ricerca per sottostringa sul vocabolario, con e senza distinzione tra maiuscole e minuscole
+    assert list(index.match("Hanks")) == [0, 3]
+    assert list(index.match("hanks")) == []
+    assert list(index.match("hanks", case_sensitive=False)) == [0, 3]
+    assert list(index.match_any(["Jr.", "Ryan"])) == [0, 1, 3]
+
+def test_can_use_index():
+    """Test per verificare quando una ricerca per sottostringa può usare l'indice."""
+    assert can_use_index(["Tom Hanks"])
+    assert not can_use_index(["Hanks, Meg"])
+    assert can_use_index(["Jr."])
+    assert not can_use_index(["Jr."], regex=True)
+
+def test_filter_movies_with_index_matches_scan():
+    """Test per verificare che i filtri su attori e registi diano gli stessi risultati della scansione."""
+    movies = pd.DataFrame({
+        "filmtv_id": [1, 2, 3, 4],
+        "title": ["A", "B", "C", "D"],
+        "genre": ["Drama", "Comedy", "Drama", "Horror"],
+        "duration": [100, 110, 120, 130],
+        "actors": ["Tom Hanks, Meg Ryan", "Meg Ryan", "Tom Hanks", "Al Pacino"],
+        "directors": ["Nora Ephron", "Nora Ephron", "Robert Zemeckis", "Brian De Palma"],
+        "year": [1993, 1998, 1994, 1983],
+    })
+    result = filter_movies(movies, genre=["Drama"], actors="Hanks")
+    assert list(result["filmtv_id"]) == [1, 3]
+
+    result = filter_movies(movies, actors="Pacino, Ryan", directors="Ephron, Palma")
+    assert list(result["filmtv_id"]) == [1, 2, 4]
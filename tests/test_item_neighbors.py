@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+from scipy.sparse import random as sparse_random
+from src import item_neighbors
+from src.embeddings import artifact_source
+from src.item_neighbors import (
+    build_item_neighbors, load_item_neighbors, neighbors_of, recommend_from_neighbors, save_item_neighbors, similar_movies
+)
+from src.scoring import top_k_neighbors
+
+def _matrix():
+    return sparse_random(300, 40, density=0.5, format="csr", random_state=2)
+
+def test_neighbors_match_exact_search():
+    """Test per verificare che le liste dei vicini coincidano con la ricerca esatta, escluso il film stesso."""
+    matrix = _matrix()
+    neighbors = build_item_neighbors(matrix, k=10, chunk_rows=64, n_jobs=2)
+    assert neighbors["indices"].dtype == np.int32
+    assert len(neighbors["indptr"]) == matrix.shape[0] + 1
+
+    for row in (0, 63, 64, 299):
+        mask = np.ones(matrix.shape[0], dtype=bool)
+        mask[row] = False
+        expected, expected_distances = top_k_neighbors(matrix, mask, matrix[row].toarray().ravel(), k=10)
+        positions, distances = neighbors_of(neighbors, row)
+        assert list(positions) == list(expected)
+        np.testing.assert_allclose(distances, expected_distances, rtol=1e-4, atol=1e-6)
+
+def test_save_and_load(tmp_path):
+    """Test per verificare il salvataggio e che le liste non vengano usate per un artefatto diverso."""
+    source = {"size": 10, "mtime_ns": 20, "feature_version": 3}
+    neighbors = build_item_neighbors(_matrix(), k=5, source=source)
+    path = str(tmp_path / "neighbors.npz")
+    save_item_neighbors(neighbors, path)
+
+    loaded = load_item_neighbors(path, source=source)
+    np.testing.assert_array_equal(loaded["indices"], neighbors["indices"])
+    np.testing.assert_array_equal(loaded["indptr"], neighbors["indptr"])
+    assert load_item_neighbors(path, source={"size": 11, "mtime_ns": 20, "feature_version": 3}) is None
+    assert load_item_neighbors(path, source={"size": 10, "mtime_ns": 20, "feature_version": 4}) is None
+    assert load_item_neighbors(str(tmp_path / "missing.npz")) is None
+
+def test_recommend_from_neighbors():
+    """Test per verificare che i candidati siano i vicini dei film piaciuti ammessi dalla maschera, rivalutati sul profilo."""
+    matrix = _matrix()
+    neighbors = build_item_neighbors(matrix, k=20)
+    liked = np.array([3, 7])
+    profile = np.asarray(matrix[liked].mean(axis=0)).ravel()
+    mask = np.ones(matrix.shape[0], dtype=bool)
+    mask[liked] = False
+    mask[::2] = False
+
+    result = recommend_from_neighbors(neighbors, matrix, liked, mask, profile, k=5)
+    candidates = set(neighbors_of(neighbors, 3)[0]) | set(neighbors_of(neighbors, 7)[0])
+    assert len(result) == 5
+    assert all(position in candidates and mask[position] for position in result)
+
+    # Il migliore tra i candidati coincide con quello della ricerca esatta sugli stessi candidati
+    candidate_mask = np.zeros(matrix.shape[0], dtype=bool)
+    candidate_mask[list(candidates)] = True
+    candidate_mask &= mask
+    assert list(result) == list(top_k_neighbors(matrix, candidate_mask, profile, k=5)[0])
+
+    # Con meno candidati di k serve la ricerca completa
+    assert recommend_from_neighbors(neighbors, matrix, liked, mask, profile, k=100) is None
+
+def test_serving_only_loads_neighbors(tmp_path, monkeypatch):
+    """Test per verificare che le liste dei vicini non vengano calcolate durante una richiesta se mancano."""
+    path = str(tmp_path / "neighbors.npz")
+    monkeypatch.setattr(item_neighbors, "item_neighbors_path", path)
+    monkeypatch.setattr(item_neighbors, "_item_neighbors", None)
+    monkeypatch.setattr(item_neighbors, "_item_neighbors_checked", None)
+    matrix = _matrix()
+    filmtv_ids = np.arange(100, 100 + matrix.shape[0])
+    artifact = {
+        "version": 3, "source": {"size": 1, "mtime_ns": 2}, "matrix": matrix,
+        "filmtv_ids": filmtv_ids, "id_positions": pd.Index(filmtv_ids),
+    }
+
+    assert len(similar_movies(artifact, 100)) == 0
+    assert not (tmp_path / "neighbors.npz").exists()
+
+    neighbors = build_item_neighbors(matrix, k=5, source=artifact_source(artifact))
+    save_item_neighbors(neighbors, path)
+    assert list(similar_movies(artifact, 100, n=3)) == list(filmtv_ids[neighbors_of(neighbors, 0)[0][:3]])
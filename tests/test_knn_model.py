@@ -1,7 +1,20 @@
+import os
 import pytest
 import pandas as pd
 import numpy as np
-from src.knn_model import filter_movies, get_recommendations
+from src.knn_model import (
+    filter_movies,
+    build_feature_artifact,
+    save_feature_artifact,
+    load_feature_artifact,
+    preprocess_dataset,
+    SELECTED_COLUMNS,
+    NUMERIC_COLUMN_WEIGHTS,
+    top_k_neighbors,
+    NoLikedMoviesError,
+    FeatureArtifactMissingError,
+)
+from scipy.sparse import issparse, csr_matrix
 
 def test_filter_movies():
     movies = pd.DataFrame({
@@ -30,3 +43,98 @@ def test_filter_movies():
     # Filtra per paese
     filtered = filter_movies(movies, genre=None, actors=None, directors=None, max_duration=None, start_year=None, end_year=None)
     assert len
+
+def test_feature_artifact_roundtrip(catalog_csv, tmp_path):
+    """Test per verificare che l'artefatto venga salvato, ricaricato e invalidato se il CSV cambia."""
+    artifact = build_feature_artifact(catalog_csv)
+    assert artifact["matrix"].shape[0] == 6
+    assert list(artifact["filmtv_ids"]) == [1, 2, 3, 4, 5, 6]
+
+    path = str(tmp_path / "features.joblib")
+    save_feature_artifact(artifact, path)
+    loaded = load_feature_artifact(path, catalog_csv)
+    assert loaded is not None
+    assert (loaded["matrix"] != artifact["matrix"]).nnz == 0
+
+    # Un CSV modificato rende l'artefatto obsoleto
+    with open(catalog_csv, "a") as f:
+        f.write("\n")
+    assert load_feature_artifact(path, catalog_csv) is None
+
+def test_serving_only_loads_feature_artifact(catalog_csv, tmp_path, monkeypatch):
+    """Test per verificare che l'artefatto non venga costruito durante una richiesta e che la versione del modello non lo carichi."""
+    from src import knn_model
+    path = str(tmp_path / "features.joblib")
+    monkeypatch.setattr(knn_model, "csv_path", catalog_csv)
+    monkeypatch.setattr(knn_model, "artifact_path", path)
+    monkeypatch.setattr(knn_model, "_feature_artifact", None)
+    monkeypatch.setattr(knn_model, "build_feature_artifact", lambda *args: pytest.fail("artifact rebuilt while serving"))
+
+    assert knn_model.model_version("exact") is not None
+    with pytest.raises(FeatureArtifactMissingError):
+        knn_model.get_feature_artifact()
+    assert len(knn_model.get_similar_movies(1)) == 0
+
+    save_feature_artifact(build_feature_artifact(catalog_csv), path)
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["catalog.csv", "features.joblib"]
+    artifact = knn_model.get_feature_artifact()
+    assert list(artifact["filmtv_ids"]) == [1, 2, 3, 4, 5, 6]
+    assert knn_model.get_feature_artifact() is artifact
+
+def test_feature_artifact_with_binary_catalog_only(catalog_csv, tmp_path, monkeypatch):
+    """Test per verificare che l'artefatto venga servito anche se il catalogo esiste solo in formato binario."""
+    from src import knn_model
+    from src.catalog import build_binary_catalog
+    build_binary_catalog(catalog_csv)
+    path = str(tmp_path / "features.joblib")
+    save_feature_artifact(build_feature_artifact(catalog_csv), path)
+    os.remove(catalog_csv)
+    monkeypatch.setattr(knn_model, "csv_path", catalog_csv)
+    monkeypatch.setattr(knn_model, "artifact_path", path)
+    monkeypatch.setattr(knn_model, "_feature_artifact", None)
+
+    artifact = knn_model.get_feature_artifact()
+    assert knn_model.loaded_feature_artifact() is artifact
+    assert build_feature_artifact(catalog_csv)["matrix"].shape[0] == 6
+
+def test_preprocess_dataset_is_sparse_and_weighted(catalog_csv):
+    """Test per verificare che la matrice resti sparsa e che i pesi delle colonne numeriche siano applicati."""
+    movies = pd.read_csv(catalog_csv)
+    transformed, column_transformer = preprocess_dataset(movies[SELECTED_COLUMNS])
+    assert issparse(transformed)
+
+    # weighted_rating ha peso 10: la colonna pesata è 10 volte quella standardizzata
+    scaled = column_transformer.named_transformers_["scaler_numeric"].transform(movies[list(NUMERIC_COLUMN_WEIGHTS)])
+    weighted_col = transformed[:, -3].toarray().ravel()
+    assert np.allclose(weighted_col, scaled[:, -3] * 10.0)
+
+def test_top_k_neighbors():
+    """Test per verificare ordinamento, maschera e gestione di meno candidati di k."""
+    matrix = csr_matrix(np.array([
+        [0.0, 0.0],
+        [1.0, 0.0],
+        [3.0, 0.0],
+        [0.0, 2.0],
+        [5.0, 5.0],
+    ]))
+    profile = np.array([0.9, 0.0])
+    mask = np.array([True, True, True, True, False])
+
+    positions, distances = top_k_neighbors(matrix, mask, profile, k=3)
+    assert list(positions) == [1, 0, 2]
+    assert np.allclose(distances, [0.1, 0.9, 2.1])
+
+    # Meno candidati di k: restituisce tutti i candidati senza errori
+    positions, _ = top_k_neighbors(matrix, mask, profile, k=20)
+    assert list(positions) == [1, 0, 2, 3]
+
+    positions, _ = top_k_neighbors(matrix, np.zeros(5, dtype=bool), profile, k=20)
+    assert len(positions) == 0
+
+def test_missing_liked_movies_raise_dedicated_error(model_catalog):
+    """Test per verificare che senza film piaciuti nel catalogo venga sollevato NoLikedMoviesError."""
+    from src import knn_model
+    model_catalog(n=20)
+    with pytest.raises(NoLikedMoviesError):
+        knn_model.compute_recommendations([999], [], {}, "exact")
+    assert len(knn_model.compute_recommendations([1], [], {}, "exact")) > 0
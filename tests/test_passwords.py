@@ -0,0 +1,55 @@
+import threading
+import pytest
+from src import auth
+from src.passwords import HasherBusyError, PasswordHasher, hash_rounds
+
+def test_hash_and_verify_in_pool():
+    """Test per verificare hash e verifica nel pool, con il fattore di lavoro configurato e le metriche."""
+    hasher = PasswordHasher(rounds=4, workers=2, max_pending=4)
+    hashed = hasher.hash("secret")
+    assert hash_rounds(hashed) == 4
+    assert hasher.verify("secret", hashed)
+    assert not hasher.verify("wrong", hashed)
+    assert not hasher.needs_rehash(hashed)
+    assert PasswordHasher(rounds=5).needs_rehash(hashed)
+
+    stats = hasher.stats.snapshot()
+    assert stats["hash"]["count"] == 1
+    assert stats["verify"]["count"] == 2
+    assert stats["queue_wait"]["count"] == 3
+    hasher.shutdown()
+
+def test_queue_limit():
+    """Test per verificare che le richieste oltre il limite della coda vengano rifiutate."""
+    hasher = PasswordHasher(rounds=4, workers=1, max_pending=1)
+    started, release = threading.Event(), threading.Event()
+
+    def slow():
+        started.set()
+        release.wait(5)
+        return True
+
+    worker = threading.Thread(target=hasher._run, args=("hash", slow))
+    worker.start()
+    started.wait(5)
+    with pytest.raises(HasherBusyError):
+        hasher.hash("secret")
+    release.set()
+    worker.join()
+
+    assert hasher.stats.count("rejected") == 1
+    assert hasher.verify("secret", hasher.hash("secret"))
+    hasher.shutdown()
+
+def test_login_rehashes_old_cost(mock_db, monkeypatch):
+    """Test per verificare che al login un hash con un costo diverso venga rigenerato."""
+    monkeypatch.setattr(auth, "password_hasher", PasswordHasher(rounds=4))
+    auth.register_user("anna", "secret")
+
+    monkeypatch.setattr(auth, "password_hasher", PasswordHasher(rounds=5))
+    authenticated, _ = auth.authenticate_user("anna", "secret")
+    assert authenticated
+    stored = auth.get_user("anna")["password_hash"]
+    assert hash_rounds(stored) == 5
+    assert auth.authenticate_user("anna", "secret")[0]
+    assert not auth.authenticate_user("anna", "wrong")[0]
@@ -0,0 +1,157 @@
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+import pytest
+from src import movies_utils, poster_cache
+from src.poster_client import PosterClient
+from src.poster_cache import PosterCache, PosterPrefetcher, get_cached_poster
+
+POSTERS = {"Gladiator": "http://example.com/gladiator.jpg", "Unknown Movie": "N/A"}
+
+class OmdbStub(BaseHTTPRequestHandler):
+    """Sostituto locale di OMDb: risponde con POSTERS e conta le richieste."""
+
+    requests = 0
+
+    def do_GET(self):
+        OmdbStub.requests += 1
+        title = parse_qs(urlparse(self.path).query)["t"][0]
+        if title == "Broken":
+            self.send_response(500)
+            self.end_headers()
+            self.wfile.write(b"error")
+            return
+        if title in POSTERS:
+            body = {"Response": "True", "Poster": POSTERS[title]}
+        else:
+            body = {"Response": "False", "Error": "Movie not found!"}
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.end_headers()
+        self.wfile.write(json.dumps(body).encode())
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture(autouse=True)
+def client(monkeypatch):
+    """Fixture che usa un client OMDb nuovo (circuito chiuso, nessuna attesa tra i tentativi) per ogni test."""
+    client = PosterClient(retries=1, backoff=0)
+    monkeypatch.setattr(poster_cache, "poster_client", client)
+    return client
+
+@pytest.fixture
+def omdb(monkeypatch):
+    """Fixture che avvia il sostituto di OMDb e vi indirizza le richieste."""
+    server = HTTPServer(("127.0.0.1", 0), OmdbStub)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setattr(movies_utils, "OMDB_BASE_URL", f"http://127.0.0.1:{server.server_port}/")
+    OmdbStub.requests = 0
+    yield OmdbStub
+    server.shutdown()
+    server.server_close()
+
+def test_poster_is_fetched_once(omdb, tmp_path):
+    """Test per verificare che lo stesso poster venga richiesto a OMDb una sola volta, anche dopo un riavvio."""
+    cache = PosterCache(tmp_path / "posters.sqlite")
+    assert get_cached_poster("Gladiator", 2000, cache) == "http://example.com/gladiator.jpg"
+    assert get_cached_poster("Gladiator", 2000, cache) == "http://example.com/gladiator.jpg"
+    assert omdb.requests == 1
+    assert cache.stats()["memory_hits"] == 1
+
+    # Nuova istanza sullo stesso file: il poster viene letto dal disco
+    reopened = PosterCache(tmp_path / "posters.sqlite")
+    assert get_cached_poster("Gladiator", 2000, reopened) == "http://example.com/gladiator.jpg"
+    assert omdb.requests == 1
+    assert reopened.stats()["disk_hits"] == 1
+
+def test_negative_caching(omdb, tmp_path, client):
+    """Test per verificare che l'assenza del poster venga memorizzata e che gli errori no."""
+    cache = PosterCache(tmp_path / "posters.sqlite")
+    assert get_cached_poster("Unknown Movie", 2000, cache) is None
+    assert get_cached_poster("Not In Omdb", 1990, cache) is None
+    assert get_cached_poster("Unknown Movie", 2000, cache) is None
+    assert get_cached_poster("Not In Omdb", 1990, cache) is None
+    assert omdb.requests == 2
+
+    # Ogni errore viene ritentato una volta; al quinto tentativo (3 errori su 5) il circuito si apre
+    assert get_cached_poster("Broken", 2000, cache) is None
+    assert get_cached_poster("Broken", 2000, cache) is None
+    assert omdb.requests == 5
+    assert client.stats()["breaker_state"] == "open"
+
+def test_entries_expire(omdb, tmp_path):
+    """Test per verificare che le voci scadute vengano richieste di nuovo."""
+    cache = PosterCache(tmp_path / "posters.sqlite", ttl=-1, negative_ttl=-1)
+    get_cached_poster("Gladiator", 2000, cache)
+    get_cached_poster("Gladiator", 2000, cache)
+    assert omdb.requests == 2
+    assert cache.stats()["expired"] == 1
+
+class SlowOmdbStub(OmdbStub):
+    """Sostituto di OMDb che risponde dopo un ritardo e registra il massimo di richieste contemporanee."""
+
+    delay = 0.2
+    active = 0
+    max_active = 0
+    lock = threading.Lock()
+
+    def do_GET(self):
+        with SlowOmdbStub.lock:
+            SlowOmdbStub.active += 1
+            SlowOmdbStub.max_active = max(SlowOmdbStub.max_active, SlowOmdbStub.active)
+        time.sleep(SlowOmdbStub.delay)
+        with SlowOmdbStub.lock:
+            SlowOmdbStub.active -= 1
+        super().do_GET()
+
+@pytest.fixture
+def slow_omdb(monkeypatch):
+    """Fixture che avvia un sostituto lento di OMDb che serve più richieste in parallelo."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SlowOmdbStub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr(movies_utils, "OMDB_BASE_URL", f"http://127.0.0.1:{server.server_port}/")
+    OmdbStub.requests = 0
+    SlowOmdbStub.max_active = 0
+    yield SlowOmdbStub
+    server.shutdown()
+    server.server_close()
+
+def test_prefetch_is_concurrent(slow_omdb, tmp_path):
+    """Test per verificare che i poster di una pagina vengano recuperati in parallelo, una volta sola."""
+    cache = PosterCache(tmp_path / "posters.sqlite")
+    prefetcher = PosterPrefetcher(cache, max_workers=10)
+    movies = [("Gladiator", 2000)] + [(f"Movie {i}", 2000 + i) for i in range(9)]
+
+    start = time.perf_counter()
+    posters = prefetcher.fetch_all(movies, timeout=5)
+    elapsed = time.perf_counter() - start
+
+    assert posters[("Gladiator", 2000)] == "http://example.com/gladiator.jpg"
+    assert posters[("Movie 1", 2001)] is None
+    assert elapsed < 10 * slow_omdb.delay / 2
+    assert slow_omdb.requests == 10
+
+    # Poster già in cache: nessuna nuova richiesta
+    assert prefetcher.prefetch(movies) == {}
+    assert get_cached_poster("Gladiator", 2000, cache) == "http://example.com/gladiator.jpg"
+    assert slow_omdb.requests == 10
+    prefetcher.shutdown()
+
+def test_finished_lookups_leave_pending(slow_omdb, tmp_path):
+    """Test per verificare che le richieste concluse (anni interi come nel catalogo) non restino tra quelle in corso."""
+    prefetcher = PosterPrefetcher(PosterCache(tmp_path / "posters.sqlite"), max_workers=2)
+    prefetcher.fetch_all([("Gladiator", 2000), ("Movie 1", 2001)], timeout=5)
+    assert prefetcher._pending == {}
+    prefetcher.shutdown()
+
+def test_prefetch_concurrency_cap(slow_omdb, tmp_path):
+    """Test per verificare il limite di richieste contemporanee."""
+    prefetcher = PosterPrefetcher(PosterCache(tmp_path / "posters.sqlite"), max_workers=2)
+    prefetcher.fetch_all([(f"Movie {i}", 2000) for i in range(6)], timeout=5)
+    assert slow_omdb.max_active == 2
+    assert slow_omdb.requests == 6
+    prefetcher.shutdown()
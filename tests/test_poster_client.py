@@ -0,0 +1,108 @@
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from src import movies_utils
+from src.poster_client import CircuitBreaker, CircuitOpenError, PosterClient, PosterUnavailableError
+
+class FaultyOmdb(BaseHTTPRequestHandler):
+    """Sostituto di OMDb che inietta guasti: ogni richiesta consuma il prossimo guasto della coda ("error", "slow", "drop")."""
+
+    faults = []
+    requests = 0
+    slow_seconds = 1.0
+
+    def do_GET(self):
+        FaultyOmdb.requests += 1
+        fault = FaultyOmdb.faults.pop(0) if FaultyOmdb.faults else None
+        if fault == "drop":
+            # Connessione chiusa senza risposta
+            self.close_connection = True
+            return
+        if fault == "slow":
+            time.sleep(FaultyOmdb.slow_seconds)
+        if fault == "error":
+            self.send_response(503)
+            self.end_headers()
+            return
+        body = json.dumps({"Response": "True", "Poster": "http://example.com/poster.jpg"}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def omdb(monkeypatch):
+    """Fixture che avvia il sostituto di OMDb con guasti iniettati."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FaultyOmdb)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr(movies_utils, "OMDB_BASE_URL", f"http://127.0.0.1:{server.server_port}/")
+    FaultyOmdb.faults = []
+    FaultyOmdb.requests = 0
+    yield FaultyOmdb
+    server.shutdown()
+    server.server_close()
+
+def test_retries_transient_errors(omdb):
+    """Test per verificare che gli errori transitori vengano ritentati."""
+    omdb.faults = ["error", "drop"]
+    client = PosterClient(retries=2, backoff=0.01, breaker=CircuitBreaker(min_requests=100))
+    assert client.lookup("Gladiator", 2000) == "http://example.com/poster.jpg"
+    assert omdb.requests == 3
+    stats = client.stats()
+    assert stats["retries"] == 2
+    assert stats["p50"] is not None
+
+    omdb.faults = ["error", "error", "error"]
+    with pytest.raises(PosterUnavailableError):
+        client.lookup("Gladiator", 2000)
+    assert client.stats()["failures"] == 1
+
+def test_timeout_and_deadline(omdb):
+    """Test per verificare il timeout di ogni tentativo e il budget complessivo."""
+    omdb.faults = ["slow"] * 10
+    client = PosterClient(timeout=0.2, deadline=0.5, retries=10, backoff=0)
+    start = time.perf_counter()
+    with pytest.raises(PosterUnavailableError):
+        client.lookup("Gladiator", 2000)
+    assert time.perf_counter() - start < 0.5 + 0.3
+    assert omdb.requests <= 3
+
+def test_circuit_breaker_short_circuits(omdb):
+    """Test per verificare che con troppi errori il circuito si apra e poi si richiuda dopo una prova riuscita."""
+    breaker = CircuitBreaker(window=10, min_requests=4, error_rate=0.5, reset_seconds=0.2)
+    client = PosterClient(retries=0, breaker=breaker)
+    omdb.faults = ["error"] * 4
+    for _ in range(4):
+        with pytest.raises(PosterUnavailableError):
+            client.lookup("Gladiator", 2000)
+    assert client.stats()["breaker_state"] == "open"
+
+    # Circuito aperto: nessuna richiesta a OMDb
+    with pytest.raises(CircuitOpenError):
+        client.lookup("Gladiator", 2000)
+    assert omdb.requests == 4
+    assert client.stats()["short_circuits"] == 1
+
+    time.sleep(0.25)
+    assert client.stats()["breaker_state"] == "half_open"
+    assert client.lookup("Gladiator", 2000) == "http://example.com/poster.jpg"
+    assert client.stats()["breaker_state"] == "closed"
+
+def test_failed_trial_reopens_circuit():
+    """Test per verificare che una prova fallita riapra il circuito e che passi una sola prova alla volta."""
+    breaker = CircuitBreaker(window=4, min_requests=2, error_rate=0.5, reset_seconds=0)
+    breaker.record(False)
+    breaker.record(False)
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record(False)
+    assert breaker.state in ("open", "half_open")
+    assert breaker.allow()
+    breaker.record(True)
+    assert breaker.state == "closed"
@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+from src import auth, db, knn_model, profile_store
+
+@pytest.fixture
+def store(model_catalog, mock_db):
+    """Fixture con un catalogo casuale collegato al modello e un database MongoDB in memoria con un utente."""
+    _, artifact = model_catalog(n=40, seed=3)
+    db.get_users_collection().insert_one({"username": "anna", "preferences": [1, 2, 3], "disliked": [4]})
+    db.profile_query_stats.reset()
+    return artifact
+
+def direct_profile(artifact, liked, disliked):
+    matrix = artifact["matrix"]
+    liked_positions = knn_model._artifact_positions(artifact, liked)
+    disliked_positions = knn_model._artifact_positions(artifact, disliked)
+    profile = np.asarray(matrix[liked_positions].mean(axis=0)).ravel()
+    if len(disliked_positions) > 0:
+        profile = profile - np.asarray(matrix[disliked_positions].mean(axis=0)).ravel()
+    return profile
+
+def stored_vector(artifact, liked, disliked):
+    return profile_store.load_profile_vector(artifact, knn_model.profile_version(artifact), "anna", liked, disliked)
+
+def test_stored_profile_matches_mean(store):
+    """Test per verificare che il profilo salvato coincida con le medie calcolate dai vettori dei film."""
+    np.testing.assert_allclose(stored_vector(store, [1, 2, 3], [4]), direct_profile(store, [1, 2, 3], [4]), atol=1e-12)
+    assert db.profile_query_stats.count("replace_one") == 1
+
+    # Le raccomandazioni non cambiano usando il profilo salvato
+    expected = knn_model.compute_recommendations([1, 2, 3], [4], {}, "exact")
+    assert list(knn_model.get_recommendations([1, 2, 3], [4], {}, mode="exact", username="anna")) == list(expected)
+    assert db.profile_query_stats.count("replace_one") == 1
+
+def test_reactions_update_profile_incrementally(store):
+    """Test per verificare che like e dislike aggiornino le somme salvate senza ricalcolare il profilo."""
+    stored_vector(store, [1, 2, 3], [4])
+    session = {}
+    profile = auth.get_user_profile("anna", session)
+    auth.like_movie("anna", 5, session)
+    auth.like_movie("anna", 5, session)
+    auth.dislike_movie("anna", 1, session)
+    auth.like_movie("anna", 4, session)
+    auth.unlike_movie("anna", 2, session)
+    assert profile.preferences == [3, 5, 4]
+    assert profile.disliked == [1]
+    # Un solo update per reazione, senza letture del profilo
+    assert db.profile_query_stats.count("update_one") == 4
+    assert db.profile_query_stats.count("find_one") == 1
+
+    vector = stored_vector(store, profile.preferences, profile.disliked)
+    np.testing.assert_allclose(vector, direct_profile(store, [3, 5, 4], [1]), atol=1e-9)
+    assert db.profile_query_stats.count("replace_one") == 1
+
+def test_list_replacement_and_stale_profiles(store):
+    """Test per verificare che un profilo non aggiornato venga ricalcolato e che sostituire una lista lo elimini."""
+    stored_vector(store, [1, 2, 3], [4])
+    assert stored_vector(store, [1, 2], [4]) is not None
+    assert db.profile_query_stats.count("replace_one") == 2
+
+    # Liste diverse con stessa lunghezza e stessa somma degli id
+    stored_vector(store, [1, 4], [5])
+    np.testing.assert_allclose(stored_vector(store, [2, 3], [5]), direct_profile(store, [2, 3], [5]), atol=1e-12)
+    assert db.profile_query_stats.count("replace_one") == 4
+
+    auth.update_preferences("anna", [6])
+    assert db.get_profiles_collection().find_one({"username": "anna"}) is None
+
+def test_rebuild_after_model_change(store, monkeypatch):
+    """Test per verificare che il job ricostruisca solo i profili di una versione precedente del modello."""
+    db.get_users_collection().insert_one({"username": "bob", "preferences": [7], "disliked": []})
+    profiles = db.get_profiles_collection()
+    stored_vector(store, [1, 2, 3], [4])
+    assert profile_store.rebuild_profiles() == {"pages": 0, "written": 0}
+
+    monkeypatch.setattr(knn_model, "FEATURE_ARTIFACT_VERSION", knn_model.FEATURE_ARTIFACT_VERSION + 1)
+    assert profile_store.apply_reaction("anna", 5, [("preferences", 1)], {"preferences": [1, 2, 3, 5], "disliked": [4]}) is False
+    assert profile_store.rebuild_profiles() == {"pages": 1, "written": 1}
+    assert profiles.find_one({"username": "anna"})["version"] == knn_model.profile_version(store)
+    assert profile_store.rebuild_profiles(force=True) == {"pages": 1, "written": 2}
+    assert profiles.count_documents({}) == 2
+
+def test_reactions_without_loaded_artifact(store, monkeypatch):
+    """Test per verificare che senza artefatto caricato la reazione non aggiorni il profilo, che viene poi ricalcolato."""
+    stored_vector(store, [1, 2, 3], [4])
+    monkeypatch.setattr(knn_model, "loaded_feature_artifact", lambda: None)
+    auth.like_movie("anna", 5)
+    assert db.profile_query_stats.count("update_one") == 0
+    np.testing.assert_allclose(stored_vector(store, [1, 2, 3, 5], [4]), direct_profile(store, [1, 2, 3, 5], [4]), atol=1e-12)
+    assert db.profile_query_stats.count("replace_one") == 2
@@ -0,0 +1,117 @@
+import numpy as np
+import pytest
+from src import auth, db, knn_model, recommendation_cache
+from src.recommendation_cache import recommendation_key
+
+@pytest.fixture
+def computations(monkeypatch):
+    """Fixture che sostituisce il calcolo delle raccomandazioni con uno che conta le chiamate."""
+    calls = []
+
+    def compute(liked, disliked, filters, mode, username=None):
+        calls.append((list(liked), list(disliked), mode))
+        return np.array([10, 11, 12])
+
+    version = ["v1"]
+    monkeypatch.setattr(knn_model, "compute_recommendations", compute)
+    monkeypatch.setattr(knn_model, "mode_is_available", lambda mode: True)
+    monkeypatch.setattr(knn_model, "model_version", lambda mode: [version[0], mode])
+    recommendation_cache.clear()
+    yield calls, version
+    recommendation_cache.clear()
+
+def test_recommendation_key_is_canonical():
+    """Test per verificare che l'ordine e i duplicati degli id non cambino la chiave."""
+    filters = knn_model.canonical_recommendation_filters({"genre": ["Drama", "Comedy"], "actor": "Hanks", "year_range": (2000, 2020)})
+    same = knn_model.canonical_recommendation_filters({"genre": ["Comedy", "Drama"], "actor": "hanks", "year_range": [2000, 2020]})
+    assert recommendation_key([3, 1, 2], [5], filters, ["v1"]) == recommendation_key([1, 2, 3, 3], [5], same, ["v1"])
+    assert recommendation_key([1, 2], [5], filters, ["v1"]) != recommendation_key([1, 2], [], filters, ["v1"])
+    assert recommendation_key([1, 2], [5], filters, ["v1"]) != recommendation_key([1, 2], [5], filters, ["v2"])
+
+def test_get_recommendations_uses_cache(computations):
+    """Test per verificare che le raccomandazioni vengano ricalcolate solo se cambiano profilo, filtri o modello."""
+    calls, version = computations
+    filters = {"genre": ["Drama"], "duration_range": (60, 120), "year_range": (2000, 2020)}
+    first = knn_model.get_recommendations([1, 2, 3], [4], filters, mode="exact")
+    second = knn_model.get_recommendations([3, 2, 1], [4], dict(filters), mode="exact")
+    assert list(second) == list(first)
+    assert len(calls) == 1
+
+    knn_model.get_recommendations([1, 2, 3], [4], {**filters, "genre": ["Comedy"]}, mode="exact")
+    knn_model.get_recommendations([1, 2, 3], [4], filters, mode="float32")
+    assert len(calls) == 3
+
+    version[0] = "v2"
+    knn_model.get_recommendations([1, 2, 3], [4], filters, mode="exact")
+    assert len(calls) == 4
+
+def test_updates_invalidate_user_entries(computations, mock_db):
+    """Test per verificare che aggiornare le liste di un utente elimini le sue raccomandazioni in cache."""
+    calls, _ = computations
+    db.get_users_collection().insert_one({"username": "anna", "preferences": [1, 2, 3], "disliked": []})
+
+    knn_model.get_recommendations([1, 2, 3], [], {}, mode="exact", username="anna")
+    knn_model.get_recommendations([1, 2, 3], [], {}, mode="exact", username="anna")
+    assert len(calls) == 1
+    assert len(recommendation_cache.recommendation_cache) == 1
+
+    auth.like_movie("anna", 4)
+    assert len(recommendation_cache.recommendation_cache) == 0
+    knn_model.get_recommendations([1, 2, 3], [], {}, mode="exact", username="anna")
+    auth.update_disliked("anna", [7])
+    assert len(recommendation_cache.recommendation_cache) == 0
+
+def test_evicted_entries_leave_user_index(monkeypatch):
+    """Test per verificare che le chiavi scartate dalla cache vengano tolte anche dall'indice per utente."""
+    monkeypatch.setattr(recommendation_cache.recommendation_cache, "max_entries", 2)
+    recommendation_cache.clear()
+    for i in range(5):
+        recommendation_cache.put(("key", i), np.array([i]), username="anna")
+    recommendation_cache.put(("key", 4), np.array([4]), username="bob")
+    assert recommendation_cache._user_keys == {"anna": {("key", 3), ("key", 4)}, "bob": {("key", 4)}}
+
+    # La voce condivisa con anna resta in cache
+    recommendation_cache.invalidate_user("bob")
+    assert recommendation_cache._key_users == {("key", 3): {"anna"}, ("key", 4): {"anna"}}
+    assert ("key", 4) in recommendation_cache.recommendation_cache
+    recommendation_cache.invalidate_user("anna")
+    assert len(recommendation_cache.recommendation_cache) == 0
+
+    # Svuotare direttamente la cache svuota anche gli indici per utente
+    recommendation_cache.put(("key", 5), np.array([5]), username="anna")
+    recommendation_cache.recommendation_cache.clear()
+    assert recommendation_cache._user_keys == {}
+    assert recommendation_cache._key_users == {}
+
+def test_fallback_results_are_not_cached(computations, monkeypatch):
+    """Test per verificare che un risultato calcolato ripiegando sulla ricerca esatta non venga memorizzato."""
+    calls, _ = computations
+    available = [False]
+    monkeypatch.setattr(knn_model, "mode_is_available", lambda mode: available[0])
+    knn_model.get_recommendations([1, 2], [], {}, mode="float32")
+    knn_model.get_recommendations([1, 2], [], {}, mode="float32")
+    assert len(calls) == 2
+
+    # Costruiti gli embedding, il risultato viene memorizzato
+    available[0] = True
+    knn_model.get_recommendations([1, 2], [], {}, mode="float32")
+    knn_model.get_recommendations([1, 2], [], {}, mode="float32")
+    assert len(calls) == 3
+
+def test_mode_is_available(model_catalog, tmp_path, monkeypatch):
+    """Test per verificare che una modalità risulti disponibile solo con i suoi artefatti costruiti."""
+    from src import embeddings, item_neighbors
+    _, artifact = model_catalog(n=30)
+    monkeypatch.setattr(embeddings, "embeddings_path", str(tmp_path / "embeddings.npz"))
+    monkeypatch.setattr(embeddings, "_embeddings", None)
+    monkeypatch.setattr(item_neighbors, "item_neighbors_path", str(tmp_path / "item_neighbors.npz"))
+    monkeypatch.setattr(item_neighbors, "_item_neighbors", None)
+    assert knn_model.mode_is_available("exact")
+    assert not knn_model.mode_is_available("float32")
+    assert not knn_model.mode_is_available("neighbors")
+
+    embeddings.save_embeddings(
+        embeddings.build_embeddings(artifact["matrix"], n_components=8, source=embeddings.artifact_source(artifact)),
+        str(tmp_path / "embeddings.npz"),
+    )
+    assert knn_model.mode_is_available("float32")
@@ -0,0 +1,43 @@
+import pandas as pd
+import pytest
+from src.text_index import TextIndex, fold
+from src.filtering_functions import filter_movies, search_movie
+
+@pytest.fixture
+def movies():
+    """Fixture per un DataFrame di film con titoli italiani e inglesi."""
+    return pd.DataFrame({
+        "filmtv_id": [1, 2, 3, 4],
+        "title": ["La vita è bella", "Il Padrino", "Città aperta", "The Godfather"],
+        "description": ["Un padre e suo figlio in un campo", "La famiglia Corleone", None, "The Corleone family saga, family first"],
+        "genre": ["Drama", "Drama", "Drama", "Drama"],
+        "duration": [116, 175, 100, 175],
+        "actors": ["Roberto Benigni", "Marlon Brando", "Anna Magnani", "Marlon Brando"],
+        "directors": ["Roberto Benigni", "Francis Ford Coppola", "Roberto Rossellini", "Francis Ford Coppola"],
+        "year": [1997, 1972, 1945, 1972],
+    })
+
+def test_fold():
+    """Test per verificare la normalizzazione di accenti e maiuscole."""
+    assert fold("Città È Noël") == "citta e noel"
+
+def test_find_substring(movies):
+    """Test per verificare la ricerca di sottostringhe con e senza accenti."""
+    index = TextIndex(movies["title"])
+    assert list(index.find("CITTA")) == [2]
+    assert list(index.find("vita e")) == [0]
+    assert list(index.find("a")) == [0, 1, 2, 3]
+    assert list(index.find("xyz")) == []
+
+def test_rank_bm25(movies):
+    """Test per verificare l'ordinamento per rilevanza BM25."""
+    index = TextIndex(movies["description"])
+    # "family" compare due volte nella descrizione 3
+    assert list(index.rank("corleone family")) == [3, 1]
+    assert list(index.search("corleone")) == [1, 3]
+
+def test_filter_movies_by_title_and_description(movies):
+    """Test per verificare i filtri su titolo (senza accenti) e descrizione."""
+    assert list(filter_movies(movies, title="citta")["filmtv_id"]) == [3]
+    assert list(filter_movies(movies, description="corleone", start_year=1970)["filmtv_id"]) == [2, 4]
+    assert list(search_movie(movies, "the god")["filmtv_id"]) == [4]
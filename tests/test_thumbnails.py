@@ -0,0 +1,81 @@
+import io
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+import pytest
+from PIL import Image
+from src.thumbnails import ThumbnailStore
+
+def png(color, size=(1000, 1500)):
+    output = io.BytesIO()
+    Image.new("RGB", size, color).save(output, format="PNG")
+    return output.getvalue()
+
+IMAGES = {"/red.png": png("red"), "/red-copy.png": png("red"), "/blue.png": png("blue"), "/green.png": png("green")}
+
+class ImageServer(BaseHTTPRequestHandler):
+    """Server locale dei poster che conta i download."""
+
+    downloads = 0
+
+    def do_GET(self):
+        ImageServer.downloads += 1
+        if self.path not in IMAGES:
+            self.send_response(404)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "image/png")
+        self.send_header("Content-Length", str(len(IMAGES[self.path])))
+        self.end_headers()
+        self.wfile.write(IMAGES[self.path])
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def base_url():
+    """Fixture che avvia il server locale delle immagini."""
+    server = HTTPServer(("127.0.0.1", 0), ImageServer)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    ImageServer.downloads = 0
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+def test_thumbnail_is_downloaded_once(base_url, tmp_path):
+    """Test per verificare ridimensionamento, ricompressione e riuso della miniatura, anche dopo un riavvio."""
+    store = ThumbnailStore(str(tmp_path))
+    thumbnail = store.get(f"{base_url}/red.png")
+    with Image.open(io.BytesIO(thumbnail)) as image:
+        assert image.format == "JPEG"
+        assert image.size == (400, 600)
+
+    assert store.get(f"{base_url}/red.png") == thumbnail
+    assert ThumbnailStore(str(tmp_path)).get(f"{base_url}/red.png") == thumbnail
+    assert ImageServer.downloads == 1
+    assert store.stats()["hits"] == 1
+
+    # Stesso contenuto da un altro URL: un solo file su disco
+    store.get(f"{base_url}/red-copy.png")
+    assert len([f for f in os.listdir(tmp_path) if f.endswith(".jpg")]) == 1
+
+    assert store.get(f"{base_url}/missing.png") is None
+    assert store.stats()["errors"] == 1
+
+def test_lru_eviction(base_url, tmp_path):
+    """Test per verificare che oltre il limite di spazio vengano eliminate le miniature usate meno di recente."""
+    store = ThumbnailStore(str(tmp_path), max_bytes=10 ** 9)
+    red = store.get(f"{base_url}/red.png")
+    store.get(f"{base_url}/blue.png")
+    store.max_bytes = 2 * len(red) + 10
+    store.get(f"{base_url}/red.png")
+    store.get(f"{base_url}/green.png")
+
+    assert store.stats()["evictions"] == 1
+    assert store.total_bytes() <= store.max_bytes
+    downloads = ImageServer.downloads
+    store.get(f"{base_url}/red.png")
+    assert ImageServer.downloads == downloads
+    store.get(f"{base_url}/blue.png")
+    assert ImageServer.downloads == downloads + 1
@@ -0,0 +1,84 @@
+import pytest
+from src import auth, db
+
+@pytest.fixture
+def users(mock_db):
+    """Fixture che usa un database MongoDB in memoria con un utente di prova."""
+    collection = db.get_users_collection().collection
+    collection.insert_one({"username": "anna", "password_hash": b"x", "preferences": [1, 2], "disliked": [3]})
+    db.query_stats.reset()
+    return collection
+
+def reads():
+    return db.query_stats.count("find_one")
+
+def test_profile_is_read_once_per_rerun(users):
+    """Test per verificare che il profilo venga letto una sola volta finché la sessione non viene azzerata."""
+    session = {}
+    profile = auth.get_user_profile("anna", session)
+    assert profile.liked_set == {1, 2}
+    assert profile.disliked_set == {3}
+    assert auth.get_user_profile("anna", session) is profile
+    assert reads() == 1
+
+    auth.reset_user_profile(session)
+    auth.get_user_profile("anna", session)
+    assert reads() == 2
+
+    # Utente diverso o sessione assente: nuova lettura
+    assert auth.get_user_profile("bob", session).preferences == []
+    assert reads() == 3
+
+def test_updates_write_through(users):
+    """Test per verificare che gli aggiornamenti vengano salvati e riportati sul profilo in cache."""
+    session = {}
+    profile = auth.get_user_profile("anna", session)
+    assert auth.update_preferences("anna", [1, 2, 3], session) == "Preferences updated successfully."
+    assert auth.update_disliked("anna", [], session) == "Preferences updated successfully."
+    assert profile.liked_set == {1, 2, 3}
+    assert profile.disliked == []
+    assert users.find_one({"username": "anna"})["preferences"] == [1, 2, 3]
+    assert reads() == 1
+
+    assert auth.update_preferences("bob", [1]) == "User not found."
+
+def test_like_and_dislike_in_one_update(users):
+    """Test per verificare che like/dislike spostino il film tra le liste con una sola operazione e senza letture."""
+    session = {}
+    profile = auth.get_user_profile("anna", session)
+    assert auth.like_movie("anna", 3, session) == "Preferences updated successfully."
+    assert auth.like_movie("anna", 3, session) == "Preferences updated successfully."
+    assert auth.dislike_movie("anna", 1, session) == "Preferences updated successfully."
+    assert reads() == 1
+
+    stored = users.find_one({"username": "anna"})
+    assert stored["preferences"] == [2, 3]
+    assert stored["disliked"] == [1]
+    assert profile.preferences == [2, 3]
+    assert profile.disliked_set == {1}
+
+    auth.unlike_movie("anna", 2, session)
+    auth.undislike_movie("anna", 1, session)
+    assert users.find_one({"username": "anna"})["preferences"] == [3]
+    assert profile.disliked == []
+    assert auth.like_movie("bob", 1) == "User not found."
+
+def test_concurrent_likes_are_not_lost(users):
+    """Test per verificare che reazioni da sessioni diverse non si sovrascrivano."""
+    first, second = {}, {}
+    auth.get_user_profile("anna", first)
+    auth.get_user_profile("anna", second)
+    auth.like_movie("anna", 10, first)
+    auth.like_movie("anna", 11, second)
+    assert users.find_one({"username": "anna"})["preferences"] == [1, 2, 10, 11]
+
+def test_bulk_reactions(users):
+    """Test per verificare le reazioni di più utenti e film con un solo bulk_write."""
+    users.insert_one({"username": "bob", "preferences": [], "disliked": [1]})
+    result = auth.react_to_movies([("anna", 3, "like"), ("bob", 1, "like"), ("bob", 2, "dislike"), ("anna", 2, "unlike")])
+    assert result.modified_count == 4
+    assert users.find_one({"username": "anna"})["preferences"] == [1, 3]
+    bob = users.find_one({"username": "bob"})
+    assert bob["preferences"] == [1]
+    assert bob["disliked"] == [2]
+    assert auth.react_to_movies([]) is None
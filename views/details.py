@@ -1,5 +1,8 @@
 import streamlit as st
-from src.movies_utils import get_movie_poster
+from src.knn_model import get_similar_movies
+from src.movies_utils import load_preprocessed_data
+from src.poster_cache import get_cached_poster
+from src.thumbnails import thumbnail_store
 
 def show_details_page():
     movie_details = st.session_state.get("movie_details", {})
@@ -9,10 +12,12 @@ def show_details_page():
     else:
         st.header(f"Details of '{movie_details['title']}'")
 
-        poster_url = get_movie_poster(movie_details['title'], movie_details.get('year'))
+        poster_url = get_cached_poster(movie_details['title'], movie_details.get('year'))
         
         if poster_url:
-            st.image(poster_url, caption=f"{movie_details['title']}", use_container_width="always")
+            # Miniatura locale (scaricata una volta sola); se il download non riesce si usa l'URL remoto
+            poster = thumbnail_store.get(poster_url) or poster_url
+            st.image(poster, caption=f"{movie_details['title']}", use_container_width="always")
         else:
             st.write("Poster not available.")
 
@@ -22,9 +27,28 @@ def show_details_page():
         st.write(f"**Country**: {movie_details['country']}")
         st.write(f"**Directors**: {movie_details['directors']}")
         st.write(f"**Actors**: {movie_details['actors']}")
-        st.write(f"**Average Vote**: {movie_details['avg_vote']} (from {movie_details['total_votes']} votes)")
+        st.write(f"**Average Vote**: {movie_details['avg_vote']:g} (from {movie_details['total_votes']} votes)")
         st.write(f"**Description**: {movie_details['description']}")
         st.write(f"**Attributes**: Humor: {movie_details['humor']}, Rhythm: {movie_details['rhythm']}, "
                  f"Effort: {movie_details['effort']}, Tension: {movie_details['tension']}, Erotism: {movie_details['erotism']}")
 
-    
\ No newline at end of file
+        show_similar_movies(movie_details['filmtv_id'])
+
+def show_similar_movies(movie_id):
+    """Elenco dei film più simili a quello mostrato, dalle liste precalcolate dei vicini."""
+    similar_ids = get_similar_movies(movie_id)
+    if len(similar_ids) == 0:
+        return
+
+    movies = load_preprocessed_data("data/preprocessed_filmtv_movies.csv")
+    similar = movies.set_index('filmtv_id').reindex(similar_ids).dropna(subset=['title']).reset_index()
+
+    st.subheader("Similar movies")
+    for _, movie in similar.iterrows():
+        col1, col2 = st.columns([9, 1])
+        with col1:
+            st.write(f"**{movie['title']}** ({movie['year']}) | {movie['genre']} | {movie['duration']} min")
+        with col2:
+            if st.button("🔍", key=f"similar_{movie['filmtv_id']}", help="View details of this movie", use_container_width=True):
+                st.session_state["movie_details"] = movie.to_dict()
+                st.rerun()
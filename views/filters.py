@@ -1,7 +1,7 @@
 import streamlit as st
-from src.movies_utils import load_preprocessed_data
-from src.knn_model import get_recommendations
-from src.auth import get_disliked, get_preferences, get_user
+from src.movies_utils import load_preprocessed_data, name_input
+from src.knn_model import FeatureArtifactMissingError, NoLikedMoviesError, get_recommendations
+from src.auth import get_user_profile
 
 def show_filters_page():
     st.header("Search for Movie Recommendations")
@@ -10,37 +10,48 @@ def show_filters_page():
 
     st.markdown("### Filter Options")
     selected_genre = st.multiselect("Select Genre", options=movies['genre'].unique())
-    duration_range = st.slider("Select Duration (minutes)", int(movies['duration'].min()), int(movies['duration'].max()), (60, 120))
-    selected_actor = st.text_input("Search by Actor")
-    selected_director = st.text_input("Search by Director")
-    year_range = st.slider("Select Year Range", int(movies['year'].min()), int(movies['year'].max()), (2000, 2020))
+    # Gli slider partono dall'intero intervallo del catalogo, che non esclude nessun film
+    duration_bounds = (int(movies['duration'].min()), int(movies['duration'].max()))
+    duration_range = st.slider("Select Duration (minutes)", *duration_bounds, duration_bounds)
+    selected_actor, selected_actor_names = name_input(movies, "actors", "Search by Actor")
+    selected_director, selected_director_names = name_input(movies, "directors", "Search by Director")
+    year_bounds = (int(movies['year'].min()), int(movies['year'].max()))
+    year_range = st.slider("Select Year Range", *year_bounds, year_bounds)
 
     if st.button("Get Recommandations"):
         filters = {
             "genre": selected_genre,
-            "duration_range": duration_range,
-            "actor": selected_actor.strip(),
-            "director": selected_director.strip(),
-            "year_range": year_range,
+            "actor": "" if selected_actor_names else selected_actor.strip(),
+            "director": "" if selected_director_names else selected_director.strip(),
+            "actor_names": selected_actor_names,
+            "director_names": selected_director_names,
         }
+        # Uno slider sull'intero intervallo non è un filtro: senza altri filtri si usa la lista precalcolata
+        if duration_range != duration_bounds:
+            filters["duration_range"] = duration_range
+        if year_range != year_bounds:
+            filters["year_range"] = year_range
 
         print(f"Filters applied for the reccomandation: {filters}")
 
-        user_info = get_user(st.session_state["username"])
-        preferences_ids = get_preferences(st.session_state["username"])
-        disliked_ids = get_disliked(st.session_state["username"])
+        profile = get_user_profile(st.session_state["username"], st.session_state)
+        preferences_ids = profile.preferences
+        disliked_ids = profile.disliked
 
         try:
-            recommendations = get_recommendations(preferences_ids, disliked_ids, filters)
+            recommendations = get_recommendations(preferences_ids, disliked_ids, filters, username=st.session_state["username"], precomputed=profile.precomputed)
 
             if len(recommendations) > 0:
                 st.session_state["recommendations"] = recommendations
                 st.session_state["page"] = "results"
             else:
                 st.warning("No recommendations found based on your preferences and filters.")
-        except ValueError as e:
-            # Gestisci errori legati al modello KNN (ad esempio, n_neighbors > n_samples_fit)
-            st.error("Filters may be too restrictive. Try with a more general filter selection.")
+        except NoLikedMoviesError:
+            # Nessuno dei film piaciuti è presente nel catalogo: impossibile costruire il profilo
+            st.error("None of your liked movies is available in the catalog. Update your preferences and try again.")
+        except FeatureArtifactMissingError:
+            # Il modello non è ancora stato costruito per il catalogo attuale (python -m src.knn_model)
+            st.error("Recommendations are not available right now. Please try again later.")
         except Exception as e:
             # Gestisci altri errori generali, se necessario
             st.error("An unexpected error occurred. Please try again later.")
\ No newline at end of file
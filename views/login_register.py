@@ -1,5 +1,6 @@
 import streamlit as st
-from src.auth import authenticate_user, get_preferences, register_user
+from src.auth import authenticate_user, register_user
+from src.passwords import HasherBusyError
 
 def show_login_register_page():
     if "authenticated" not in st.session_state or not st.session_state["authenticated"]:
@@ -11,18 +12,25 @@ def show_login_register_page():
             password = st.text_input("Password", type="password", key="login_password")
 
             if st.button("Login"):
-                authenticated, user = authenticate_user(username, password)
+                try:
+                    authenticated, user = authenticate_user(username, password)
+                except HasherBusyError:
+                    # Troppi login contemporanei: errore immediato invece di accodare altre richieste
+                    authenticated, user = None, None
                 if authenticated:
                     st.success("Login successful!")
                     st.session_state["authenticated"] = True
                     st.session_state["username"] = username
-                    preferences = get_preferences(username)
+                    # Il documento letto per l'autenticazione contiene già le preferenze
+                    preferences = user.get("preferences")
                     if preferences:
                         st.session_state["page"] = "filters"
                         st.rerun()
                     else:
                         st.session_state["page"] = "selection"
                         st.rerun()
+                elif authenticated is None:
+                    st.error("Server busy, please try again in a moment.")
                 else:
                     st.error("Invalid username or password.")
 
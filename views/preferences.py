@@ -1,13 +1,14 @@
 import streamlit as st
 from src.movies_utils import load_preprocessed_data
-from src.auth import get_preferences, get_disliked, update_preferences, update_disliked
+from src.auth import get_user_profile, undislike_movie, unlike_movie
 
 def show_preferences_page():
     st.header("Your Saved Preferences and Disliked Movies")
 
     # Recupera i film salvati dall'utente
-    preferences = get_preferences(st.session_state["username"])
-    disliked = get_disliked(st.session_state["username"])
+    profile = get_user_profile(st.session_state["username"], st.session_state)
+    preferences = profile.preferences
+    disliked = profile.disliked
     movies = load_preprocessed_data("data/preprocessed_filmtv_movies.csv")
 
     if preferences:
@@ -28,8 +29,7 @@ def show_preferences_page():
                         with col1:
                             st.error("Keep at least three liked movies in the list.")
                     else:
-                        preferences.remove(movie['filmtv_id'])                    
-                        update_preferences(st.session_state["username"], preferences)
+                        unlike_movie(st.session_state["username"], movie['filmtv_id'], st.session_state)
                         st.rerun()
     else:
         st.warning("No liked movies found.")
@@ -52,8 +52,7 @@ def show_preferences_page():
                         with col1:
                             st.error("Keep at least three liked movies in the list.")
                     else:
-                        disliked.remove(movie['filmtv_id'])
-                        update_disliked(st.session_state["username"], disliked)
+                        undislike_movie(st.session_state["username"], movie['filmtv_id'], st.session_state)
                         st.rerun()
     else:
         st.warning("No disliked movies found.")
\ No newline at end of file
@@ -1,8 +1,10 @@
 import streamlit as st
 import math
-from src.movies_utils import load_preprocessed_data
-from src.auth import get_disliked, get_preferences, get_user, update_disliked, update_preferences
-from src.filtering_functions import filter_movies
+from src.movies_utils import load_preprocessed_data, name_input
+from src.poster_cache import poster_prefetcher
+from src.auth import dislike_movie, get_user_profile, like_movie
+from src.filtering_functions import search_ids
+from src.catalog import positions_of_ids
 
 def show_research_page():
     st.header("Search for a Particular Movie")
@@ -11,45 +13,49 @@ def show_research_page():
 
     st.markdown("### Filter Options")
     selected_title = st.text_input("Search by Title")
+    selected_description = st.text_input("Search in Description")
     selected_genre = st.multiselect("Select Genre", options=movies['genre'].unique())
     duration_range = st.slider("Select Duration (minutes)", int(movies['duration'].min()), int(movies['duration'].max()), (60, 120))
-    selected_actor = st.text_input("Search by Actor")
-    selected_director = st.text_input("Search by Director")
+    selected_actor, selected_actor_names = name_input(movies, "actors", "Search by Actor")
+    selected_director, selected_director_names = name_input(movies, "directors", "Search by Director")
     year_range = st.slider("Select Year Range", int(movies['year'].min()), int(movies['year'].max()), (2000, 2020))
 
     if st.button("Search"):
         filters = {
             "title": selected_title.strip(),
+            "description": selected_description.strip(),
             "genre": selected_genre,
             "duration_range": duration_range,
-            "actor": selected_actor.strip(),
-            "director": selected_director.strip(),
+            "actor": "" if selected_actor_names else selected_actor.strip(),
+            "director": "" if selected_director_names else selected_director.strip(),
+            "actor_names": selected_actor_names,
+            "director_names": selected_director_names,
             "year_range": year_range,
         }
 
         print(f"Filters applied for the research: {filters}")
 
-        user_info = get_user(st.session_state["username"])
-        preferences_ids = get_preferences(st.session_state["username"])
-        disliked_ids = get_disliked(st.session_state["username"])
-
-        results = filter_movies(movies, 
-                        title=selected_title, 
+        # Ricerche ripetute (anche da altre sessioni) sono servite dalla cache dei risultati
+        found_ids = search_ids(movies,
+                        title=selected_title,
+                        description=selected_description.strip(),
                         genre=selected_genre, 
                         min_duration=duration_range[0], 
                         max_duration=duration_range[1], 
-                        actors=selected_actor, 
-                        directors=selected_director, 
+                        actors=filters["actor"],
+                        directors=filters["director"],
+                        actor_names=selected_actor_names,
+                        director_names=selected_director_names,
                         start_year=year_range[0], 
                         end_year=year_range[1])
         
-        print("Number of movies after filtering: ", len(results))
+        print("Number of movies after filtering: ", len(found_ids))
 
-        if results.empty:
+        if len(found_ids) == 0:
             st.warning("No movies found based on selected filters.")
         else:
             st.session_state["current_page"] = 1
-            st.session_state["results"] = results['filmtv_id'].tolist()
+            st.session_state["results"] = found_ids.tolist()
             st.session_state["page"] = "research_results"
             st.rerun()
 
@@ -63,7 +69,9 @@ def show_research_results_page():
 
         movies = load_preprocessed_data("data/preprocessed_filmtv_movies.csv")
         
-        movies_found = movies[movies['filmtv_id'].isin(results)]
+        # Stesso ordine dei risultati della ricerca (rilevanza), non quello del catalogo
+        found_positions = positions_of_ids(movies, results)
+        movies_found = movies.iloc[found_positions[found_positions >= 0]]
 
         total_pages = math.ceil(len(movies_found) / MOVIES_PER_PAGE)
 
@@ -76,6 +84,10 @@ def show_research_results_page():
         end_idx = start_idx + MOVIES_PER_PAGE
 
         current_movies = movies_found.iloc[start_idx:end_idx]
+        # Un'unica lettura del profilo per tutti i film della pagina
+        profile = get_user_profile(st.session_state["username"], st.session_state)
+        # Poster dei film della pagina recuperati in parallelo, in background, per la pagina dei dettagli
+        poster_prefetcher.prefetch(zip(current_movies['title'], current_movies['year']))
 
         if(total_pages > 1):
             col1, col2, col3 = st.columns([1, 1, 1])
@@ -91,11 +103,8 @@ def show_research_results_page():
             with col1:
                 st.write(f"**Title**: {movie['title']} | **Duration**: {movie['duration']} min | **Year**: {movie['year']}")
 
-            preferences = get_preferences(st.session_state["username"])
-            disliked = get_disliked(st.session_state["username"])
-
-            like_icon = "❤️" if movie['filmtv_id'] in preferences else ":material/thumb_up:"
-            dislike_icon = "🤢" if movie['filmtv_id'] in disliked else ":material/thumb_down_off_alt:"
+            like_icon = "❤️" if movie['filmtv_id'] in profile.liked_set else ":material/thumb_up:"
+            dislike_icon = "🤢" if movie['filmtv_id'] in profile.disliked_set else ":material/thumb_down_off_alt:"
 
             with col2:
                 if st.button("🔍", key=f"details_{movie['filmtv_id']}", help="View details of this movie", use_container_width=True):
@@ -106,30 +115,12 @@ def show_research_results_page():
 
             with col3:
                 if st.button(f"{like_icon}", key=f"like_{movie['filmtv_id']}", help="Like this movie", use_container_width=True):
-                    preferences = get_preferences(st.session_state["username"])
-                    disliked = get_disliked(st.session_state["username"])
-
-                    if movie['filmtv_id'] not in preferences:
-                        preferences.append(movie['filmtv_id'])
-                        update_preferences(st.session_state["username"], preferences)
-                    
-                    if movie['filmtv_id'] in disliked:
-                        disliked.remove(movie['filmtv_id'])
-                        update_disliked(st.session_state["username"], disliked) 
+                    like_movie(st.session_state["username"], movie['filmtv_id'], st.session_state)
                     st.rerun()
 
             with col4:
                 if st.button(f"{dislike_icon}", key=f"dislike_{movie['filmtv_id']}", help="Dislike this movie", use_container_width=True):
-                    disliked = get_disliked(st.session_state["username"])
-                    preferences = get_preferences(st.session_state["username"])
-                    
-                    if movie['filmtv_id'] not in disliked:
-                        disliked.append(movie['filmtv_id'])
-                        update_disliked(st.session_state["username"], disliked)
-                    
-                    if movie['filmtv_id'] in preferences:
-                        preferences.remove(movie['filmtv_id'])
-                        update_preferences(st.session_state["username"], preferences)
+                    dislike_movie(st.session_state["username"], movie['filmtv_id'], st.session_state)
                     st.rerun()
 
         if(total_pages > 1):
@@ -1,6 +1,7 @@
 import streamlit as st
 from src.movies_utils import load_preprocessed_data
-from src.auth import get_preferences, get_disliked, update_preferences, update_disliked
+from src.poster_cache import poster_prefetcher
+from src.auth import dislike_movie, get_user_profile, like_movie
 
 def show_results_page():
     st.header("Recommended Movies")
@@ -10,16 +11,18 @@ def show_results_page():
         movies = load_preprocessed_data("data/preprocessed_filmtv_movies.csv")
         
         recommended_movies = movies[movies['filmtv_id'].isin(recommendations)]
+        # Un'unica lettura del profilo per tutti i film della pagina
+        profile = get_user_profile(st.session_state["username"], st.session_state)
+        # Poster dei film della pagina recuperati in parallelo, in background, per la pagina dei dettagli
+        poster_prefetcher.prefetch(zip(recommended_movies['title'], recommended_movies['year']))
         
         for _, movie in recommended_movies.iterrows():
             col1, col2, col3, col4 = st.columns([8, 1, 1, 1])  # Layout: Film info, Like button, Dislike button
             with col1:
                 st.write(f"**Title**: {movie['title']} | **Duration**: {movie['duration']} min | **Year**: {movie['year']}")
 
-            preferences = get_preferences(st.session_state["username"])
-            disliked = get_disliked(st.session_state["username"])
-            like_icon = "❤️" if movie['filmtv_id'] in preferences else ":material/thumb_up:"
-            dislike_icon = "🤢" if movie['filmtv_id'] in disliked else ":material/thumb_down_off_alt:"
+            like_icon = "❤️" if movie['filmtv_id'] in profile.liked_set else ":material/thumb_up:"
+            dislike_icon = "🤢" if movie['filmtv_id'] in profile.disliked_set else ":material/thumb_down_off_alt:"
 
             with col2:
                 if st.button("🔍", key=f"details_{movie['filmtv_id']}", help="View details of this movie", use_container_width=True):
@@ -30,30 +33,12 @@ def show_results_page():
 
             with col3:
                 if st.button(f"{like_icon}", key=f"like_{movie['filmtv_id']}", help="Like this movie", use_container_width=True):
-                    preferences = get_preferences(st.session_state["username"])
-                    disliked = get_disliked(st.session_state["username"])
-
-                    if movie['filmtv_id'] not in preferences:
-                        preferences.append(movie['filmtv_id'])
-                        update_preferences(st.session_state["username"], preferences)
-                    
-                    if movie['filmtv_id'] in disliked:
-                        disliked.remove(movie['filmtv_id'])
-                        update_disliked(st.session_state["username"], disliked) 
+                    like_movie(st.session_state["username"], movie['filmtv_id'], st.session_state)
                     st.rerun()
 
             with col4:
                 if st.button(f"{dislike_icon}", key=f"dislike_{movie['filmtv_id']}", help="Dislike this movie", use_container_width=True):
-                    disliked = get_disliked(st.session_state["username"])
-                    preferences = get_preferences(st.session_state["username"])
-                    
-                    if movie['filmtv_id'] not in disliked:
-                        disliked.append(movie['filmtv_id'])
-                        update_disliked(st.session_state["username"], disliked)
-                    
-                    if movie['filmtv_id'] in preferences:
-                        preferences.remove(movie['filmtv_id'])
-                        update_preferences(st.session_state["username"], preferences)
+                    dislike_movie(st.session_state["username"], movie['filmtv_id'], st.session_state)
                     st.rerun()
                     
     else:
@@ -31,7 +31,7 @@ def show_selection_page():
                     movie['filmtv_id'] for movie in st.session_state["movies_to_display"]
                     if movie['title'] in st.session_state["selected_movies"]
                 ]
-                update_preferences(st.session_state["username"], selected_movie_ids)
+                update_preferences(st.session_state["username"], selected_movie_ids, st.session_state)
                 alert_message = "Selection saved!"
                 alert_type = "success"
                 st.session_state["page"] = "filters"